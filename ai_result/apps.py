@@ -1,15 +1,34 @@
 import os
+import hashlib
 import pickle
-import tensorflow as tf
-from tensorflow.keras.models import load_model
+import threading
 from django.apps import AppConfig
 from django.conf import settings
-from ultralytics import YOLO
 import logging
 
+from .fast_tokenizer import VocabTokenizer
+from .text_backends import EXPORT_FILENAMES, load_text_backend
+from .yolo_export import DEFAULT_IMGSZ, yolo_artifact_path
+
 logger = logging.getLogger(__name__)
 
 
+def file_digest(path, length=12):
+    """Hash SHA-256 rút gọn của một file model (hoặc mọi file trong thư mục model), dùng làm phiên bản model."""
+    if os.path.isdir(path):
+        paths = sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+    elif os.path.exists(path):
+        paths = [path]
+    else:
+        raise FileNotFoundError(path)
+    digest = hashlib.sha256()
+    for file_path in paths:
+        with open(file_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b''):
+                digest.update(chunk)
+    return digest.hexdigest()[:length]
+
+
 class AiResultConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ai_result'
@@ -17,44 +36,211 @@ class AiResultConfig(AppConfig):
     text_model = None
     text_tokenizer = None
     yolo_model = None
+    # Phiên bản YOLO model (hash file + ngưỡng), dùng để vô hiệu hóa các kết quả kiểm duyệt đã cache
+    yolo_model_version = ''
     TARGET_CLASSES = ['-', 'This dataset was exported via roboflow.com on April 11- 2024 at 8-18 AM GMT', 'violence-Guns and blod-']
     CONFIDENCE_THRESHOLD = 0.5
+    # Định dạng YOLO: 'pt' (PyTorch, best.pt), 'onnx' hoặc 'openvino' (bản export, xem export_yolo_model),
+    # INT8 dùng bản đã lượng tử hóa; YOLO_IMGSZ là kích thước ảnh đầu vào khi suy luận
+    YOLO_FORMAT = os.getenv('AI_YOLO_FORMAT', 'pt')
+    YOLO_INT8 = os.getenv('AI_YOLO_INT8', 'False').lower() in ('1', 'true', 'yes')
+    YOLO_IMGSZ = int(os.getenv('AI_YOLO_IMGSZ', str(DEFAULT_IMGSZ)))
+    # Cách lấy mẫu frame video: 'interval' (mỗi VIDEO_FRAME_CHECK_INTERVAL frame), 'scene' (khi cảnh thay đổi)
+    # hoặc 'seek' (seek tới các thời điểm đều nhau, tối đa VIDEO_MAX_INFERRED_FRAMES frame mỗi video)
+    VIDEO_SAMPLING_MODE = os.getenv('AI_VIDEO_SAMPLING_MODE', 'interval')
+    VIDEO_FRAME_CHECK_INTERVAL = int(os.getenv('AI_VIDEO_FRAME_CHECK_INTERVAL', '5'))
+    VIDEO_SCENE_THRESHOLD = float(os.getenv('AI_VIDEO_SCENE_THRESHOLD', '0.08'))
+    VIDEO_SCENE_MIN_GAP = int(os.getenv('AI_VIDEO_SCENE_MIN_GAP', '2'))
+    VIDEO_SCENE_MAX_GAP = int(os.getenv('AI_VIDEO_SCENE_MAX_GAP', '30'))
+    VIDEO_MAX_INFERRED_FRAMES = int(os.getenv('AI_VIDEO_MAX_INFERRED_FRAMES', '64'))
+    # Số frame video gom lại cho mỗi lần gọi YOLO predict
+    VIDEO_BATCH_SIZE = int(os.getenv('AI_VIDEO_BATCH_SIZE', '8'))
+    # Giải mã video ở thread riêng, song song với YOLO (hàng đợi batch có giới hạn)
+    VIDEO_PIPELINE_ENABLED = os.getenv('AI_VIDEO_PIPELINE', 'False').lower() in ('1', 'true', 'yes')
+    VIDEO_QUEUE_DEPTH = int(os.getenv('AI_VIDEO_QUEUE_DEPTH', '4'))
+    VIDEO_QUEUE_MAX_MB = int(os.getenv('AI_VIDEO_QUEUE_MAX_MB', '256'))
+    # Cache kết quả kiểm duyệt theo hash nội dung file (bảng MediaVerdict)
+    MEDIA_VERDICT_CACHE_ENABLED = os.getenv('AI_MEDIA_VERDICT_CACHE', 'True').lower() in ('1', 'true', 'yes')
+    # Thời gian tối đa chờ một lượt kiểm duyệt khác của cùng file, và thời gian coi lượt đó là bị treo
+    MEDIA_VERDICT_WAIT_SECONDS = float(os.getenv('AI_MEDIA_VERDICT_WAIT_SECONDS', '120'))
+    MEDIA_VERDICT_PENDING_TIMEOUT = float(os.getenv('AI_MEDIA_VERDICT_PENDING_TIMEOUT', '600'))
+    # Nhận diện media gần giống media đã kiểm duyệt bằng perceptual hash (dHash), khoảng cách Hamming tối đa
+    PERCEPTUAL_INDEX_ENABLED = os.getenv('AI_PERCEPTUAL_INDEX', 'True').lower() in ('1', 'true', 'yes')
+    PERCEPTUAL_MAX_DISTANCE = int(os.getenv('AI_PERCEPTUAL_MAX_DISTANCE', '6'))
+    VIDEO_KEYFRAMES = int(os.getenv('AI_VIDEO_KEYFRAMES', '5'))
+    # Tải media lên Cloudinary song song với lúc chạy YOLO; media bị từ chối sẽ bị xoá khỏi Cloudinary
+    SPECULATIVE_UPLOAD_ENABLED = os.getenv('AI_SPECULATIVE_UPLOAD', 'False').lower() in ('1', 'true', 'yes')
+    SPECULATIVE_UPLOAD_WORKERS = int(os.getenv('AI_SPECULATIVE_UPLOAD_WORKERS', '4'))
+    # Dịch vụ suy luận riêng (manage.py run_inference_server) qua unix socket. Để trống: chạy model trong tiến trình Django
+    INFERENCE_SOCKET = os.getenv('AI_INFERENCE_SOCKET', '')
+    INFERENCE_TIMEOUT = float(os.getenv('AI_INFERENCE_TIMEOUT', '30'))
+    # Khi dịch vụ suy luận không phản hồi: tự tải model vào tiến trình hiện tại và chạy tại chỗ
+    INFERENCE_LOCAL_FALLBACK = os.getenv('AI_INFERENCE_LOCAL_FALLBACK', 'True').lower() in ('1', 'true', 'yes')
+    # Web worker (wsgi.py/asgi.py) tải trước model và chạy thử một lần khi khởi động
+    WARMUP_ON_START = os.getenv('AI_WARMUP_ON_START', 'True').lower() in ('1', 'true', 'yes')
+    # Gom các comment gửi đồng thời thành một lần predict (chờ tối đa TEXT_BATCH_WAIT_MS mili giây)
+    TEXT_BATCHING_ENABLED = os.getenv('AI_TEXT_BATCHING', 'True').lower() in ('1', 'true', 'yes')
+    TEXT_BATCH_SIZE = int(os.getenv('AI_TEXT_BATCH_SIZE', '32'))
+    TEXT_BATCH_WAIT_MS = float(os.getenv('AI_TEXT_BATCH_WAIT_MS', '5'))
+    # Thời gian tối đa (giây) chờ kết quả từ batcher trước khi tự predict riêng comment đó
+    TEXT_BATCH_TIMEOUT = float(os.getenv('AI_TEXT_BATCH_TIMEOUT', '5'))
+    # Pad comment tới bucket độ dài nhỏ nhất đủ chứa nó thay vì luôn pad tới 2138 token
+    # (kiểm tra kết quả khớp với cách cũ bằng manage.py check_text_bucketing trước khi bật)
+    TEXT_LENGTH_BUCKETING = os.getenv('AI_TEXT_LENGTH_BUCKETING', 'False').lower() in ('1', 'true', 'yes')
+    TEXT_LENGTH_BUCKETS = os.getenv('AI_TEXT_LENGTH_BUCKETS', '16,64,256,2138')
+    # Backend chạy text model: 'keras' (my_model.h5), 'tflite' hoặc 'onnx' (bản export, xem export_text_model)
+    TEXT_BACKEND = os.getenv('AI_TEXT_BACKEND', 'keras')
+    TEXT_BACKEND_THREADS = int(os.getenv('AI_TEXT_BACKEND_THREADS', '1'))
+    # Cache LRU/TTL kết quả kiểm duyệt comment theo nội dung đã chuẩn hóa (trong bộ nhớ của từng tiến trình)
+    TEXT_CACHE_ENABLED = os.getenv('AI_TEXT_CACHE', 'True').lower() in ('1', 'true', 'yes')
+    TEXT_CACHE_SIZE = int(os.getenv('AI_TEXT_CACHE_SIZE', '10000'))
+    TEXT_CACHE_TTL = float(os.getenv('AI_TEXT_CACHE_TTL', '3600'))
+    # Giải mã ảnh ở độ phân giải giảm theo YOLO_IMGSZ (JPEG) và letterbox một lần, thay vì giải mã đầy đủ
+    IMAGE_REDUCED_DECODE = os.getenv('AI_IMAGE_REDUCED_DECODE', 'True').lower() in ('1', 'true', 'yes')
+    # Giới hạn upload media bài đăng, kiểm tra ngay khi đang nhận file (xem upload_handler)
+    UPLOAD_MAX_IMAGE_MB = int(os.getenv('AI_UPLOAD_MAX_IMAGE_MB', '20'))
+    UPLOAD_MAX_VIDEO_MB = int(os.getenv('AI_UPLOAD_MAX_VIDEO_MB', '200'))
+    UPLOAD_MAX_VIDEO_SECONDS = float(os.getenv('AI_UPLOAD_MAX_VIDEO_SECONDS', '600'))
+    # Số text tối đa trong một request tới endpoint predict_text (chấm điểm theo lô)
+    TEXT_PREDICT_MAX_ITEMS = int(os.getenv('AI_TEXT_PREDICT_MAX_ITEMS', '5000'))
+    # Id (UUID) các người dùng được gọi endpoint quản trị của ai_result (predict_text, moderation_stats),
+    # phân tách bằng dấu phẩy. User model không có is_staff nên quyền quản trị được cấu hình ở đây
+    ADMIN_USER_IDS = {user_id.strip().lower() for user_id in os.getenv('AI_ADMIN_USER_IDS', '').split(',') if user_id.strip()}
 
-    def ready(self):
+    # TensorFlow, Ultralytics và các model chỉ được import/tải ở lần dùng đầu tiên (hoặc khi warmup),
+    # nên migrate, shell và các lệnh không suy luận khởi động nhanh
+    _text_lock = threading.Lock()
+    _yolo_lock = threading.Lock()
+    _text_loaded = False
+    _yolo_loaded = False
+
+    @staticmethod
+    def models_dir():
         # Đường dẫn tới thư mục chứa model
-        models_dir = os.path.join(settings.BASE_DIR, 'ai_result', 'models_data')
+        return os.path.join(settings.BASE_DIR, 'ai_result', 'models_data')
+
+    def ready(self):
+        if AiResultConfig.INFERENCE_SOCKET:
+            # Model nằm trong dịch vụ suy luận, tiến trình Django không bao giờ tự tải (trừ khi fallback)
+            logger.info(f"Using inference service at {AiResultConfig.INFERENCE_SOCKET}, models are not loaded in this process.")
+
+    @classmethod
+    def get_text_model(cls):
+        cls.ensure_text_model()
+        return cls.text_model
+
+    @classmethod
+    def get_text_tokenizer(cls):
+        cls.ensure_text_model()
+        return cls.text_tokenizer
+
+    @classmethod
+    def get_yolo_model(cls):
+        cls.ensure_yolo_model()
+        return cls.yolo_model
+
+    @classmethod
+    def ensure_text_model(cls):
+        """Tải text model + tokenizer nếu chưa tải (một lần, an toàn khi nhiều thread cùng gọi)."""
+        if cls._text_loaded:
+            return
+        with cls._text_lock:
+            if not cls._text_loaded:
+                cls._load_text_model()
+                cls._text_loaded = True
+
+    @classmethod
+    def ensure_yolo_model(cls):
+        """Tải YOLO nếu chưa tải (một lần, an toàn khi nhiều thread cùng gọi)."""
+        if cls._yolo_loaded:
+            return
+        with cls._yolo_lock:
+            if not cls._yolo_loaded:
+                cls._load_yolo_model()
+                cls._yolo_loaded = True
+
+    @classmethod
+    def load_local_models(cls):
+        """Tải text model, tokenizer và YOLO vào tiến trình hiện tại (chỉ một lần)."""
+        cls.ensure_text_model()
+        cls.ensure_yolo_model()
+
+    @classmethod
+    def get_yolo_model_version(cls):
+        """Phiên bản YOLO cho verdict cache; tính từ file model mà không cần tải model."""
+        if not cls.yolo_model_version:
+            try:
+                cls.yolo_model_version = cls._yolo_version(cls.yolo_model_path())
+            except FileNotFoundError:
+                return ''
+        return cls.yolo_model_version
+
+    @classmethod
+    def yolo_model_path(cls):
+        return yolo_artifact_path(cls.models_dir(), cls.YOLO_FORMAT, cls.YOLO_INT8)
+
+    @classmethod
+    def _yolo_version(cls, yolo_model_path):
+        version = f"{file_digest(yolo_model_path)}-c{cls.CONFIDENCE_THRESHOLD}"
+        # Kích thước ảnh đầu vào ảnh hưởng tới kết quả phát hiện; giữ nguyên phiên bản cũ cho giá trị mặc định
+        if cls.YOLO_IMGSZ != DEFAULT_IMGSZ:
+            version += f"-i{cls.YOLO_IMGSZ}"
+        return version
+
+    @classmethod
+    def tokenizer_path(cls):
+        """tokenizer.vocab (định dạng gọn, xem fast_tokenizer) nếu đã được tạo, nếu không thì tokenizer.pkl."""
+        vocab_path = os.path.join(cls.models_dir(), 'tokenizer.vocab')
+        if os.path.exists(vocab_path):
+            return vocab_path
+        return os.path.join(cls.models_dir(), 'tokenizer.pkl')
+
+    @classmethod
+    def _load_text_model(cls):
+        models_dir = cls.models_dir()
         logger.info(f"Looking for models in directory: {models_dir}")
         # Tải Text Model và Tokenizer
-        text_model_path = os.path.join(models_dir, 'my_model.h5')
-        logger.info(f"Attempting to load text model from: {text_model_path}")
+        text_model_path = os.path.join(models_dir, EXPORT_FILENAMES.get(cls.TEXT_BACKEND, 'my_model.h5'))
+        logger.info(f"Attempting to load text model from: {text_model_path} (backend: {cls.TEXT_BACKEND})")
         try:
-            AiResultConfig.text_model = load_model(text_model_path)
+            if cls.TEXT_BACKEND == 'keras':
+                from tensorflow.keras.models import load_model
+                AiResultConfig.text_model = load_model(text_model_path)
+            else:
+                AiResultConfig.text_model = load_text_backend(cls.TEXT_BACKEND, models_dir, cls.TEXT_BACKEND_THREADS)
             logger.info(f"Text model '{text_model_path}' loaded successfully.")
         except FileNotFoundError:
             logger.warning(f"Warning: Text model '{text_model_path}' not found. Text prediction functionality will not work.")
         except Exception as e:
             logger.error(f"Error loading text model: {e}")
 
-        tokenizer_path = os.path.join(models_dir, 'tokenizer.pkl')
+        tokenizer_path = cls.tokenizer_path()
         logger.info(f"Attempting to load tokenizer from: {tokenizer_path}")
         try:
-            with open(tokenizer_path, 'rb') as file:
-                AiResultConfig.text_tokenizer = pickle.load(file)
+            if tokenizer_path.endswith('.vocab'):
+                AiResultConfig.text_tokenizer = VocabTokenizer(tokenizer_path)
+            else:
+                with open(tokenizer_path, 'rb') as file:
+                    AiResultConfig.text_tokenizer = pickle.load(file)
             logger.info(f"Tokenizer '{tokenizer_path}' loaded successfully.")
         except FileNotFoundError:
             logger.warning(f"Warning: Tokenizer '{tokenizer_path}' not found. Text prediction functionality will not work.")
         except Exception as e:
             logger.error(f"Error loading tokenizer: {e}")
 
-        # Tải YOLO Model
-        yolo_model_path = os.path.join(models_dir, 'best.pt')
+    @classmethod
+    def _load_yolo_model(cls):
+        # Tải YOLO Model (best.pt hoặc bản export ONNX/OpenVINO theo YOLO_FORMAT)
+        yolo_model_path = cls.yolo_model_path()
         logger.info(f"Attempting to load YOLO model from: {yolo_model_path}")
         try:
-            AiResultConfig.yolo_model = YOLO(yolo_model_path)
+            from ultralytics import YOLO
+            if cls.YOLO_FORMAT != 'pt' and not os.path.exists(yolo_model_path):
+                raise FileNotFoundError(yolo_model_path)
+            AiResultConfig.yolo_model = YOLO(yolo_model_path, task='detect')
+            AiResultConfig.yolo_model_version = cls._yolo_version(yolo_model_path)
             logger.info(f"YOLO model '{yolo_model_path}' loaded successfully.")
         except FileNotFoundError:
             logger.warning(f"Warning: YOLO model '{yolo_model_path}' not found. Object detection functionality will not work.")
         except Exception as e:
             logger.error(f"Error loading YOLO model: {e}")
-
-
@@ -0,0 +1,130 @@
+# ai_result/benchmarking.py
+# Các hàm hỗ trợ cho management command benchmark (dữ liệu giả lập, đo thời gian).
+
+import os
+import resource
+import threading
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+
+def synthetic_frames(count, width=640, height=360, seed=0):
+    """Sinh `count` frame BGR giả lập (nền nhiễu + vài hình khối di chuyển)."""
+    rng = np.random.default_rng(seed)
+    background = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+    frames = []
+    for i in range(count):
+        frame = background.copy()
+        x = (i * 7) % max(1, width - 80)
+        y = (i * 5) % max(1, height - 80)
+        cv2.rectangle(frame, (x, y), (x + 80, y + 80), (0, 0, 255), -1)
+        cv2.circle(frame, (width - x - 40, height - y - 40), 30, (255, 255, 0), -1)
+        frames.append(frame)
+    return frames
+
+
+def sample_comments(tokenizer, count, seed=0, max_words=300):
+    """
+    Sinh `count` comment giả lập từ từ vựng của tokenizer. Độ dài phân bố lệch về phía ngắn
+    như comment thật (đa số vài từ, thỉnh thoảng vài trăm từ).
+    """
+    rng = np.random.default_rng(seed)
+    words = [word for word, index in sorted(tokenizer.word_index.items(), key=lambda item: item[1])[:5000]]
+    lengths = np.clip(rng.lognormal(mean=1.8, sigma=1.0, size=count).astype(int) + 1, 1, max_words)
+    return [' '.join(rng.choice(words, size=length)) for length in lengths]
+
+
+def comment_corpus(tokenizer, count, min_words, max_words, seed=0):
+    """Sinh `count` comment giả lập có số từ phân bố đều trong [min_words, max_words]."""
+    rng = np.random.default_rng(seed)
+    words = [word for word, index in sorted(tokenizer.word_index.items(), key=lambda item: item[1])[:5000]]
+    lengths = rng.integers(min_words, max_words + 1, size=count)
+    return [' '.join(rng.choice(words, size=length)) for length in lengths]
+
+
+def synthetic_image_bytes(width, height, seed=0):
+    """Ảnh JPEG giả lập (frame đầu tiên của synthetic_frames)."""
+    ok, encoded = cv2.imencode('.jpg', synthetic_frames(1, width, height, seed)[0])
+    return encoded.tobytes()
+
+
+def write_synthetic_video(path, seconds, fps=30, width=640, height=360, seed=0):
+    """Ghi video mp4 giả lập dài `seconds` giây vào `path`. Trả về số frame đã ghi."""
+    count = int(seconds * fps)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    try:
+        # Sinh theo từng đoạn để không giữ cả video trong bộ nhớ
+        for start in range(0, count, 64):
+            for frame in synthetic_frames(min(64, count - start), width, height, seed + start):
+                writer.write(frame)
+    finally:
+        writer.release()
+    return count
+
+
+def percentiles(seconds):
+    """p50/p95/p99 (mili giây) của danh sách thời gian tính bằng giây."""
+    values = 1000 * np.asarray(seconds, dtype=np.float64)
+    return {f'p{q}_ms': float(np.percentile(values, q)) for q in (50, 95, 99)}
+
+
+class InferenceTimer:
+    """Bọc hàm suy luận `func(items, ...)`: cộng dồn thời gian, số lần gọi và số mẫu đã chạy."""
+
+    def __init__(self, func):
+        self.func = func
+        self._lock = threading.Lock()
+        self.reset()
+
+    def __call__(self, items, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self.func(items, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            # Có thể được gọi từ thread của micro-batcher hoặc video pipeline
+            with self._lock:
+                self.seconds += elapsed
+                self.calls += 1
+                self.items += len(items)
+
+    def reset(self):
+        with self._lock:
+            self.seconds = 0.0
+            self.calls = 0
+            self.items = 0
+
+
+def traced_call(func, *args, **kwargs):
+    """
+    Gọi hàm và trả về (kết quả, số giây, bộ nhớ cấp phát lớn nhất trong lúc gọi).
+    Đo bằng tracemalloc: gồm buffer của mảng numpy/OpenCV, không gồm bộ nhớ tạm bên trong thư viện C.
+    """
+    tracemalloc.start()
+    try:
+        result, seconds = time_call(func, *args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, seconds, peak
+
+
+def peak_rss_bytes():
+    """RSS lớn nhất của tiến trình từ lúc khởi động (Linux trả ru_maxrss theo KiB)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def rss_bytes():
+    """RSS hiện tại của tiến trình (Linux, đọc /proc/self/statm)."""
+    with open('/proc/self/statm') as file:
+        return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def time_call(func, *args, **kwargs):
+    """Gọi hàm và trả về (kết quả, số giây đã chạy)."""
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - started
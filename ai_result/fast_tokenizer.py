@@ -0,0 +1,134 @@
+# ai_result/fast_tokenizer.py
+# Định dạng từ vựng gọn cho tokenizer của text model (thay cho tokenizer.pkl) và tokenizer nhanh
+# cho ra đúng kết quả của keras Tokenizer.texts_to_sequences.
+#
+# File .vocab: MAGIC | độ dài header (uint32) | header JSON | đệm tới bội số 4 | offset (uint32[count + 1])
+# | chỉ số từ (int32[count]) | từ UTF-8 nối liền nhau. Các từ được sắp theo byte UTF-8 và tra bằng tìm kiếm
+# nhị phân ngay trên mmap, nên bảng từ vựng chỉ có một bản trong page cache dùng chung cho mọi tiến trình;
+# mỗi tiến trình chỉ giữ thêm một cache LRU nhỏ cho các từ hay gặp (LOOKUP_CACHE_SIZE).
+# File chỉ chứa các từ có chỉ số < num_words, vì keras bỏ qua các từ còn lại; không có
+# word_counts/word_docs/index_word như bản pickle.
+
+import json
+import mmap
+import struct
+from functools import lru_cache
+
+import numpy as np
+
+MAGIC = b'TKV2'
+# Số từ tra gần nhất được nhớ trong mỗi tiến trình
+LOOKUP_CACHE_SIZE = 8192
+
+
+def _align(offset):
+    return (offset + 3) & ~3
+
+
+def write_vocab(tokenizer, path):
+    """Chuyển keras Tokenizer (đã fit) sang file .vocab. Trả về số từ đã ghi."""
+    if tokenizer.char_level or getattr(tokenizer, 'analyzer', None) is not None:
+        raise ValueError('Only word-level tokenizers without a custom analyzer are supported.')
+
+    num_words = tokenizer.num_words
+    entries = sorted(
+        (word.encode('utf-8'), index)
+        for word, index in tokenizer.word_index.items()
+        if not (num_words and index >= num_words)
+    )
+    words = [word for word, _ in entries]
+    offsets = np.zeros(len(words) + 1, dtype='<u4')
+    offsets[1:] = np.cumsum([len(word) for word in words])
+
+    header = json.dumps({
+        'count': len(words),
+        'num_words': num_words,
+        'lower': tokenizer.lower,
+        'split': tokenizer.split,
+        'filters': tokenizer.filters,
+        'oov_token': tokenizer.oov_token,
+        # keras dùng word_index.get(oov_token), có thể là None nếu oov_token không có trong từ vựng
+        'oov_index': tokenizer.word_index.get(tokenizer.oov_token),
+    }).encode('utf-8')
+
+    with open(path, 'wb') as file:
+        file.write(MAGIC)
+        file.write(struct.pack('<I', len(header)))
+        file.write(header)
+        file.write(b'\0' * (_align(8 + len(header)) - 8 - len(header)))
+        file.write(offsets.tobytes())
+        file.write(np.asarray([index for _, index in entries], dtype='<i4').tobytes())
+        file.write(b''.join(words))
+    return len(words)
+
+
+class VocabTokenizer:
+    """Tokenizer chỉ đọc, nạp từ file .vocab; texts_to_sequences giống hệt keras Tokenizer."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:4] != MAGIC:
+            raise ValueError(f"'{path}' is not a tokenizer vocabulary file (re-create it with manage.py convert_tokenizer).")
+        (header_length,) = struct.unpack_from('<I', self._mmap, 4)
+        header = json.loads(self._mmap[8:8 + header_length].decode('utf-8'))
+
+        self._count = header['count']
+        offset = _align(8 + header_length)
+        # Các mảng trỏ thẳng vào mmap, không chép sang bộ nhớ riêng của tiến trình
+        self._offsets = np.frombuffer(self._mmap, dtype='<u4', count=self._count + 1, offset=offset)
+        offset += 4 * (self._count + 1)
+        self._indices = np.frombuffer(self._mmap, dtype='<i4', count=self._count, offset=offset)
+        self._words_offset = offset + 4 * self._count
+
+        self.num_words = header['num_words']
+        self.lower = header['lower']
+        self.split = header['split']
+        self.filters = header['filters']
+        self.oov_token = header['oov_token']
+        self.oov_index = header['oov_index']
+        self._get = lru_cache(maxsize=LOOKUP_CACHE_SIZE)(self._lookup)
+        # Bảng translate dựng một lần (keras dựng lại cho mỗi câu)
+        self._table = str.maketrans({c: self.split for c in self.filters})
+
+    def _word_at(self, position):
+        start = self._words_offset + int(self._offsets[position])
+        return self._mmap[start:self._words_offset + int(self._offsets[position + 1])]
+
+    def _lookup(self, word):
+        """Tìm kiếm nhị phân `word` trong bảng từ đã sắp xếp. Trả về chỉ số của từ hoặc None."""
+        key = word.encode('utf-8')
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            candidate = self._word_at(middle)
+            if candidate < key:
+                low = middle + 1
+            elif candidate > key:
+                high = middle
+            else:
+                return int(self._indices[middle])
+        return None
+
+    @property
+    def word_index(self):
+        """Bản sao dict {từ: chỉ số} (dựng lại mỗi lần gọi, chỉ dùng cho công cụ, không dùng khi tokenize)."""
+        return {self._word_at(i).decode('utf-8'): int(self._indices[i]) for i in range(self._count)}
+
+    def text_to_words(self, text):
+        if self.lower:
+            text = text.lower()
+        return text.translate(self._table).split(self.split)
+
+    def texts_to_sequences(self, texts):
+        get = self._get
+        sequences = []
+        for text in texts:
+            # Bỏ chuỗi rỗng (do nhiều dấu phân cách liền nhau) như keras text_to_word_sequence
+            words = filter(None, self.text_to_words(text))
+            if self.oov_token is None:
+                sequences.append([index for index in map(get, words) if index is not None])
+            else:
+                sequences.append([self.oov_index if index is None else index for index in map(get, words)])
+        return sequences
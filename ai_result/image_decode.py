@@ -0,0 +1,92 @@
+# ai_result/image_decode.py
+# Giải mã ảnh theo kích thước đầu vào của YOLO: ảnh JPEG lớn (ảnh điện thoại 12+ MP) được giải mã ở độ phân giải
+# giảm 1/2, 1/4 hoặc 1/8 ngay trong bộ giải mã (IMREAD_REDUCED_COLOR_*), rồi letterbox một lần về YOLO_IMGSZ.
+# Không cấp phát buffer pixel đầy đủ độ phân giải, trong khi YOLO vốn cũng thu nhỏ ảnh về YOLO_IMGSZ.
+
+import struct
+
+import cv2
+import numpy as np
+
+REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+# Màu viền letterbox giống Ultralytics
+LETTERBOX_COLOR = (114, 114, 114)
+# Marker SOF (start of frame) của JPEG chứa kích thước ảnh; C4, C8, CC là DHT/JPG/DAC
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def jpeg_dimensions(data):
+    """(width, height) đọc từ header JPEG mà không giải mã ảnh, None nếu không phải JPEG hoặc header hỏng."""
+    if not data.startswith(b'\xff\xd8'):
+        return None
+    offset = 2
+    while offset + 4 <= len(data):
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xFF:
+            # Byte đệm giữa các marker
+            offset += 1
+            continue
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+            offset += 2
+            continue
+        if marker in (0xD9, 0xDA):
+            # Hết ảnh hoặc bắt đầu dữ liệu nén mà chưa gặp SOF
+            return None
+        (length,) = struct.unpack_from('>H', data, offset + 2)
+        if marker in JPEG_SOF_MARKERS:
+            if offset + 9 > len(data):
+                return None
+            height, width = struct.unpack_from('>HH', data, offset + 5)
+            return width, height
+        offset += 2 + length
+    return None
+
+
+def reduced_decode_flag(width, height, target_size):
+    """Cờ imdecode giảm độ phân giải nhiều nhất mà cạnh dài vẫn >= target_size (IMREAD_COLOR nếu không giảm được)."""
+    longest = max(width, height)
+    for factor, flag in REDUCED_FLAGS:
+        if longest // factor >= target_size:
+            return flag
+    return cv2.IMREAD_COLOR
+
+
+def letterbox(image, size):
+    """Thu nhỏ ảnh (giữ tỉ lệ) cho cạnh dài bằng `size` rồi thêm viền thành ảnh vuông size x size. Ảnh nhỏ hơn giữ nguyên."""
+    height, width = image.shape[:2]
+    scale = size / max(height, width)
+    if scale >= 1:
+        return image
+    new_width, new_height = max(1, round(width * scale)), max(1, round(height * scale))
+    resized = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_AREA)
+    top = (size - new_height) // 2
+    left = (size - new_width) // 2
+    return cv2.copyMakeBorder(
+        resized, top, size - new_height - top, left, size - new_width - left,
+        cv2.BORDER_CONSTANT, value=LETTERBOX_COLOR,
+    )
+
+
+def decode_image_reduced(image_bytes, target_size):
+    """
+    Giải mã ảnh ở độ phân giải nhỏ nhất mà cạnh dài vẫn >= `target_size` (chỉ JPEG; các định dạng khác như PNG,
+    WebP không có giải mã giảm độ phân giải thật sự trong OpenCV nên được giải mã đầy đủ). None nếu không đọc được.
+    """
+    buffer = np.frombuffer(image_bytes, dtype=np.uint8)
+    if buffer.size == 0:
+        return None
+    dimensions = jpeg_dimensions(image_bytes)
+    flag = reduced_decode_flag(*dimensions, target_size) if dimensions else cv2.IMREAD_COLOR
+    return cv2.imdecode(buffer, flag)
+
+
+def decode_image_for_model(image_bytes, target_size):
+    """Giải mã giảm độ phân giải rồi letterbox về target_size. Trả về None nếu không đọc được ảnh."""
+    image = decode_image_reduced(image_bytes, target_size)
+    return None if image is None else letterbox(image, target_size)
@@ -0,0 +1,95 @@
+# ai_result/inference_client.py
+# Client cho dịch vụ suy luận (manage.py run_inference_server).
+# Frame ảnh/video được chép một lần vào shared memory, chỉ mô tả (tên vùng nhớ, offset, shape, dtype)
+# được gửi qua unix socket; text được gửi trực tiếp vì nhỏ.
+# Dữ liệu trên socket là pickle và chỉ được xác thực (hai chiều) bằng authkey lấy từ SECRET_KEY:
+# AI_INFERENCE_SOCKET phải nằm trong thư mục riêng 0700 của user chạy dịch vụ (xem inference_server).
+
+import logging
+from multiprocessing import shared_memory
+from multiprocessing.connection import Client
+
+import numpy as np
+from django.conf import settings
+
+from .apps import AiResultConfig
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceServiceError(Exception):
+    """Dịch vụ suy luận không kết nối được, quá thời gian chờ hoặc trả về lỗi."""
+
+
+def inference_authkey():
+    # Chỉ tiến trình có cùng SECRET_KEY mới gửi được yêu cầu (dữ liệu trên socket là pickle)
+    return settings.SECRET_KEY.encode()
+
+
+def inference_service_enabled():
+    return bool(AiResultConfig.INFERENCE_SOCKET)
+
+
+def pack_frames(frames):
+    """Chép các frame vào một vùng shared memory mới. Trả về (shm, specs); người gọi phải unlink shm."""
+    frames = [np.ascontiguousarray(frame) for frame in frames]
+    shm = shared_memory.SharedMemory(create=True, size=max(1, sum(frame.nbytes for frame in frames)))
+    specs = []
+    offset = 0
+    for frame in frames:
+        view = np.ndarray(frame.shape, dtype=frame.dtype, buffer=shm.buf, offset=offset)
+        view[...] = frame
+        del view
+        specs.append((offset, frame.shape, frame.dtype.str))
+        offset += frame.nbytes
+    return shm, specs
+
+
+def _request(kind, payload, timeout=None):
+    timeout = AiResultConfig.INFERENCE_TIMEOUT if timeout is None else timeout
+    try:
+        connection = Client(AiResultConfig.INFERENCE_SOCKET, family='AF_UNIX', authkey=inference_authkey())
+    except Exception as e:
+        raise InferenceServiceError(f"Cannot connect to inference service: {e}") from e
+
+    try:
+        connection.send((kind, payload))
+        if not connection.poll(timeout):
+            raise InferenceServiceError(f"Inference service did not answer within {timeout}s.")
+        status, result = connection.recv()
+    except InferenceServiceError:
+        raise
+    except Exception as e:
+        raise InferenceServiceError(f"Inference service request failed: {e}") from e
+    finally:
+        connection.close()
+
+    if status != 'ok':
+        raise InferenceServiceError(f"Inference service error: {result}")
+    return result
+
+
+def remote_check_frames(frames, target_classes, confidence_threshold, timeout=None):
+    """Vị trí frame bạo lực đầu tiên trong `frames` (tính bởi dịch vụ suy luận), hoặc None."""
+    shm, specs = pack_frames(frames)
+    try:
+        return _request('frames', {
+            'shm': shm.name,
+            'specs': specs,
+            'target_classes': list(target_classes),
+            'confidence_threshold': confidence_threshold,
+        }, timeout)
+    finally:
+        # Dịch vụ đã trả lời (hoặc bị bỏ qua vì timeout): vùng nhớ thuộc về client, giải phóng ngay
+        shm.close()
+        shm.unlink()
+
+
+def remote_predict_text(texts, timeout=None):
+    """Điểm dự đoán của text model cho từng text (tính bởi dịch vụ suy luận)."""
+    return np.asarray(_request('text', {'texts': list(texts)}, timeout), dtype=np.float32)
+
+
+def ping(timeout=5):
+    """Thông tin dịch vụ suy luận (pid, phiên bản model, model nào đã tải)."""
+    return _request('ping', {}, timeout)
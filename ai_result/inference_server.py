@@ -0,0 +1,177 @@
+# ai_result/inference_server.py
+# Dịch vụ suy luận cục bộ: N tiến trình, mỗi tiến trình tự tải text model + YOLO một lần,
+# cùng accept() trên một unix socket. Các worker Django chỉ giữ client mỏng (inference_client),
+# nên model không bị nhân bản theo số worker và suy luận không chạy trên request thread.
+#
+# Bảo mật: yêu cầu và kết quả trên socket là pickle, chỉ được xác thực bằng authkey lấy từ SECRET_KEY
+# (inference_client.inference_authkey). Vì vậy socket được tạo với quyền 0600 (umask đặt trước khi bind,
+# không có lúc nào người khác kết nối được) trong một thư mục riêng 0700 thuộc về user chạy dịch vụ;
+# server từ chối chạy nếu thư mục chứa socket cho phép user khác truy cập.
+
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from multiprocessing import resource_tracker, shared_memory
+from multiprocessing.connection import Listener
+
+import numpy as np
+from django.db import connections
+
+from .apps import AiResultConfig
+from .inference_client import inference_authkey
+from .utils import detect_violent_frame, predict_text_scores
+
+logger = logging.getLogger(__name__)
+
+
+def attach_frames(name, specs):
+    """Mở vùng shared memory của client. Trả về (shm, frames); frames là view, không chép dữ liệu."""
+    shm = shared_memory.SharedMemory(name=name)
+    # Vùng nhớ thuộc về client (client unlink): không để resource tracker của server xoá hay cảnh báo về nó
+    resource_tracker.unregister(shm._name, 'shared_memory')
+    frames = [
+        np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+        for offset, shape, dtype in specs
+    ]
+    return shm, frames
+
+
+def handle_frames(payload):
+    shm, frames = attach_frames(payload['shm'], payload['specs'])
+    try:
+        return detect_violent_frame(
+            frames, AiResultConfig.get_yolo_model(), payload['target_classes'], payload['confidence_threshold']
+        )
+    finally:
+        # Phải bỏ hết view trước khi close(), nếu không mmap báo "exported pointers exist"
+        del frames
+        shm.close()
+
+
+def handle_text(payload):
+    scores = predict_text_scores(payload['texts'])
+    if scores is None:
+        raise ValueError('Text model or tokenizer not loaded.')
+    return [float(score) for score in scores]
+
+
+def handle_ping(payload):
+    return {
+        'pid': os.getpid(),
+        'yolo_model_version': AiResultConfig.get_yolo_model_version(),
+        'yolo_model': AiResultConfig.yolo_model is not None,
+        'text_model': AiResultConfig.text_model is not None and AiResultConfig.text_tokenizer is not None,
+    }
+
+
+HANDLERS = {
+    'frames': handle_frames,
+    'text': handle_text,
+    'ping': handle_ping,
+}
+
+
+def serve_connection(connection):
+    """Xử lý một yêu cầu trên một kết nối rồi đóng kết nối."""
+    with connection:
+        kind, payload = connection.recv()
+        try:
+            response = ('ok', HANDLERS[kind](payload))
+        except Exception as e:
+            logger.error(f"Inference request '{kind}' failed: {str(e)}", exc_info=True)
+            response = ('error', str(e))
+        try:
+            connection.send(response)
+        except (BrokenPipeError, ConnectionResetError):
+            # Client đã bỏ đi (timeout), kết quả không còn ai nhận
+            logger.warning(f"Client disconnected before inference request '{kind}' finished.")
+
+
+def worker_main(listener):
+    """Vòng lặp của một tiến trình suy luận: tải model rồi nhận yêu cầu cho tới khi bị dừng."""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Dịch vụ không dùng DB; chỉ đảm bảo không chia sẻ kết nối với tiến trình cha
+    connections.close_all()
+
+    # Dịch vụ suy luận luôn chạy model tại chỗ, không tự gọi lại chính mình
+    AiResultConfig.INFERENCE_SOCKET = ''
+    AiResultConfig.load_local_models()
+    logger.info(f"Inference worker {os.getpid()} ready.")
+
+    while True:
+        try:
+            connection = listener.accept()
+        except Exception as e:
+            # Sai authkey hoặc client ngắt giữa chừng lúc bắt tay: bỏ qua kết nối đó
+            logger.warning(f"Rejected inference connection: {str(e)}")
+            continue
+        try:
+            serve_connection(connection)
+        except Exception as e:
+            logger.error(f"Error while serving inference connection: {str(e)}", exc_info=True)
+
+
+def open_listener(socket_path, backlog=128):
+    """
+    Tạo Listener trên `socket_path` (quyền 0600) trong thư mục riêng của user hiện tại (tạo với quyền 0700
+    nếu chưa có). Raise ValueError nếu thư mục thuộc user khác hoặc group/other có quyền truy cập.
+    """
+    directory = os.path.dirname(os.path.abspath(socket_path))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.stat(directory)
+    if info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise ValueError(
+            f"Inference socket directory '{directory}' must be owned by this user with mode 0700 "
+            "(requests on the socket are pickled)."
+        )
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    # umask áp dụng ngay lúc bind: socket chưa bao giờ mở cho user khác, kể cả trước chmod
+    previous_umask = os.umask(0o177)
+    try:
+        listener = Listener(socket_path, family='AF_UNIX', backlog=backlog, authkey=inference_authkey())
+    finally:
+        os.umask(previous_umask)
+    os.chmod(socket_path, 0o600)
+    return listener
+
+
+def run_inference_server(socket_path, workers=1):
+    """
+    Mở unix socket `socket_path` (xem open_listener) và chạy `workers` tiến trình suy luận cùng accept()
+    trên socket đó. Tiến trình con chết sẽ được khởi động lại. Chặn cho tới khi nhận SIGTERM/SIGINT.
+    """
+    context = multiprocessing.get_context('fork')
+    listener = open_listener(socket_path)
+
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *args: stopping.append(True))
+    signal.signal(signal.SIGINT, lambda *args: stopping.append(True))
+
+    def start(index):
+        process = context.Process(target=worker_main, args=(listener,), name=f"inference-worker-{index}", daemon=True)
+        process.start()
+        return process
+
+    processes = [start(i) for i in range(max(1, workers))]
+    logger.info(f"Inference service listening on {socket_path} with {len(processes)} workers.")
+
+    try:
+        while not stopping:
+            for i, process in enumerate(processes):
+                if not process.is_alive():
+                    logger.error(f"Inference worker {process.pid} exited with code {process.exitcode}, restarting.")
+                    processes[i] = start(i)
+            time.sleep(0.5)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+        listener.close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        logger.info("Inference service stopped.")
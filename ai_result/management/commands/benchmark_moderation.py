@@ -0,0 +1,221 @@
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from unittest import mock
+
+import cloudinary.uploader
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+
+from ai_result import utils
+from ai_result.apps import AiResultConfig
+from ai_result.benchmarking import (
+    InferenceTimer, comment_corpus, peak_rss_bytes, percentiles, synthetic_image_bytes, traced_call, write_synthetic_video,
+)
+from ai_result.image_decode import decode_image_for_model
+from ai_result.verdict_cache import ViolentContentError
+
+# Nhóm comment theo số từ: (tên, số từ tối thiểu, số từ tối đa)
+COMMENT_CORPORA = [('short', 1, 10), ('medium', 11, 60), ('long', 61, 300)]
+
+
+def parse_resolution(value):
+    width, height = value.lower().split('x')
+    return int(width), int(height)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark offline cho process_and_upload_image, process_and_upload_video và analyze_comment_text "
+        "trên ảnh/video/comment giả lập (Cloudinary được thay bằng bản giả). Kết quả in ra dạng JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--image-resolutions', nargs='+', default=['640x360', '1280x720', '1920x1080', '4000x3000'])
+        parser.add_argument('--video-seconds', type=float, nargs='+', default=[5, 15, 30])
+        parser.add_argument('--video-resolution', default='640x360')
+        parser.add_argument('--fps', type=int, default=30)
+        parser.add_argument('--repeat', type=int, default=20, help="Số lần chạy cho mỗi ảnh/video.")
+        parser.add_argument('--comments', type=int, default=300, help="Số comment cho mỗi nhóm độ dài.")
+        parser.add_argument('--upload-latency-ms', type=float, default=0.0, help="Độ trễ giả lập của mỗi lần upload Cloudinary.")
+        parser.add_argument('--with-caches', action='store_true', help="Giữ verdict cache, perceptual index và cache comment (mặc định tắt để đo chi phí thật).")
+        parser.add_argument('--only', nargs='+', choices=['comment', 'image', 'video'], default=['comment', 'image', 'video'])
+        parser.add_argument('--output', help="Ghi JSON vào file thay vì stdout.")
+
+    def handle(self, *args, **options):
+        # Đo suy luận trong tiến trình này, không qua dịch vụ suy luận
+        AiResultConfig.INFERENCE_SOCKET = ''
+        if not options['with_caches']:
+            AiResultConfig.MEDIA_VERDICT_CACHE_ENABLED = False
+            AiResultConfig.PERCEPTUAL_INDEX_ENABLED = False
+            AiResultConfig.TEXT_CACHE_ENABLED = False
+        utils.warmup_models()
+
+        self.upload_latency = options['upload_latency_ms'] / 1000.0
+        self.yolo_timer = InferenceTimer(utils.detect_violent_frame)
+        self.text_timer = InferenceTimer(utils.predict_text_scores)
+        results = {}
+        with mock.patch.object(cloudinary.uploader, 'upload', self.fake_upload), \
+                mock.patch.object(cloudinary.uploader, 'destroy', lambda *args, **kwargs: {'result': 'ok'}), \
+                mock.patch.object(utils, 'detect_violent_frame', self.yolo_timer), \
+                mock.patch.object(utils, 'predict_text_scores', self.text_timer):
+            if 'comment' in options['only']:
+                results['comment'] = self.bench_comments(options)
+            if 'image' in options['only']:
+                results['image'] = self.bench_images(options)
+            if 'video' in options['only']:
+                results['video'] = self.bench_videos(options)
+
+        report = {
+            'commit': git_commit(),
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'config': {
+                'yolo_format': AiResultConfig.YOLO_FORMAT,
+                'yolo_int8': AiResultConfig.YOLO_INT8,
+                'yolo_imgsz': AiResultConfig.YOLO_IMGSZ,
+                'yolo_model_version': AiResultConfig.get_yolo_model_version(),
+                'text_backend': AiResultConfig.TEXT_BACKEND,
+                'text_length_bucketing': AiResultConfig.TEXT_LENGTH_BUCKETING,
+                'text_batching': AiResultConfig.TEXT_BATCHING_ENABLED,
+                'video_sampling_mode': AiResultConfig.VIDEO_SAMPLING_MODE,
+                'video_batch_size': AiResultConfig.VIDEO_BATCH_SIZE,
+                'video_pipeline': AiResultConfig.VIDEO_PIPELINE_ENABLED,
+                'speculative_upload': AiResultConfig.SPECULATIVE_UPLOAD_ENABLED,
+                'caches': options['with_caches'],
+                'upload_latency_ms': options['upload_latency_ms'],
+                'repeat': options['repeat'],
+            },
+            'results': results,
+            'peak_rss_bytes': peak_rss_bytes(),
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output + '\n')
+            self.stderr.write(f"Benchmark report written to {options['output']}")
+        else:
+            self.stdout.write(output)
+
+    def fake_upload(self, source, public_id=None, **kwargs):
+        if self.upload_latency:
+            time.sleep(self.upload_latency)
+        resource_type = kwargs.get('resource_type', 'image')
+        return {'url': f"https://res.cloudinary.invalid/{resource_type}/upload/{public_id}", 'public_id': public_id}
+
+    def measure(self, timer, runs, is_rejected=None):
+        """
+        Chạy từng hàm trong `runs`, trả về các chỉ số latency, tỉ lệ thời gian suy luận và số frame/text đã suy luận.
+        Lần chạy bị từ chối: raise ViolentContentError, hoặc is_rejected(kết quả) trả về True.
+        """
+        timer.reset()
+        latencies = []
+        rejected = 0
+        for run in runs:
+            started = time.perf_counter()
+            try:
+                result = run()
+                if is_rejected is not None and is_rejected(result):
+                    rejected += 1
+            except ViolentContentError:
+                rejected += 1
+            latencies.append(time.perf_counter() - started)
+        total = sum(latencies)
+        return {
+            'runs': len(latencies),
+            'rejected': rejected,
+            **percentiles(latencies),
+            'mean_ms': 1000 * total / len(latencies),
+            'inference_share': timer.seconds / total if total else 0.0,
+            'inference_calls': timer.calls,
+            'inferred_items': timer.items,
+            'total_seconds': total,
+            'peak_rss_bytes': peak_rss_bytes(),
+        }
+
+    def bench_comments(self, options):
+        tokenizer = AiResultConfig.get_text_tokenizer()
+        if not utils.text_model_ready() or tokenizer is None:
+            return {'skipped': 'Text model or tokenizer not loaded.'}
+        results = {}
+        for index, (name, min_words, max_words) in enumerate(COMMENT_CORPORA):
+            texts = comment_corpus(tokenizer, options['comments'], min_words, max_words, seed=index)
+            result = self.measure(
+                self.text_timer,
+                [lambda text=text: utils.analyze_comment_text(text) for text in texts],
+                is_rejected=lambda status: status[0] == 1,
+            )
+            result['words'] = [min_words, max_words]
+            result['comments_per_sec'] = result['runs'] / result['total_seconds']
+            results[name] = result
+        return results
+
+    def bench_images(self, options):
+        if not utils.yolo_ready():
+            return {'skipped': 'YOLO model not loaded.'}
+        results = {}
+        for resolution in options['image_resolutions']:
+            width, height = parse_resolution(resolution)
+            uploads = [
+                SimpleUploadedFile(f"bench_{resolution}_{i}.jpg", synthetic_image_bytes(width, height, seed=i), content_type='image/jpeg')
+                for i in range(options['repeat'])
+            ]
+            result = self.measure(self.yolo_timer, [lambda upload=upload: utils.process_and_upload_image(upload) for upload in uploads])
+            result['bytes'] = sum(upload.size for upload in uploads) // len(uploads)
+            result['decode'] = self.bench_decode(uploads)
+            results[resolution] = result
+        return results
+
+    def bench_decode(self, uploads):
+        """So sánh giải mã đầy đủ (cách cũ) với giải mã giảm độ phân giải + letterbox: thời gian và bộ nhớ đỉnh mỗi ảnh."""
+        paths = {
+            'full': utils.decode_image_bytes,
+            'reduced': lambda data: decode_image_for_model(data, AiResultConfig.YOLO_IMGSZ),
+        }
+        results = {}
+        for name, decode in paths.items():
+            seconds = []
+            peaks = []
+            for upload in uploads:
+                upload.seek(0)
+                image, elapsed, peak = traced_call(decode, upload.read())
+                seconds.append(elapsed)
+                peaks.append(peak)
+            results[name] = {**percentiles(seconds), 'peak_bytes': max(peaks), 'shape': list(image.shape)}
+        return results
+
+    def bench_videos(self, options):
+        if not utils.yolo_ready():
+            return {'skipped': 'YOLO model not loaded.'}
+        width, height = parse_resolution(options['video_resolution'])
+        results = {}
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for seconds in options['video_seconds']:
+                path = os.path.join(temp_dir, f"bench_{seconds}s.mp4")
+                frame_count = write_synthetic_video(path, seconds, options['fps'], width, height)
+                with open(path, 'rb') as file:
+                    video_bytes = file.read()
+                # Mỗi lần chạy một tên file riêng (process_and_upload_video ghi file tạm theo tên)
+                uploads = [SimpleUploadedFile(f"bench_{seconds}s_{i}.mp4", video_bytes, content_type='video/mp4') for i in range(options['repeat'])]
+                result = self.measure(self.yolo_timer, [lambda upload=upload: utils.process_and_upload_video(upload) for upload in uploads])
+                result.update({
+                    'resolution': options['video_resolution'],
+                    'frames': frame_count,
+                    'bytes': len(video_bytes),
+                    # Frame video đã xử lý mỗi giây (gồm cả đọc/lấy mẫu) và frame đã qua YOLO mỗi giây suy luận
+                    'video_frames_per_sec': frame_count * result['runs'] / result['total_seconds'],
+                    'inferred_frames_per_sec': self.yolo_timer.items / self.yolo_timer.seconds if self.yolo_timer.seconds else 0.0,
+                })
+                results[f"{seconds:g}s"] = result
+        return results
@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Các module nặng chỉ được import khi thật sự suy luận
+HEAVY_MODULES = ['tensorflow', 'ultralytics', 'torch']
+
+SETUP_PROBE = (
+    "import json, sys, django; django.setup(); "
+    "import post.serializers, comment.serializers, user.serializers; "
+    f"print(json.dumps([name for name in {HEAVY_MODULES!r} if name in sys.modules]))"
+)
+
+
+class Command(BaseCommand):
+    help = "Đo thời gian khởi động các lệnh không suy luận và kiểm tra chúng không import TensorFlow/Ultralytics."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--commands', nargs='+', default=['check', 'help'], help="Các lệnh manage.py cần đo.")
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--max-seconds', type=float, default=1.5, help="Thời gian khởi động tối đa cho phép (giây).")
+
+    def _run(self, args):
+        env = dict(os.environ, AI_WARMUP_ON_START='False')
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, *args], cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+        elapsed = time.perf_counter() - started
+        if result.returncode != 0:
+            raise CommandError(f"{' '.join(args)} failed:\n{result.stderr[-2000:]}")
+        return result.stdout, elapsed
+
+    def handle(self, *args, **options):
+        manage_py = os.path.join(settings.BASE_DIR, 'manage.py')
+        failures = []
+
+        stdout, elapsed = self._run(['-c', SETUP_PROBE])
+        heavy = [name for name in HEAVY_MODULES if f'"{name}"' in stdout]
+        self.stdout.write(f"django.setup() + serializers: {elapsed:.3f}s, heavy modules imported: {heavy or 'none'}")
+        if heavy:
+            failures.append(f"django.setup() imported {', '.join(heavy)}")
+
+        for command in options['commands']:
+            timings = [self._run([manage_py, command])[1] for _ in range(max(1, options['repeat']))]
+            best = min(timings)
+            self.stdout.write(f"manage.py {command:<12} best {best:.3f}s  (runs: {', '.join(f'{t:.3f}' for t in timings)})")
+            if best > options['max_seconds']:
+                failures.append(f"manage.py {command} took {best:.3f}s > {options['max_seconds']}s")
+
+        if failures:
+            raise CommandError('; '.join(failures))
+        self.stdout.write(self.style.SUCCESS("Startup is within budget and does not load AI frameworks."))
@@ -0,0 +1,81 @@
+import os
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_result.apps import AiResultConfig
+from ai_result.benchmarking import rss_bytes, sample_comments, time_call
+from ai_result.text_backends import TEXT_BACKENDS, load_text_backend
+from ai_result.utils import get_sequences
+
+
+def _load_keras():
+    from tensorflow.keras.models import load_model
+    return load_model(os.path.join(AiResultConfig.models_dir(), 'my_model.h5'))
+
+
+class Command(BaseCommand):
+    help = "So sánh độ chính xác (so với keras) và độ trễ của các backend text model: keras, tflite, onnx."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backends', nargs='+', choices=TEXT_BACKENDS, default=list(TEXT_BACKENDS))
+        parser.add_argument('--count', type=int, default=500, help="Số comment giả lập.")
+        parser.add_argument('--batch-size', type=int, default=32)
+        parser.add_argument('--tolerance', type=float, default=1e-4, help="Sai lệch tuyệt đối tối đa so với keras.")
+
+    def handle(self, *args, **options):
+        tokenizer = AiResultConfig.get_text_tokenizer()
+        if tokenizer is None:
+            raise CommandError("Tokenizer chưa được tải.")
+        texts = sample_comments(tokenizer, options['count'])
+        padded = get_sequences(texts, tokenizer, train=False, max_seq_length=2138)
+        batch_size = options['batch_size']
+
+        reference = None
+        failures = []
+        for backend in options['backends']:
+            before = rss_bytes()
+            try:
+                if backend == 'keras':
+                    model, load_seconds = time_call(_load_keras)
+                else:
+                    model, load_seconds = time_call(load_text_backend, backend, AiResultConfig.models_dir(), AiResultConfig.TEXT_BACKEND_THREADS)
+            except (ImportError, OSError, ValueError) as e:
+                self.stdout.write(self.style.WARNING(f"{backend:<7} skipped: {e}"))
+                continue
+
+            # Chạy thử một lần để loại bỏ chi phí khởi tạo khỏi kết quả đo
+            model.predict(padded[:1], verbose=False)
+            rss_delta = rss_bytes() - before
+
+            single = []
+            for row in padded[:min(len(padded), 200)]:
+                started = time.perf_counter()
+                model.predict(row[None, :], verbose=False)
+                single.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            scores = np.concatenate([
+                np.asarray(model.predict(padded[i:i + batch_size], verbose=False), dtype=np.float32).reshape(-1)
+                for i in range(0, len(padded), batch_size)
+            ])
+            batch_seconds = time.perf_counter() - started
+
+            line = (
+                f"{backend:<7} load {load_seconds:6.2f}s  RSS +{rss_delta / 2 ** 20:7.1f} MiB  "
+                f"single p50 {1000 * np.percentile(single, 50):7.2f} ms  p95 {1000 * np.percentile(single, 95):7.2f} ms  "
+                f"batch{batch_size} {len(padded) / batch_seconds:8.0f} comments/sec"
+            )
+            if reference is None:
+                reference = (backend, scores)
+            else:
+                difference = float(np.max(np.abs(scores - reference[1])))
+                flips = int(np.sum((scores >= 0.4) != (reference[1] >= 0.4)))
+                line += f"  max |diff| vs {reference[0]} {difference:.2e}, label flips {flips}"
+                if difference > options['tolerance']:
+                    failures.append(f"{backend} lệch {difference:.2e} so với {reference[0]}")
+            self.stdout.write(line)
+
+        if failures:
+            raise CommandError('; '.join(failures))
@@ -0,0 +1,75 @@
+import multiprocessing
+import os
+import pickle
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_result.apps import AiResultConfig
+from ai_result.benchmarking import rss_bytes, sample_comments, time_call
+from ai_result.fast_tokenizer import VocabTokenizer
+
+
+def _load_pickle(path):
+    with open(path, 'rb') as file:
+        return pickle.load(file)
+
+
+LOADERS = {
+    'pickle': _load_pickle,
+    'vocab': VocabTokenizer,
+}
+
+
+def _measure_load(kind, path, results):
+    # Chạy trong tiến trình con để RSS tăng thêm chỉ gồm phần của tokenizer
+    before = rss_bytes()
+    tokenizer, elapsed = time_call(LOADERS[kind], path)
+    results.put((elapsed, rss_bytes() - before))
+    del tokenizer
+
+
+class Command(BaseCommand):
+    help = "So sánh tokenizer.pkl và tokenizer.vocab: thời gian nạp, RSS tăng thêm và tốc độ tokenize."
+
+    def add_arguments(self, parser):
+        models_dir = AiResultConfig.models_dir()
+        parser.add_argument('--pickle', default=os.path.join(models_dir, 'tokenizer.pkl'))
+        parser.add_argument('--vocab', default=os.path.join(models_dir, 'tokenizer.vocab'))
+        parser.add_argument('--count', type=int, default=20000, help="Số comment giả lập để đo tốc độ tokenize.")
+        parser.add_argument('--repeat', type=int, default=5, help="Số lần đo thời gian nạp.")
+
+    def handle(self, *args, **options):
+        paths = {'pickle': options['pickle'], 'vocab': options['vocab']}
+        for kind, path in paths.items():
+            if not os.path.exists(path):
+                raise CommandError(f"Không tìm thấy {path} (tạo tokenizer.vocab bằng manage.py convert_tokenizer).")
+
+        context = multiprocessing.get_context('fork')
+        for kind, path in paths.items():
+            load_times = []
+            rss_deltas = []
+            for _ in range(options['repeat']):
+                results = context.Queue()
+                process = context.Process(target=_measure_load, args=(kind, path, results))
+                process.start()
+                elapsed, rss_delta = results.get()
+                process.join()
+                load_times.append(elapsed)
+                rss_deltas.append(rss_delta)
+            self.stdout.write(
+                f"{kind:<6} file {os.path.getsize(path) / 1024:8.1f} KiB  "
+                f"load {1000 * min(load_times):7.2f} ms  RSS +{max(rss_deltas) / 1024:8.1f} KiB"
+            )
+
+        tokenizers = {kind: LOADERS[kind](path) for kind, path in paths.items()}
+        texts = sample_comments(tokenizers['pickle'], options['count'])
+        results = {}
+        for kind, tokenizer in tokenizers.items():
+            sequences, elapsed = time_call(tokenizer.texts_to_sequences, texts)
+            results[kind] = sequences
+            tokens = sum(len(sequence) for sequence in sequences)
+            self.stdout.write(f"{kind:<6} {tokens / elapsed:12.0f} tokens/sec  {len(texts) / elapsed:10.0f} comments/sec")
+
+        if results['pickle'] != results['vocab']:
+            raise CommandError("Kết quả tokenize của hai định dạng khác nhau.")
+        self.stdout.write(self.style.SUCCESS("Both formats produce identical sequences."))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_result.apps import AiResultConfig
+from ai_result.benchmarking import synthetic_frames, time_call
+from ai_result.utils import check_frames_for_violence
+
+
+class Command(BaseCommand):
+    help = "Đo tốc độ YOLO (frames/sec) trên frame giả lập với các batch size khác nhau."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 32])
+        parser.add_argument('--frames', type=int, default=96, help="Số frame giả lập cho mỗi lần đo.")
+        parser.add_argument('--width', type=int, default=640)
+        parser.add_argument('--height', type=int, default=360)
+
+    def handle(self, *args, **options):
+        model = AiResultConfig.get_yolo_model()
+        if model is None:
+            raise CommandError("YOLO model chưa được tải, không thể benchmark.")
+
+        frames = synthetic_frames(options['frames'], options['width'], options['height'])
+
+        # Chạy thử một lần để loại bỏ chi phí khởi tạo predictor khỏi kết quả đo
+        check_frames_for_violence(frames[:1], model, AiResultConfig.TARGET_CLASSES, AiResultConfig.CONFIDENCE_THRESHOLD)
+
+        self.stdout.write(f"{len(frames)} frames {options['width']}x{options['height']}")
+        for batch_size in options['batch_sizes']:
+            total = 0.0
+            for start in range(0, len(frames), batch_size):
+                batch = frames[start:start + batch_size]
+                _, elapsed = time_call(check_frames_for_violence, batch, model, AiResultConfig.TARGET_CLASSES, AiResultConfig.CONFIDENCE_THRESHOLD)
+                total += elapsed
+            self.stdout.write(f"batch_size={batch_size:>3}  {len(frames) / total:8.2f} frames/sec  ({total:.3f}s)")
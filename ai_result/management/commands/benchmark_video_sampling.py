@@ -0,0 +1,37 @@
+import cv2
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_result.apps import AiResultConfig
+from ai_result.utils import finish_scan_stats, new_scan_stats, sample_video_frames
+
+
+class Command(BaseCommand):
+    help = "So sánh số frame được suy luận / bỏ qua giữa các chế độ lấy mẫu video (không cần YOLO)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('videos', nargs='+', help="Đường dẫn các file video mẫu.")
+        parser.add_argument('--modes', nargs='+', default=['interval', 'scene', 'seek'])
+
+    def handle(self, *args, **options):
+        original_mode = AiResultConfig.VIDEO_SAMPLING_MODE
+        try:
+            for path in options['videos']:
+                for mode in options['modes']:
+                    video_capture = cv2.VideoCapture(path)
+                    if not video_capture.isOpened():
+                        raise CommandError(f"Không thể mở file video: {path}")
+
+                    AiResultConfig.VIDEO_SAMPLING_MODE = mode
+                    stats = new_scan_stats()
+                    try:
+                        stats['frames_inferred'] = sum(1 for _ in sample_video_frames(video_capture, stats))
+                    finally:
+                        video_capture.release()
+
+                    finish_scan_stats(stats)
+                    self.stdout.write(
+                        f"{path}  mode={mode:<8} decoded={stats['frames_read']:>6} "
+                        f"inferred={stats['frames_inferred']:>5} skipped={stats['frames_skipped']:>6}"
+                    )
+        finally:
+            AiResultConfig.VIDEO_SAMPLING_MODE = original_mode
@@ -0,0 +1,109 @@
+import os
+import time
+
+import cv2
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_result.apps import AiResultConfig
+from ai_result.benchmarking import synthetic_frames, time_call
+from ai_result.yolo_export import DEFAULT_IMGSZ, YOLO_FORMATS, yolo_artifact_path
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.bmp')
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mkv', '.webm')
+
+
+def load_fixture_frames(directory, frames_per_video=16):
+    """Frame BGR từ ảnh và video trong `directory`; mỗi video lấy `frames_per_video` frame cách đều."""
+    frames = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        extension = os.path.splitext(name)[1].lower()
+        if extension in IMAGE_EXTENSIONS:
+            frame = cv2.imread(path)
+            if frame is not None:
+                frames.append(frame)
+        elif extension in VIDEO_EXTENSIONS:
+            cap = cv2.VideoCapture(path)
+            total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            for i in range(frames_per_video):
+                cap.set(cv2.CAP_PROP_POS_FRAMES, i * total // frames_per_video)
+                ret, frame = cap.read()
+                if ret:
+                    frames.append(frame)
+            cap.release()
+    return frames
+
+
+def target_detections(model, frames, batch_size, imgsz):
+    """Số box thuộc TARGET_CLASSES (conf >= CONFIDENCE_THRESHOLD) trên mỗi frame."""
+    counts = []
+    for start in range(0, len(frames), batch_size):
+        results = model.predict(frames[start:start + batch_size], conf=AiResultConfig.CONFIDENCE_THRESHOLD, imgsz=imgsz, verbose=False)
+        for result in results:
+            counts.append(sum(
+                1 for box in result.boxes
+                if model.names[int(box.cls[0])] in AiResultConfig.TARGET_CLASSES
+            ))
+    return counts
+
+
+class Command(BaseCommand):
+    help = "So sánh tốc độ (frames/sec) và độ khớp kết quả phát hiện của YOLO pt/onnx/openvino so với best.pt."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--formats', nargs='+', choices=YOLO_FORMATS, default=list(YOLO_FORMATS))
+        parser.add_argument('--int8', action='store_true', help="Dùng bản INT8 của onnx/openvino.")
+        parser.add_argument('--fixtures', help="Thư mục ảnh/video mẫu; mặc định dùng frame giả lập.")
+        parser.add_argument('--frames', type=int, default=96, help="Số frame giả lập khi không có --fixtures.")
+        parser.add_argument('--batch-size', type=int, default=AiResultConfig.VIDEO_BATCH_SIZE)
+        parser.add_argument('--imgsz', type=int, default=AiResultConfig.YOLO_IMGSZ)
+        parser.add_argument('--min-agreement', type=float, default=0.95, help="Tỉ lệ frame có cùng kết luận bạo lực tối thiểu.")
+
+    def handle(self, *args, **options):
+        from ultralytics import YOLO
+
+        if options['fixtures']:
+            frames = load_fixture_frames(options['fixtures'])
+            if not frames:
+                raise CommandError(f"Không có ảnh/video nào trong {options['fixtures']}")
+        else:
+            frames = synthetic_frames(options['frames'])
+        batch_size = options['batch_size']
+        imgsz = options['imgsz']
+        if imgsz != DEFAULT_IMGSZ:
+            self.stdout.write(f"imgsz={imgsz} (best.pt được train ở {DEFAULT_IMGSZ})")
+        self.stdout.write(f"{len(frames)} frames, batch_size={batch_size}")
+
+        reference = None
+        failures = []
+        for model_format in options['formats']:
+            path = yolo_artifact_path(AiResultConfig.models_dir(), model_format, options['int8'])
+            label = model_format + ('-int8' if options['int8'] and model_format != 'pt' else '')
+            if not os.path.exists(path):
+                self.stdout.write(self.style.WARNING(f"{label:<13} skipped: {path} not found"))
+                continue
+            try:
+                model, load_seconds = time_call(YOLO, path, task='detect')
+                # Chạy thử một lần để loại bỏ chi phí khởi tạo predictor khỏi kết quả đo
+                model.predict(frames[:1], imgsz=imgsz, verbose=False)
+            except ImportError as e:
+                self.stdout.write(self.style.WARNING(f"{label:<13} skipped: {e}"))
+                continue
+
+            started = time.perf_counter()
+            counts = target_detections(model, frames, batch_size, imgsz)
+            seconds = time.perf_counter() - started
+
+            line = f"{label:<13} load {load_seconds:6.2f}s  {len(frames) / seconds:8.2f} frames/sec"
+            if reference is None:
+                reference = (label, counts)
+            else:
+                verdicts = sum((a > 0) == (b > 0) for a, b in zip(counts, reference[1])) / len(frames)
+                exact = sum(a == b for a, b in zip(counts, reference[1])) / len(frames)
+                line += f"  violent verdict agreement vs {reference[0]} {verdicts:.1%}, same box count {exact:.1%}"
+                if verdicts < options['min_agreement']:
+                    failures.append(f"{label} chỉ khớp {verdicts:.1%} kết luận với {reference[0]}")
+            self.stdout.write(line)
+
+        if failures:
+            raise CommandError('; '.join(failures))
@@ -0,0 +1,54 @@
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_result.apps import AiResultConfig
+from ai_result.benchmarking import sample_comments, time_call
+from ai_result.text_buckets import bucket_length, parse_buckets
+from ai_result.utils import predict_text_scores_bucketed, predict_text_scores_fixed
+
+
+class Command(BaseCommand):
+    help = "Kiểm tra điểm của text model khi pad theo bucket độ dài khớp với cách pad cố định 2138 token."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', help="File comment mẫu (mỗi dòng một comment). Mặc định sinh comment giả lập.")
+        parser.add_argument('--count', type=int, default=256, help="Số comment giả lập khi không có --file.")
+        parser.add_argument('--tolerance', type=float, default=1e-4, help="Sai lệch tuyệt đối tối đa cho phép.")
+
+    def handle(self, *args, **options):
+        if AiResultConfig.get_text_model() is None or AiResultConfig.get_text_tokenizer() is None:
+            raise CommandError("Text model hoặc tokenizer chưa được tải.")
+
+        if options['file']:
+            with open(options['file'], encoding='utf-8') as file:
+                texts = [line.strip() for line in file if line.strip()]
+        else:
+            texts = sample_comments(AiResultConfig.text_tokenizer, options['count'])
+
+        buckets = parse_buckets(AiResultConfig.TEXT_LENGTH_BUCKETS)
+        lengths = [len(sequence) for sequence in AiResultConfig.text_tokenizer.texts_to_sequences(texts)]
+        counts = {bucket: 0 for bucket in buckets}
+        for length in lengths:
+            counts[bucket_length(length, buckets)] += 1
+        self.stdout.write(f"{len(texts)} comments, buckets: {counts}")
+
+        # Chạy thử một lần mỗi cách để loại bỏ chi phí trace/khởi tạo khỏi kết quả đo
+        predict_text_scores_fixed(texts[:1])
+        predict_text_scores_bucketed(texts)
+
+        fixed, fixed_seconds = time_call(predict_text_scores_fixed, texts)
+        bucketed, bucketed_seconds = time_call(predict_text_scores_bucketed, texts)
+
+        differences = np.abs(fixed - bucketed)
+        worst = int(np.argmax(differences))
+        self.stdout.write(f"fixed 2138:  {fixed_seconds:.3f}s")
+        self.stdout.write(f"bucketed:    {bucketed_seconds:.3f}s  ({fixed_seconds / bucketed_seconds:.1f}x)")
+        self.stdout.write(f"max |diff| = {differences[worst]:.2e} (comment {worst}, {lengths[worst]} tokens)")
+        self.stdout.write(f"label mismatches at 0.4: {int(np.sum((fixed >= 0.4) != (bucketed >= 0.4)))}")
+
+        if differences[worst] > options['tolerance']:
+            raise CommandError(
+                f"Điểm khi pad theo bucket lệch {differences[worst]:.2e} > {options['tolerance']:.0e}: "
+                "model phụ thuộc vào độ dài padding, không nên bật AI_TEXT_LENGTH_BUCKETING."
+            )
+        self.stdout.write(self.style.SUCCESS("Bucketed predictions match the fixed-length path."))
@@ -0,0 +1,53 @@
+import os
+import pickle
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_result.apps import AiResultConfig
+from ai_result.benchmarking import sample_comments
+from ai_result.fast_tokenizer import VocabTokenizer, write_vocab
+
+
+class Command(BaseCommand):
+    help = "Chuyển tokenizer.pkl sang định dạng tokenizer.vocab (mmap) và kiểm tra kết quả tokenize giống hệt."
+
+    def add_arguments(self, parser):
+        models_dir = AiResultConfig.models_dir()
+        parser.add_argument('--input', default=os.path.join(models_dir, 'tokenizer.pkl'))
+        parser.add_argument('--output', default=os.path.join(models_dir, 'tokenizer.vocab'))
+        parser.add_argument('--file', help="File comment mẫu (mỗi dòng một comment) dùng để kiểm tra thêm.")
+        parser.add_argument('--count', type=int, default=5000, help="Số comment giả lập dùng để kiểm tra.")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['input'], 'rb') as file:
+                tokenizer = pickle.load(file)
+        except FileNotFoundError:
+            raise CommandError(f"Không tìm thấy tokenizer: {options['input']}")
+
+        # Ghi ra file tạm rồi mới thay thế, để worker đang chạy không đọc phải file ghi dở
+        temp_path = options['output'] + '.tmp'
+        try:
+            count = write_vocab(tokenizer, temp_path)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        texts = sample_comments(tokenizer, options['count'])
+        # Các trường hợp biên: dấu câu, khoảng trắng lạ, chữ hoa, dấu tổ hợp, từ ngoài từ vựng
+        texts += ['', '   ', 'Xin CHÀO!!! bạn\tơi\n', 'a\r\nb c', 'ngu...ngốc', 'Đồ NGU', 'xyzzyqwerty 123']
+        if options['file']:
+            with open(options['file'], encoding='utf-8') as file:
+                texts += [line.rstrip('\n') for line in file]
+
+        expected = tokenizer.texts_to_sequences(texts)
+        actual = VocabTokenizer(temp_path).texts_to_sequences(texts)
+        mismatches = [i for i, (a, b) in enumerate(zip(expected, actual)) if a != b]
+        if mismatches:
+            os.remove(temp_path)
+            raise CommandError(f"{len(mismatches)} comment tokenize khác với tokenizer.pkl, ví dụ: {texts[mismatches[0]]!r}")
+
+        os.replace(temp_path, options['output'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {count} words to {options['output']} ({os.path.getsize(options['output'])} bytes); "
+            f"{len(texts)} comments tokenize identically."
+        ))
@@ -0,0 +1,33 @@
+import importlib.util
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_result.apps import AiResultConfig
+from ai_result.text_backends import EXPORT_FILENAMES, export_path, export_text_model
+
+
+class Command(BaseCommand):
+    help = "Export text model (my_model.h5) sang TFLite hoặc ONNX để chạy bằng AI_TEXT_BACKEND=tflite/onnx."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(EXPORT_FILENAMES), required=True)
+        parser.add_argument('--input', default=os.path.join(AiResultConfig.models_dir(), 'my_model.h5'))
+        parser.add_argument('--output', help="Mặc định ai_result/models_data/my_model.<format>.")
+        parser.add_argument('--opset', type=int, default=13, help="ONNX opset.")
+
+    def handle(self, *args, **options):
+        import tensorflow as tf
+
+        if options['format'] == 'onnx' and importlib.util.find_spec('tf2onnx') is None:
+            raise CommandError("Export ONNX cần tf2onnx (pip install tf2onnx onnxruntime).")
+        if not os.path.exists(options['input']):
+            raise CommandError(f"Không tìm thấy text model: {options['input']}")
+        model = tf.keras.models.load_model(options['input'])
+        output = options['output'] or export_path(AiResultConfig.models_dir(), options['format'])
+        export_text_model(model, options['format'], output, opset=options['opset'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {options['input']} to {output} ({os.path.getsize(output) / 1024:.1f} KiB). "
+            f"Check parity with: manage.py benchmark_text_backends --backends keras {options['format']}"
+        ))
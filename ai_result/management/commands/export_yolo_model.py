@@ -0,0 +1,34 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_result.apps import AiResultConfig
+from ai_result.yolo_export import DEFAULT_IMGSZ, export_yolo, yolo_artifact_path
+
+
+class Command(BaseCommand):
+    help = "Export YOLO (best.pt) sang ONNX hoặc OpenVINO, có thể INT8, để chạy bằng AI_YOLO_FORMAT=onnx/openvino."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=['onnx', 'openvino'], required=True)
+        parser.add_argument('--int8', action='store_true', help="Lượng tử hóa INT8 (ONNX: động theo trọng số, OpenVINO: có hiệu chỉnh).")
+        parser.add_argument('--imgsz', type=int, default=DEFAULT_IMGSZ, help="Kích thước ảnh đầu vào, nên bằng AI_YOLO_IMGSZ.")
+        parser.add_argument('--data', help="File yaml bộ ảnh hiệu chỉnh cho OpenVINO INT8.")
+
+    def handle(self, *args, **options):
+        models_dir = AiResultConfig.models_dir()
+        source = yolo_artifact_path(models_dir, 'pt')
+        if not os.path.exists(source):
+            raise CommandError(f"Không tìm thấy YOLO model: {source}")
+
+        try:
+            output = export_yolo(models_dir, options['format'], options['int8'], options['imgsz'], options['data'])
+        except ImportError as e:
+            raise CommandError(f"Thiếu thư viện cho export {options['format']}: {e} (pip install onnx onnxruntime openvino).")
+
+        int8_flag = ' --int8' if options['int8'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {source} to {output}. Dùng với AI_YOLO_FORMAT={options['format']}"
+            f"{' AI_YOLO_INT8=true' if options['int8'] else ''} AI_YOLO_IMGSZ={options['imgsz']}. "
+            f"Check agreement with: manage.py benchmark_yolo_backends --formats pt {options['format']}{int8_flag}"
+        ))
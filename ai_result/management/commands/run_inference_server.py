@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_result.apps import AiResultConfig
+from ai_result.inference_server import run_inference_server
+
+
+class Command(BaseCommand):
+    help = "Chạy dịch vụ suy luận AI (text model + YOLO) cho các worker Django qua unix socket."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--socket', default=AiResultConfig.INFERENCE_SOCKET, help="Đường dẫn unix socket (mặc định AI_INFERENCE_SOCKET).")
+        parser.add_argument('--workers', type=int, default=1, help="Số tiến trình suy luận, mỗi tiến trình giữ một bản model.")
+
+    def handle(self, *args, **options):
+        socket_path = options['socket']
+        if not socket_path:
+            raise CommandError("Cần --socket hoặc biến môi trường AI_INFERENCE_SOCKET.")
+        self.stdout.write(f"Starting inference service on {socket_path} with {options['workers']} workers.")
+        try:
+            run_inference_server(socket_path, options['workers'])
+        except ValueError as e:
+            raise CommandError(str(e))
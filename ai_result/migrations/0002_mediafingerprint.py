@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-18 19:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_result', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phash', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('verdict', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fingerprints', to='ai_result.mediaverdict')),
+            ],
+        ),
+    ]
@@ -1,3 +1,37 @@
 from django.db import models
+import uuid
 
-# Create your models here.
+
+class MediaVerdict(models.Model):
+    """Kết quả kiểm duyệt đã biết cho một nội dung media, tra theo hash SHA-256 của file."""
+    STATUS_PENDING = 'pending'
+    STATUS_ACCEPTED = 'accepted'
+    STATUS_REJECTED = 'rejected'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_ACCEPTED, 'Accepted'),
+        (STATUS_REJECTED, 'Rejected'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False, unique=True)
+    content_hash = models.CharField(max_length=64, unique=True)
+    media_type = models.CharField(max_length=10, choices=[('image', 'Image'), ('video', 'Video')])
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    model_version = models.CharField(max_length=64, blank=True, default='')
+    media_url = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.media_type} {self.content_hash[:12]}: {self.status}"
+
+
+class MediaFingerprint(models.Model):
+    """Perceptual hash (dHash 64 bit) của ảnh hoặc một keyframe video, gắn với kết quả kiểm duyệt."""
+    verdict = models.ForeignKey(MediaVerdict, on_delete=models.CASCADE, related_name='fingerprints')
+    # dHash 64 bit không dấu, lưu dưới dạng số có dấu để vừa BigIntegerField
+    phash = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.phash & 0xFFFFFFFFFFFFFFFF:016x} -> {self.verdict_id}"
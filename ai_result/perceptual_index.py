@@ -0,0 +1,176 @@
+# ai_result/perceptual_index.py
+# Chỉ mục perceptual hash (dHash 64 bit) để nhận ra media gần giống media đã kiểm duyệt
+# (bị nén lại, đổi kích thước...), khi hash SHA-256 của file đã khác.
+# Tra cứu theo khoảng cách Hamming bằng multi-index hashing: chia hash thành (d + 1) đoạn,
+# hai hash cách nhau <= d bit chắc chắn trùng khớp hoàn toàn ở ít nhất một đoạn.
+
+import logging
+import threading
+
+import cv2
+import numpy as np
+
+from .apps import AiResultConfig
+from .models import MediaFingerprint, MediaVerdict
+
+logger = logging.getLogger(__name__)
+
+HASH_BITS = 64
+# Frame gần như một màu (màn hình đen, ảnh trơn) cho dHash vô nghĩa và dễ trùng nhau
+MIN_SIGNATURE_STD = 4.0
+# Video cần ít nhất số keyframe có nội dung này mới được so khớp gần đúng
+MIN_VIDEO_KEYFRAMES = 2
+
+
+def dhash(image):
+    """dHash 64 bit của ảnh BGR, hoặc None nếu ảnh gần như một màu."""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    if float(small.std()) < MIN_SIGNATURE_STD:
+        return None
+    bits = np.packbits(small[:, 1:] > small[:, :-1])
+    return int.from_bytes(bits.tobytes(), 'big')
+
+
+def video_keyframe_hashes(video_path, count):
+    """dHash của `count` keyframe rải đều trong video (bỏ qua frame một màu)."""
+    video_capture = cv2.VideoCapture(video_path)
+    try:
+        total_frames = int(video_capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        if total_frames <= 0:
+            return []
+        hashes = []
+        for i in range(count):
+            # Vị trí 1/(2n), 3/(2n)... tránh frame đầu/cuối thường là màn hình đen
+            video_capture.set(cv2.CAP_PROP_POS_FRAMES, (2 * i + 1) * total_frames // (2 * count))
+            ret, frame = video_capture.read()
+            if not ret:
+                continue
+            value = dhash(frame)
+            if value is not None:
+                hashes.append(value)
+        return hashes
+    finally:
+        video_capture.release()
+
+
+def to_signed(value):
+    return value - (1 << HASH_BITS) if value >= (1 << (HASH_BITS - 1)) else value
+
+
+def to_unsigned(value):
+    return value & ((1 << HASH_BITS) - 1)
+
+
+class MultiIndexHash:
+    """Chỉ mục Hamming trong bộ nhớ cho các hash 64 bit."""
+
+    def __init__(self, max_distance):
+        self.max_distance = max_distance
+        segments = max_distance + 1
+        # Chia 64 bit thành `segments` đoạn gần bằng nhau: (shift, mask)
+        base, extra = divmod(HASH_BITS, segments)
+        self._segments = []
+        shift = 0
+        for i in range(segments):
+            width = base + (1 if i < extra else 0)
+            self._segments.append((shift, (1 << width) - 1))
+            shift += width
+        self._tables = [{} for _ in self._segments]
+        self.size = 0
+
+    def add(self, value, item):
+        for table, (shift, mask) in zip(self._tables, self._segments):
+            table.setdefault((value >> shift) & mask, []).append((value, item))
+        self.size += 1
+
+    def search(self, value):
+        """Các item có hash cách `value` không quá max_distance bit: {item: khoảng cách nhỏ nhất}."""
+        found = {}
+        for table, (shift, mask) in zip(self._tables, self._segments):
+            for candidate, item in table.get((value >> shift) & mask, ()):
+                distance = (candidate ^ value).bit_count()
+                if distance <= self.max_distance and distance < found.get(item, HASH_BITS + 1):
+                    found[item] = distance
+        return found
+
+
+class PerceptualIndex:
+    """
+    Chỉ mục MediaFingerprint của tiến trình hiện tại. Nạp dần các bản ghi mới từ DB
+    (theo id tăng dần) trước mỗi lần tra cứu, nên các worker khác nhau vẫn thấy fingerprint của nhau.
+    """
+
+    def __init__(self, max_distance):
+        self._index = MultiIndexHash(max_distance)
+        self._last_id = 0
+        self._lock = threading.Lock()
+
+    def sync(self):
+        with self._lock:
+            rows = MediaFingerprint.objects.filter(id__gt=self._last_id).order_by('id').values_list('id', 'phash', 'verdict_id')
+            for row_id, phash, verdict_id in rows.iterator(chunk_size=10000):
+                self._index.add(to_unsigned(phash), verdict_id)
+                self._last_id = row_id
+
+    def find_verdict(self, hashes, media_type):
+        """
+        Kết quả kiểm duyệt (cùng phiên bản model) của media mà mọi hash trong `hashes` đều gần
+        với một fingerprint của nó. Ưu tiên kết quả bị từ chối. Trả về MediaVerdict hoặc None.
+        """
+        if not hashes:
+            return None
+        self.sync()
+
+        candidates = None
+        for value in hashes:
+            with self._lock:
+                near = set(self._index.search(value))
+            candidates = near if candidates is None else candidates & near
+            if not candidates:
+                return None
+
+        verdicts = MediaVerdict.objects.filter(
+            id__in=candidates,
+            media_type=media_type,
+            model_version=AiResultConfig.get_yolo_model_version(),
+            status__in=[MediaVerdict.STATUS_REJECTED, MediaVerdict.STATUS_ACCEPTED],
+        )
+        best = None
+        for verdict in verdicts:
+            if verdict.status == MediaVerdict.STATUS_REJECTED:
+                return verdict
+            best = verdict
+        return best
+
+
+def record_fingerprints(verdict, hashes):
+    """Lưu fingerprint cho một kết quả kiểm duyệt (thay thế fingerprint cũ của nó)."""
+    if not hashes:
+        return
+    MediaFingerprint.objects.filter(verdict=verdict).delete()
+    MediaFingerprint.objects.bulk_create(
+        [MediaFingerprint(verdict=verdict, phash=to_signed(value)) for value in hashes]
+    )
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_perceptual_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = PerceptualIndex(AiResultConfig.PERCEPTUAL_MAX_DISTANCE)
+    return _index
+
+
+def find_near_duplicate_verdict(hashes, media_type):
+    """Tìm kết quả kiểm duyệt của media gần giống. None nếu tắt tính năng hoặc không có."""
+    if not AiResultConfig.PERCEPTUAL_INDEX_ENABLED:
+        return None
+    if media_type == 'video' and len(hashes) < MIN_VIDEO_KEYFRAMES:
+        return None
+    return get_perceptual_index().find_verdict(hashes, media_type)
@@ -0,0 +1,14 @@
+from rest_framework.permissions import BasePermission
+
+from .apps import AiResultConfig
+
+
+class IsModerationAdmin(BasePermission):
+    """Người dùng đã đăng nhập và có id trong AI_ADMIN_USER_IDS (user.User không có is_staff)."""
+
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(
+            user and user.is_authenticated
+            and str(user.pk).lower() in AiResultConfig.ADMIN_USER_IDS
+        )
@@ -0,0 +1,106 @@
+# ai_result/speculative_upload.py
+# Upload "đầu cơ": bắt đầu tải media lên Cloudinary ngay khi bắt đầu chạy YOLO thay vì chờ kiểm duyệt xong.
+# Nếu media hợp lệ, URL được dùng luôn (độ trễ ~ max(suy luận, upload) thay vì tổng của hai);
+# nếu bị từ chối hoặc có lỗi, asset đã (hoặc sắp) tải lên sẽ bị xoá và vô hiệu hoá cache CDN.
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cloudinary.uploader
+
+from .apps import AiResultConfig
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_upload_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=max(1, AiResultConfig.SPECULATIVE_UPLOAD_WORKERS),
+                    thread_name_prefix="speculative-upload",
+                )
+    return _executor
+
+
+def destroy_asset(public_id, resource_type):
+    """Xoá asset khỏi Cloudinary và vô hiệu hoá bản cache trên CDN. Không raise."""
+    try:
+        cloudinary.uploader.destroy(public_id, resource_type=resource_type, invalidate=True)
+        logger.info(f"Destroyed speculative {resource_type} upload {public_id}.")
+    except Exception as e:
+        # Asset mồ côi chỉ tốn dung lượng, không được làm hỏng request
+        logger.error(f"Failed to destroy speculative {resource_type} upload {public_id}: {str(e)}")
+
+
+class SpeculativeUpload:
+    """
+    Chạy `upload_func(*args, **kwargs)` ở thread nền. Dùng như context manager:
+
+        with SpeculativeUpload(upload_video, path, resource_type='video', public_id=...) as upload:
+            ... kiểm duyệt, raise nếu bị từ chối ...
+            result = upload.result()
+
+    Thoát khỏi khối `with` mà chưa gọi result() (bị từ chối, lỗi, ngắt) sẽ huỷ upload.
+    """
+
+    def __init__(self, upload_func, *args, resource_type='image', public_id=None, **kwargs):
+        self.resource_type = resource_type
+        self.public_id = public_id
+        self._committed = False
+        self._started = time.monotonic()
+        self._finished = None
+        self._future = get_upload_executor().submit(self._run, upload_func, args, dict(kwargs, public_id=public_id))
+
+    def _run(self, upload_func, args, kwargs):
+        try:
+            return upload_func(*args, **kwargs)
+        finally:
+            self._finished = time.monotonic()
+
+    def result(self):
+        """Chờ upload xong và giữ lại asset. Trả về kết quả upload của Cloudinary."""
+        waited_from = time.monotonic()
+        upload_result = self._future.result()
+        self._committed = True
+
+        upload_seconds = self._finished - self._started
+        waited_seconds = time.monotonic() - waited_from
+        logger.info(
+            f"Speculative {self.resource_type} upload {self.public_id} took {upload_seconds:.3f}s, "
+            f"waited {waited_seconds:.3f}s after moderation (saved {upload_seconds - waited_seconds:.3f}s)."
+        )
+        return upload_result
+
+    def discard(self):
+        """Huỷ upload: bỏ khỏi hàng đợi nếu chưa chạy, nếu không thì xoá asset khi upload xong."""
+        if self._committed:
+            return
+        if self._future.cancel():
+            logger.info(f"Cancelled speculative {self.resource_type} upload {self.public_id} before it started.")
+            return
+        # Upload đang chạy: không chặn request, xoá asset ngay khi upload kết thúc
+        self._future.add_done_callback(self._destroy_when_done)
+
+    def _destroy_when_done(self, future):
+        if future.exception() is not None:
+            # Upload thất bại thì không có gì để xoá
+            return
+        # Dùng public_id Cloudinary trả về (có thể khác nếu Cloudinary tự đặt tên)
+        public_id = (future.result() or {}).get('public_id') or self.public_id
+        destroy_asset(public_id, self.resource_type)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if not self._committed:
+            self.discard()
+        return False
@@ -1,3 +1,1094 @@
+import importlib.util
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unicodedata
+import uuid
+from unittest import mock, skipUnless
+
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from user.models import User
+
+from .apps import AiResultConfig
+
+
+def create_user():
+    tag = uuid.uuid4().hex[:12]
+    return User.objects.create(username=f"user_{tag}", email=f"{tag}@test.invalid")
+
+
+class PredictTextViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = create_user()
+        admin_ids = mock.patch.object(AiResultConfig, 'ADMIN_USER_IDS', {str(self.admin.pk)})
+        admin_ids.start()
+        self.addCleanup(admin_ids.stop)
+
+    def post_texts(self, user, payload):
+        if user is not None:
+            self.client.force_authenticate(user)
+        with mock.patch('ai_result.views.text_model_ready', return_value=True), \
+                mock.patch('ai_result.views.score_comment_texts', side_effect=lambda texts: [0.9 if 'xấu' in text else 0.1 for text in texts]) as score:
+            response = self.client.post('/api/v1/predict_text/', payload, format='json')
+        return response, score
+
+    def test_admin_scores_batch(self):
+        response, score = self.post_texts(self.admin, {'texts': ['bình thường', 'lời lẽ xấu']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(score.call_count, 1)
+        results = response.json()['results']
+        self.assertEqual([item['prediction'] for item in results], [0, 1])
+        self.assertEqual([item['text'] for item in results], ['bình thường', 'lời lẽ xấu'])
+
+    def test_legacy_single_text(self):
+        response, _ = self.post_texts(self.admin, {'text': 'lời lẽ xấu'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['prediction'], 1)
+
+    def test_non_admin_is_forbidden(self):
+        response, score = self.post_texts(create_user(), {'texts': ['bình thường']})
+        self.assertEqual(response.status_code, 403)
+        score.assert_not_called()
+
+    def test_anonymous_is_rejected(self):
+        response, score = self.post_texts(None, {'texts': ['bình thường']})
+        self.assertIn(response.status_code, (401, 403))
+        score.assert_not_called()
+
+
+class ModerationStatsViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = create_user()
+        admin_ids = mock.patch.object(AiResultConfig, 'ADMIN_USER_IDS', {str(self.admin.pk)})
+        admin_ids.start()
+        self.addCleanup(admin_ids.stop)
+
+    def test_admin_reads_cache_counters(self):
+        self.client.force_authenticate(self.admin)
+        with mock.patch.object(AiResultConfig, 'TEXT_CACHE_ENABLED', True):
+            response = self.client.get('/api/v1/moderation_stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('hits', response.json()['text_cache'])
+        self.assertIn('misses', response.json()['text_cache'])
+
+    def test_non_admin_is_forbidden(self):
+        self.client.force_authenticate(create_user())
+        self.assertEqual(self.client.get('/api/v1/moderation_stats/').status_code, 403)
+
+
+def jpeg_bytes(width=64, height=48, value=90):
+    import cv2
+    import numpy as np
+    ok, buffer = cv2.imencode('.jpg', np.full((height, width, 3), value, dtype=np.uint8))
+    return buffer.tobytes()
+
+
+class MediaUploadTestCase(TestCase):
+    """Chạy process_and_upload_* với Cloudinary giả, không có cache và YOLO luôn trả về "không bạo lực"."""
+
+    speculative = False
+
+    def setUp(self):
+        from . import utils
+
+        self.uploaded = []
+        self.destroyed = []
+        patches = [
+            mock.patch.object(AiResultConfig, 'MEDIA_VERDICT_CACHE_ENABLED', False),
+            mock.patch.object(AiResultConfig, 'PERCEPTUAL_INDEX_ENABLED', False),
+            mock.patch.object(AiResultConfig, 'SPECULATIVE_UPLOAD_ENABLED', self.speculative),
+            mock.patch.object(utils, 'yolo_ready', return_value=True),
+            mock.patch.object(utils, 'check_frame_for_violence', side_effect=self.is_violent),
+            mock.patch('cloudinary.uploader.upload', side_effect=self.fake_upload),
+            mock.patch('cloudinary.uploader.destroy', side_effect=self.fake_destroy),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def is_violent(self, frame, *args):
+        return False
+
+    def fake_upload(self, source, public_id=None, **kwargs):
+        self.uploaded.append(public_id)
+        return {'url': f"http://res.cloudinary.invalid/demo/image/upload/v1/{public_id}.jpg", 'public_id': public_id}
+
+    def fake_destroy(self, public_id, **kwargs):
+        self.destroyed.append(public_id)
+        return {'result': 'ok'}
+
+
+class UploadPublicIdTests(MediaUploadTestCase):
+    def test_same_file_name_gets_distinct_assets(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        from .utils import process_and_upload_image
+
+        urls = [
+            process_and_upload_image(SimpleUploadedFile('image.jpg', jpeg_bytes(), content_type='image/jpeg'))
+            for _ in range(2)
+        ]
+        self.assertEqual(len(set(self.uploaded)), 2)
+        self.assertNotEqual(urls[0], urls[1])
+        self.assertTrue(all(public_id.endswith('_image') for public_id in self.uploaded))
+
+
+class SpeculativeUploadTests(MediaUploadTestCase):
+    speculative = True
+
+    def setUp(self):
+        super().setUp()
+        self.upload_started = threading.Event()
+
+    def fake_upload(self, source, public_id=None, **kwargs):
+        self.upload_started.set()
+        return super().fake_upload(source, public_id, **kwargs)
+
+    def is_violent(self, frame, *args):
+        # Chỉ kết luận sau khi upload đầu cơ đã bắt đầu, để asset bị từ chối thật sự tồn tại và phải bị xoá
+        self.upload_started.wait(5)
+        return frame.mean() > 200
+
+    def test_rejection_destroys_only_its_own_upload(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        from .utils import ViolentContentError, process_and_upload_image
+
+        process_and_upload_image(SimpleUploadedFile('image.jpg', jpeg_bytes(), content_type='image/jpeg'))
+        published = self.uploaded[0]
+
+        self.upload_started.clear()
+        with self.assertRaises(ViolentContentError):
+            process_and_upload_image(SimpleUploadedFile('image.jpg', jpeg_bytes(value=250), content_type='image/jpeg'))
+        # Asset bị từ chối được xoá ở thread upload khi upload kết thúc
+        deadline = time.monotonic() + 5
+        while not self.destroyed and time.monotonic() < deadline:
+            time.sleep(0.01)
+        rejected = self.uploaded[1]
+        self.assertNotEqual(published, rejected)
+        self.assertEqual(self.destroyed, [rejected])
+
+
+class CheckMediaViewTests(MediaUploadTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.admin = create_user()
+        admin_ids = mock.patch.object(AiResultConfig, 'ADMIN_USER_IDS', {str(self.admin.pk)})
+        admin_ids.start()
+        self.addCleanup(admin_ids.stop)
+        ready = mock.patch('ai_result.views.yolo_ready', return_value=True)
+        ready.start()
+        self.addCleanup(ready.stop)
+
+    def post_image(self, user, value=90):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        self.client.force_authenticate(user)
+        upload = SimpleUploadedFile('image.jpg', jpeg_bytes(value=value), content_type='image/jpeg')
+        return self.client.post('/api/v1/check_image/', {'file': upload}, format='multipart')
+
+    def is_violent(self, frame, *args):
+        return frame.mean() > 200
+
+    def test_requires_moderation_admin(self):
+        self.assertEqual(self.post_image(None).status_code, 401)
+        self.assertEqual(self.post_image(create_user()).status_code, 403)
+        self.assertEqual(self.uploaded, [])
+
+    def test_admin_check_image_goes_through_upload_pipeline(self):
+        response = self.post_image(self.admin)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.uploaded), 1)
+        self.assertEqual(response.json()['image_url'], f"http://res.cloudinary.invalid/demo/image/upload/v1/{self.uploaded[0]}.jpg")
+
+        response = self.post_image(self.admin, value=250)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('violent', response.json()['message'])
+        self.assertEqual(len(self.uploaded), 1)
+
+    def test_admin_check_video_uses_process_and_upload_video(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        self.client.force_authenticate(self.admin)
+        upload = SimpleUploadedFile('clip.mp4', b'\0' * 64, content_type='video/mp4')
+        with mock.patch('ai_result.views.process_and_upload_video', return_value='http://x.invalid/upload/v1/a.mp4') as process:
+            response = self.client.post('/api/v1/check_video/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['video_url'], 'http://x.invalid/upload/v1/a.mp4')
+        process.assert_called_once()
+
+
+HAS_TENSORFLOW = importlib.util.find_spec('tensorflow') is not None
+TEXT_VOCAB_SIZE = 100
+
+
+class WordTokenizer:
+    """Tokenizer tối giản cho model thử: từ "w<n>" -> chỉ số n."""
+
+    def texts_to_sequences(self, texts):
+        return [[int(word[1:]) for word in text.split()] for text in texts]
+
+
+def tiny_text_model(seed=0, mask_zero=True):
+    """
+    Text model nhỏ cùng kiểu input với model thật (chuỗi token int, pad 0 ở cuối).
+    mask_zero=False: token 0 có embedding riêng nên điểm phụ thuộc vào độ dài padding.
+    """
+    import tensorflow as tf
+
+    tf.keras.utils.set_random_seed(seed)
+    inputs = tf.keras.Input(shape=(None,), dtype='int32')
+    x = tf.keras.layers.Embedding(TEXT_VOCAB_SIZE, 8, mask_zero=mask_zero)(inputs)
+    x = tf.keras.layers.GlobalAveragePooling1D()(x)
+    x = tf.keras.layers.Dense(8, activation='relu')(x)
+    outputs = tf.keras.layers.Dense(1, activation='sigmoid')(x)
+    return tf.keras.Model(inputs, outputs)
+
+
+def synthetic_texts(lengths, seed=0):
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    return [' '.join(f"w{token}" for token in rng.integers(1, TEXT_VOCAB_SIZE, length)) for length in lengths]
+
+
+@skipUnless(HAS_TENSORFLOW, "TensorFlow is not installed.")
+class TextBucketingParityTests(TestCase):
+    """manage.py check_text_bucketing là điều kiện để bật AI_TEXT_LENGTH_BUCKETING: nó phải từ chối model phụ thuộc độ dài."""
+
+    # Độ dài ở hai phía của mỗi biên bucket 16/64/256/2138, và một chuỗi dài hơn 2138 (bị cắt)
+    LENGTHS = (1, 15, 16, 17, 63, 64, 65, 255, 256, 257, 2137, 2138, 2200)
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.masked_model = tiny_text_model()
+        cls.unmasked_model = tiny_text_model(mask_zero=False)
+
+    def setUp(self):
+        patches = [
+            mock.patch.object(AiResultConfig, '_text_loaded', True),
+            mock.patch.object(AiResultConfig, 'text_model', self.masked_model),
+            mock.patch.object(AiResultConfig, 'text_tokenizer', WordTokenizer()),
+            mock.patch.object(AiResultConfig, 'TEXT_LENGTH_BUCKETS', '16,64,256,2138'),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.comments_path = os.path.join(directory, 'comments.txt')
+        with open(self.comments_path, 'w', encoding='utf-8') as file:
+            file.write('\n'.join(synthetic_texts(self.LENGTHS)))
+
+    def check_bucketing(self, model):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        with mock.patch.object(AiResultConfig, 'text_model', model):
+            call_command('check_text_bucketing', file=self.comments_path, stdout=StringIO())
+
+    def test_gate_accepts_length_invariant_model(self):
+        self.check_bucketing(self.masked_model)
+
+    def test_gate_refuses_length_dependent_model(self):
+        from django.core.management.base import CommandError
+
+        with self.assertRaisesMessage(CommandError, 'AI_TEXT_LENGTH_BUCKETING'):
+            self.check_bucketing(self.unmasked_model)
+
+    def test_bucket_order_is_preserved_in_mixed_batches(self):
+        from .utils import predict_text_scores_bucketed
+
+        texts = synthetic_texts((300, 3, 70, 3, 20), seed=1)
+        together = predict_text_scores_bucketed(texts)
+        alone = [float(predict_text_scores_bucketed([text])[0]) for text in texts]
+        for index, score in enumerate(alone):
+            self.assertAlmostEqual(float(together[index]), score, delta=1e-5)
+
+
+HAS_TF2ONNX = importlib.util.find_spec('tf2onnx') is not None and importlib.util.find_spec('onnxruntime') is not None
+
+
+class ExportedTextBackendParityMixin:
+    """So sánh điểm của bản export (manage.py export_text_model) với model keras gốc trên cùng các chuỗi token."""
+
+    backend = None
+    tolerance = 1e-4
+
+    @classmethod
+    def setUpClass(cls):
+        import tempfile
+
+        from .text_backends import export_path, export_text_model, load_text_backend
+
+        super().setUpClass()
+        cls.models_dir = tempfile.mkdtemp()
+        cls.model = tiny_text_model()
+        export_text_model(cls.model, cls.backend, export_path(cls.models_dir, cls.backend))
+        cls.exported = load_text_backend(cls.backend, cls.models_dir)
+
+    @classmethod
+    def tearDownClass(cls):
+        import shutil
+
+        shutil.rmtree(cls.models_dir, ignore_errors=True)
+        super().tearDownClass()
+
+    def assertMatchesKeras(self, lengths, maxlen, seed=0):
+        import numpy as np
+
+        from .text_buckets import pad_sequences_post
+
+        sequences = WordTokenizer().texts_to_sequences(synthetic_texts(lengths, seed))
+        padded = pad_sequences_post(sequences, maxlen=maxlen)
+        expected = np.asarray(self.model.predict(padded, verbose=False)).reshape(-1)
+        actual = np.asarray(self.exported.predict(padded)).reshape(-1)
+        self.assertEqual(actual.shape, expected.shape)
+        np.testing.assert_allclose(actual, expected, atol=self.tolerance)
+
+    def test_matches_keras_across_bucket_lengths(self):
+        for maxlen in (16, 64, 256, 2138):
+            with self.subTest(maxlen=maxlen):
+                self.assertMatchesKeras([1, maxlen // 2, maxlen], maxlen)
+
+    def test_matches_keras_across_batch_sizes(self):
+        for rows in (1, 3, 8, 70):
+            with self.subTest(rows=rows):
+                self.assertMatchesKeras([5 + row % 11 for row in range(rows)], 16, seed=rows)
+
+
+@skipUnless(HAS_TENSORFLOW, "TensorFlow is not installed.")
+class TFLiteTextBackendTests(ExportedTextBackendParityMixin, TestCase):
+    backend = 'tflite'
+
+    def test_interpreters_are_reused_per_padded_shape(self):
+        import numpy as np
+
+        from .text_backends import TFLiteTextBackend, load_text_backend
+
+        self.assertEqual([TFLiteTextBackend.padded_batch(rows) for rows in (1, 2, 3, 5, 33, 64, 100)], [1, 2, 4, 8, 64, 64, 64])
+        backend = load_text_backend('tflite', self.models_dir)
+        for rows in (3, 4, 3, 4, 2, 3):
+            backend.predict(np.ones((rows, 16), dtype=np.int32))
+        # (4, 16) cho 3 và 4 dòng, (2, 16) cho 2 dòng: chỉ 2 lần allocate thay vì mỗi lần đổi batch
+        self.assertEqual(backend.allocations, 2)
+
+
+@skipUnless(HAS_TENSORFLOW and HAS_TF2ONNX, "TensorFlow, tf2onnx or onnxruntime is not installed.")
+class OnnxTextBackendTests(ExportedTextBackendParityMixin, TestCase):
+    backend = 'onnx'
+
+
+@skipUnless(HAS_TENSORFLOW, "TensorFlow (keras Tokenizer) chưa được cài")
+class VocabTokenizerTests(TestCase):
+    CORPUS = [
+        'Xin chào các bạn, hôm nay trời đẹp quá!',
+        'Đồ ngu ngốc... đừng nói nữa',
+        'bạn ơi bạn à, chào chào chào',
+        'e-mail: test@example.com; giá 100$ (rẻ)',
+        'Cà phê sữa đá ngon tuyệt vời',
+    ]
+    TEXTS = [
+        '', '   ', 'Xin CHÀO!!! bạn\tơi\n', 'a\r\nb c', 'ngu...ngốc', 'Đồ NGU', 'xyzzy 123 chào',
+        # NFD: dấu tổ hợp tách rời, không trùng với từ NFC trong từ vựng
+        unicodedata.normalize('NFD', 'Xin chào các bạn, Đồ ngu ngốc'),
+        '"cà"phê\'sữa\'[đá]{ngon}|tuyệt~vời`',
+    ]
+
+    def vocab_tokenizer(self, tokenizer):
+        from .fast_tokenizer import VocabTokenizer, write_vocab
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = os.path.join(directory, 'tokenizer.vocab')
+        write_vocab(tokenizer, path)
+        return VocabTokenizer(path)
+
+    def test_matches_keras_tokenizer(self):
+        from keras.src.legacy.preprocessing.text import Tokenizer
+
+        for options in ({}, {'num_words': 12}, {'oov_token': '<OOV>'}, {'num_words': 12, 'oov_token': '<OOV>'}):
+            with self.subTest(**options):
+                tokenizer = Tokenizer(**options)
+                tokenizer.fit_on_texts(self.CORPUS)
+                texts = self.CORPUS + self.TEXTS
+                self.assertEqual(self.vocab_tokenizer(tokenizer).texts_to_sequences(texts), tokenizer.texts_to_sequences(texts))
+
+
+class VideoPipelineTests(TestCase):
+    """scan_frames_pipelined với bộ giải mã giả (generator frame) và model giả (check_frame_batch)."""
+
+    FRAME_BYTES = 1000
+
+    def frames(self, count=None):
+        import itertools
+        import numpy as np
+
+        self.decoded = 0
+        for index in itertools.count() if count is None else range(count):
+            self.decoded += 1
+            yield index, np.zeros(self.FRAME_BYTES, dtype=np.uint8)
+
+    def scan(self, sampled_frames, violent=(), delay=0.0, **kwargs):
+        from . import video_pipeline
+
+        self.checked = []
+
+        def check_frame_batch(batch_indices, batch_frames, stats=None):
+            self.checked.append(list(batch_indices))
+            time.sleep(delay)
+            hits = [index for index in batch_indices if index in violent]
+            return hits[0] if hits else None
+
+        with mock.patch.object(video_pipeline, 'check_frame_batch', side_effect=check_frame_batch):
+            return video_pipeline.scan_frames_pipelined(sampled_frames, 4, **kwargs)
+
+    def assertDecoderStopped(self):
+        self.assertFalse(any(thread.name == 'video-decoder' for thread in threading.enumerate()))
+
+    def test_batches_are_checked_in_frame_order(self):
+        self.assertIsNone(self.scan(self.frames(10)))
+        self.assertEqual(self.checked, [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]])
+
+        # Frame bạo lực đầu tiên theo thứ tự, không phải frame của batch nào xong trước
+        self.assertEqual(self.scan(self.frames(20), violent={6, 13}), 6)
+        self.assertEqual(self.checked, [[0, 1, 2, 3], [4, 5, 6, 7]])
+        self.assertDecoderStopped()
+
+    def test_queued_bytes_stay_within_budget(self):
+        stats = {}
+        budget = 2 * 4 * self.FRAME_BYTES
+        self.scan(self.frames(40), delay=0.005, queue_depth=8, max_queued_bytes=budget, stats=stats)
+        self.assertEqual(len(self.checked), 10)
+        self.assertGreater(stats['peak_queued_bytes'], 0)
+        self.assertLessEqual(stats['peak_queued_bytes'], budget)
+
+    def test_decoder_stops_when_consumer_stops_early(self):
+        # Video "vô hạn": thread giải mã chỉ dừng được nhờ stop_event
+        self.assertEqual(self.scan(self.frames(), violent={1}, queue_depth=2), 1)
+        self.assertDecoderStopped()
+        self.assertLess(self.decoded, 100)
+
+    def test_consumer_error_stops_decoder(self):
+        from . import video_pipeline
+
+        with mock.patch.object(video_pipeline, 'check_frame_batch', side_effect=RuntimeError('inference failed')):
+            with self.assertRaises(RuntimeError):
+                video_pipeline.scan_frames_pipelined(self.frames(), 4, queue_depth=2)
+        self.assertDecoderStopped()
+
+    def test_decoder_error_is_raised(self):
+        def broken_frames():
+            yield from self.frames(5)
+            raise ValueError('corrupt stream')
+
+        with self.assertRaises(ValueError):
+            self.scan(broken_frames())
+        # Batch dở dang của frame 4 bị bỏ cùng lỗi giải mã
+        self.assertEqual(self.checked, [[0, 1, 2, 3]])
+        self.assertDecoderStopped()
+
+
+class MicroBatcherTests(TestCase):
+    def batcher(self, predict_batch=None, **kwargs):
+        from .text_batcher import MicroBatcher
+
+        self.batches = []
+
+        def record(texts):
+            self.batches.append(list(texts))
+            return [len(text) / 10 for text in texts]
+
+        return MicroBatcher(predict_batch or record, **kwargs)
+
+    def test_concurrent_texts_share_one_predict(self):
+        batcher = self.batcher(max_batch_size=3, max_wait_ms=200)
+        futures = [batcher.submit('x' * i) for i in range(1, 8)]
+        self.assertEqual([future.result(timeout=5) for future in futures], [i / 10 for i in range(1, 8)])
+        self.assertEqual([len(batch) for batch in self.batches], [3, 3, 1])
+        self.assertEqual(batcher.stats()['full_batches'], 2)
+
+    def test_partial_batch_is_flushed_after_max_wait(self):
+        batcher = self.batcher(max_batch_size=32, max_wait_ms=50)
+        started = time.monotonic()
+        self.assertEqual(batcher.score('abc', timeout=5), 0.3)
+        self.assertGreaterEqual(time.monotonic() - started, 0.04)
+        self.assertEqual(self.batches, [['abc']])
+
+    def test_worker_survives_failing_predict(self):
+        calls = []
+
+        def predict_batch(texts):
+            calls.append(texts)
+            if len(calls) == 1:
+                raise RuntimeError('model crashed')
+            if len(calls) == 2:
+                return []  # Sai kích thước: không được làm chết thread nền
+            return [0.5] * len(texts)
+
+        batcher = self.batcher(predict_batch, max_wait_ms=0)
+        with self.assertRaises(RuntimeError):
+            batcher.score('a', timeout=5)
+        with self.assertRaises(IndexError):
+            batcher.score('b', timeout=5)
+        self.assertEqual(batcher.score('c', timeout=5), 0.5)
+
+    def test_score_comment_text_falls_back_when_batcher_times_out(self):
+        from . import utils
+
+        stuck = mock.Mock()
+        stuck.score.side_effect = TimeoutError
+        with mock.patch.object(AiResultConfig, 'TEXT_CACHE_ENABLED', False), \
+                mock.patch.object(AiResultConfig, 'TEXT_BATCHING_ENABLED', True), \
+                mock.patch.object(AiResultConfig, 'TEXT_BATCH_TIMEOUT', 0.25), \
+                mock.patch.object(utils, 'get_text_batcher', return_value=stuck), \
+                mock.patch.object(utils, 'predict_text_scores', return_value=[0.7]) as predict:
+            self.assertAlmostEqual(utils.score_comment_text('một comment'), 0.7)
+        stuck.score.assert_called_once_with('một comment', timeout=0.25)
+        predict.assert_called_once_with(['một comment'])
+
+
+class TextVerdictCacheTests(TestCase):
+    def test_normalized_keys_lru_and_ttl(self):
+        from .text_cache import TextVerdictCache, normalize_comment_text
+
+        self.assertEqual(
+            normalize_comment_text(unicodedata.normalize('NFD', '  Đồ   NGỐC ')),
+            normalize_comment_text('đồ ngốc'),
+        )
+        cache = TextVerdictCache(max_entries=2, ttl_seconds=60)
+        cache.put('a', 0.1)
+        cache.put('b', 0.2)
+        self.assertEqual(cache.get('a'), 0.1)
+        cache.put('c', 0.3)  # 'b' ít được dùng gần đây nhất
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+        with mock.patch('ai_result.text_cache.time.monotonic', return_value=time.monotonic() + 61):
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['expirations'], 1)
+
+
+class VerdictCacheTests(TestCase):
+    URL = 'http://res.cloudinary.invalid/demo/image/upload/v1/a_image.jpg'
+
+    def setUp(self):
+        patches = [
+            mock.patch.object(AiResultConfig, 'MEDIA_VERDICT_CACHE_ENABLED', True),
+            mock.patch.object(AiResultConfig, 'get_yolo_model_version', return_value='v1'),
+            mock.patch('ai_result.verdict_cache.POLL_INTERVAL_SECONDS', 0.01),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.digest = uuid.uuid4().hex
+
+    def moderate(self, moderate):
+        from .verdict_cache import moderate_with_cache
+
+        return moderate_with_cache(self.digest, 'image', moderate)
+
+    def verdict(self):
+        from .models import MediaVerdict
+
+        return MediaVerdict.objects.get(content_hash=self.digest)
+
+    def test_accepted_verdict_is_reused(self):
+        moderate = mock.Mock(return_value=self.URL)
+        self.assertEqual(self.moderate(moderate), (self.URL, True))
+        self.assertEqual(self.moderate(moderate), (self.URL, False))
+        moderate.assert_called_once()
+        self.assertEqual((self.verdict().status, self.verdict().media_url), ('accepted', self.URL))
+
+    def test_rejected_verdict_is_reused(self):
+        from .verdict_cache import ViolentContentError
+
+        moderate = mock.Mock(side_effect=ViolentContentError('violent'))
+        for _ in range(2):
+            with self.assertRaises(ViolentContentError):
+                self.moderate(moderate)
+        moderate.assert_called_once()
+        self.assertEqual(self.verdict().status, 'rejected')
+
+    def test_technical_error_releases_the_claim(self):
+        from .models import MediaVerdict
+
+        with self.assertRaises(ValueError):
+            self.moderate(mock.Mock(side_effect=ValueError('Cloudinary unavailable')))
+        self.assertFalse(MediaVerdict.objects.filter(content_hash=self.digest).exists())
+        self.assertEqual(self.moderate(mock.Mock(return_value=self.URL)), (self.URL, True))
+
+    def test_stale_pending_claim_is_taken_over(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        from .models import MediaVerdict
+
+        MediaVerdict.objects.create(content_hash=self.digest, media_type='image', model_version='v1')
+        MediaVerdict.objects.filter(content_hash=self.digest).update(
+            updated_at=timezone.now() - timedelta(seconds=AiResultConfig.MEDIA_VERDICT_PENDING_TIMEOUT + 60),
+        )
+        self.assertEqual(self.moderate(mock.Mock(return_value=self.URL)), (self.URL, True))
+        self.assertEqual(self.verdict().status, 'accepted')
+
+    def test_fresh_pending_claim_is_not_overwritten(self):
+        from .models import MediaVerdict
+
+        MediaVerdict.objects.create(content_hash=self.digest, media_type='image', model_version='v1')
+        moderate = mock.Mock(return_value=self.URL)
+        with mock.patch.object(AiResultConfig, 'MEDIA_VERDICT_WAIT_SECONDS', 0.05):
+            self.assertEqual(self.moderate(moderate), (self.URL, True))
+        moderate.assert_called_once_with([])
+        self.assertEqual(self.verdict().status, 'pending')
+
+    def test_new_model_version_rechecks(self):
+        from .models import MediaVerdict
+
+        MediaVerdict.objects.create(content_hash=self.digest, media_type='image', status='rejected', model_version='v0')
+        self.assertEqual(self.moderate(mock.Mock(return_value=self.URL)), (self.URL, True))
+        self.assertEqual((self.verdict().status, self.verdict().model_version), ('accepted', 'v1'))
+
+
+class PerceptualIndexTests(TestCase):
+    def test_multi_index_matches_brute_force(self):
+        import random
+
+        from .perceptual_index import HASH_BITS, MultiIndexHash
+
+        rng = random.Random(0)
+        for max_distance in (0, 3, 6, 10):
+            with self.subTest(max_distance=max_distance):
+                index = MultiIndexHash(max_distance)
+                values = [rng.getrandbits(HASH_BITS) for _ in range(300)]
+                # Các hash lệch vài bit so với hash đã có, để có cả kết quả trong và ngoài ngưỡng
+                for value in values[:100]:
+                    for _ in range(3):
+                        flipped = value
+                        for bit in rng.sample(range(HASH_BITS), rng.randint(0, max_distance + 2)):
+                            flipped ^= 1 << bit
+                        values.append(flipped)
+                for item, value in enumerate(values):
+                    index.add(value, item)
+
+                for query in values[:50] + [rng.getrandbits(HASH_BITS) for _ in range(50)]:
+                    expected = {
+                        item: (value ^ query).bit_count()
+                        for item, value in enumerate(values)
+                        if (value ^ query).bit_count() <= max_distance
+                    }
+                    self.assertEqual(index.search(query), expected)
+
+    def test_near_duplicate_of_rejected_image_is_found(self):
+        import cv2
+        import numpy as np
+
+        from .models import MediaVerdict
+        from .perceptual_index import PerceptualIndex, dhash, record_fingerprints
+
+        rng = np.random.default_rng(0)
+        image = cv2.resize(rng.integers(0, 256, (8, 8, 3), dtype=np.uint8), (256, 256), interpolation=cv2.INTER_LINEAR)
+        verdict = MediaVerdict.objects.create(content_hash='a' * 64, media_type='image', status='rejected', model_version='v1')
+        record_fingerprints(verdict, [dhash(image)])
+
+        # Ảnh nén lại với chất lượng thấp hơn và thu nhỏ: SHA-256 khác nhưng dHash gần như giữ nguyên
+        _, encoded = cv2.imencode('.jpg', cv2.resize(image, (200, 200)), [cv2.IMWRITE_JPEG_QUALITY, 40])
+        near = dhash(cv2.imdecode(encoded, cv2.IMREAD_COLOR))
+        index = PerceptualIndex(max_distance=6)
+        with mock.patch.object(AiResultConfig, 'get_yolo_model_version', return_value='v1'):
+            self.assertEqual(index.find_verdict([near], 'image'), verdict)
+            self.assertIsNone(index.find_verdict([near], 'video'))
+            self.assertIsNone(index.find_verdict([near ^ 0xFFFF], 'image'))
+
+
+class InferenceServiceTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.socket_dir = os.path.join(directory, 'inference')
+        self.socket_path = os.path.join(self.socket_dir, 'ai.sock')
+
+    def serve(self, requests):
+        """Phục vụ `requests` kết nối trong một thread (thay cho tiến trình worker của dịch vụ)."""
+        from .inference_server import open_listener, serve_connection
+
+        listener = open_listener(self.socket_path)
+        self.addCleanup(listener.close)
+        self.rejected = []
+
+        def run():
+            for _ in range(requests):
+                try:
+                    connection = listener.accept()
+                except Exception as e:
+                    self.rejected.append(e)
+                    continue
+                serve_connection(connection)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        socket = mock.patch.object(AiResultConfig, 'INFERENCE_SOCKET', self.socket_path)
+        socket.start()
+        self.addCleanup(socket.stop)
+        return thread
+
+    def test_round_trip(self):
+        import numpy as np
+
+        from . import inference_server
+        from .inference_client import remote_check_frames, remote_predict_text
+
+        def detect(frames, model, target_classes, confidence_threshold):
+            # Frame đọc từ shared memory của client phải giữ nguyên nội dung
+            self.assertEqual(target_classes, ['violence'])
+            return next((i for i, frame in enumerate(frames) if frame.mean() > 200), None)
+
+        frames = [np.full((4, 6, 3), value, dtype=np.uint8) for value in (10, 250, 30)]
+        thread = self.serve(2)
+        # Client và "server" cùng tiến trình: resource tracker chỉ được bỏ đăng ký vùng nhớ một lần (khi client unlink)
+        with mock.patch.object(inference_server, 'resource_tracker'), \
+                mock.patch.object(AiResultConfig, 'get_yolo_model', return_value=None), \
+                mock.patch.object(inference_server, 'detect_violent_frame', side_effect=detect), \
+                mock.patch.object(inference_server, 'predict_text_scores', return_value=np.array([0.25, 0.75])):
+            self.assertEqual(remote_check_frames(frames, ['violence'], 0.5, timeout=10), 1)
+            np.testing.assert_allclose(remote_predict_text(['a', 'b'], timeout=10), [0.25, 0.75])
+        thread.join(timeout=10)
+        self.assertEqual(self.rejected, [])
+
+    def test_wrong_authkey_is_rejected(self):
+        from django.test import override_settings
+
+        from .inference_client import InferenceServiceError, ping
+
+        thread = self.serve(1)
+        with override_settings(SECRET_KEY='not-the-server-key'):
+            with self.assertRaises(InferenceServiceError):
+                ping(timeout=5)
+        thread.join(timeout=10)
+        self.assertEqual(len(self.rejected), 1)
+
+    def test_socket_is_private(self):
+        import stat
+
+        from .inference_server import open_listener
+
+        listener = open_listener(self.socket_path)
+        self.addCleanup(listener.close)
+        self.assertEqual(stat.S_IMODE(os.stat(self.socket_dir).st_mode), 0o700)
+        self.assertEqual(stat.S_IMODE(os.stat(self.socket_path).st_mode), 0o600)
+
+    def test_refuses_shared_directory(self):
+        from .inference_server import open_listener
+
+        os.makedirs(self.socket_dir, mode=0o700)
+        os.chmod(self.socket_dir, 0o770)
+        with self.assertRaises(ValueError):
+            open_listener(self.socket_path)
+        self.assertFalse(os.path.exists(self.socket_path))
+
+
+def mp4_head(duration_seconds, timescale=1000, version=0):
+    """Đầu file MP4 "faststart": ftyp, rồi moov chứa mvhd với độ dài cho trước."""
+    import struct
+
+    ftyp = struct.pack('>I4s4sI4s', 20, b'ftyp', b'isom', 512, b'isom')
+    if version == 1:
+        mvhd_body = struct.pack('>B3xQQIQ', 1, 0, 0, timescale, int(duration_seconds * timescale))
+    else:
+        mvhd_body = struct.pack('>B3xIIII', 0, 0, 0, timescale, int(duration_seconds * timescale))
+    mvhd = struct.pack('>I4s', 8 + len(mvhd_body), b'mvhd') + mvhd_body
+    moov = struct.pack('>I4s', 8 + len(mvhd), b'moov') + mvhd
+    return ftyp + moov + struct.pack('>I4s', 8, b'mdat')
+
+
+class ModerationUploadHandlerTests(TestCase):
+    def setUp(self):
+        from django.test import override_settings
+
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.temp_dir = os.path.join(media_root, 'temp_files')
+
+    def receive(self, data, name='upload.bin', chunk_size=64 * 1024, request=None):
+        """Cho handler nhận `data` theo từng chunk như MultiPartParser. Trả về (request, file đã nhận)."""
+        from types import SimpleNamespace
+
+        from django.core.files.uploadhandler import StopFutureHandlers
+
+        from .upload_handler import ModerationUploadHandler
+
+        request = request or SimpleNamespace()
+        handler = ModerationUploadHandler(request)
+        with self.assertRaises(StopFutureHandlers):
+            handler.new_file('media_file', name, 'application/octet-stream', len(data))
+        for start in range(0, len(data), chunk_size):
+            handler.receive_data_chunk(data[start:start + chunk_size], start)
+        return request, handler.file_complete(len(data))
+
+    def assertRejected(self, data, message, **kwargs):
+        from types import SimpleNamespace
+
+        from django.core.files.uploadhandler import StopUpload
+
+        request = SimpleNamespace()
+        with self.assertRaises(StopUpload):
+            self.receive(data, request=request, **kwargs)
+        self.assertIn(message, request.upload_rejection)
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+    def test_accepts_image_by_magic_bytes(self):
+        import hashlib
+
+        data = jpeg_bytes()
+        _, uploaded = self.receive(data, name='photo.png', chunk_size=100)
+        self.assertEqual((uploaded.media_type, uploaded.content_type), ('image', 'image/jpeg'))
+        self.assertEqual(uploaded.content_hash, hashlib.sha256(data).hexdigest())
+        with open(uploaded.temporary_file_path(), 'rb') as file:
+            self.assertEqual(file.read(), data)
+        uploaded.close()
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+    def test_rejects_unknown_magic_bytes(self):
+        self.assertRejected(b'<html><script>alert(1)</script></html>' * 10, 'Loai file', name='photo.jpg')
+
+    def test_rejects_oversized_image_while_receiving(self):
+        with mock.patch.object(AiResultConfig, 'UPLOAD_MAX_IMAGE_MB', 1):
+            self.assertRejected(b'\xff\xd8\xff' + b'\0' * (2 * 1024 * 1024), 'dung lượng')
+
+    def test_rejects_long_video_from_mvhd(self):
+        from .upload_handler import mp4_duration
+
+        self.assertAlmostEqual(mp4_duration(mp4_head(12.5)), 12.5)
+        self.assertAlmostEqual(mp4_duration(mp4_head(12.5, version=1)), 12.5)
+        with mock.patch.object(AiResultConfig, 'UPLOAD_MAX_VIDEO_SECONDS', 60):
+            self.assertRejected(mp4_head(61) + b'\0' * 1024, 'Video dài')
+            _, uploaded = self.receive(mp4_head(30) + b'\0' * 1024, name='clip.mp4')
+        self.assertEqual((uploaded.media_type, uploaded.content_type), ('video', 'video/mp4'))
+        uploaded.close()
+
+
+class ImageDecodeTests(TestCase):
+    def test_jpeg_dimensions_read_from_header(self):
+        from .image_decode import jpeg_dimensions
+
+        self.assertEqual(jpeg_dimensions(jpeg_bytes(width=640, height=480)), (640, 480))
+        self.assertIsNone(jpeg_dimensions(b'\x89PNG\r\n\x1a\n' + b'\0' * 32))
+        self.assertIsNone(jpeg_dimensions(b'\xff\xd8\xff'))
+
+    def test_large_jpeg_decoded_at_reduced_resolution(self):
+        from .image_decode import decode_image_reduced
+
+        # 2560 // 4 = 640 vẫn >= 640 nhưng 2560 // 8 thì không: giải mã ở 1/4
+        image = decode_image_reduced(jpeg_bytes(width=2560, height=1440), 640)
+        self.assertEqual(image.shape, (360, 640, 3))
+        # Ảnh đã nhỏ hơn target: giải mã đầy đủ
+        self.assertEqual(decode_image_reduced(jpeg_bytes(width=320, height=200), 640).shape, (200, 320, 3))
+        self.assertIsNone(decode_image_reduced(b'', 640))
+        self.assertIsNone(decode_image_reduced(b'not an image', 640))
+
+    def test_letterbox_pads_to_square(self):
+        from .image_decode import LETTERBOX_COLOR, decode_image_for_model
+
+        image = decode_image_for_model(jpeg_bytes(width=1000, height=500, value=200), 320)
+        self.assertEqual(image.shape, (320, 320, 3))
+        self.assertEqual(tuple(image[0, 0]), LETTERBOX_COLOR)
+        self.assertTrue(abs(int(image[160, 160, 0]) - 200) <= 3)
+        # Ảnh nhỏ hơn target giữ nguyên kích thước
+        self.assertEqual(decode_image_for_model(jpeg_bytes(width=100, height=80), 320).shape, (80, 100, 3))
+
+
+class FakeYolo:
+    """Model YOLO giả: frame có giá trị pixel >= 200 là bạo lực. Ghi lại từng lần gọi predict."""
+
+    names = {0: 'person', 1: 'knife'}
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, frames, **kwargs):
+        from types import SimpleNamespace
+
+        self.calls.append((len(frames), kwargs))
+        results = []
+        for frame in frames:
+            class_id = 1 if frame.max() >= 200 else 0
+            box = SimpleNamespace(cls=[class_id], conf=[0.9])
+            results.append(SimpleNamespace(boxes=[box]))
+        return results
+
+
+class BatchedYoloTests(TestCase):
+    def test_one_predict_call_per_batch(self):
+        import numpy as np
+
+        from .utils import detect_violent_frame
+
+        model = FakeYolo()
+        frames = [np.full((8, 8, 3), value, dtype=np.uint8) for value in (10, 20, 250, 30, 255)]
+        self.assertEqual(detect_violent_frame(frames, model, ['knife'], 0.5), 2)
+        self.assertEqual(len(model.calls), 1)
+        self.assertEqual(model.calls[0][0], 5)
+        self.assertEqual(model.calls[0][1]['imgsz'], AiResultConfig.YOLO_IMGSZ)
+        self.assertIsNone(detect_violent_frame(frames[:2], model, ['knife'], 0.5))
+        self.assertIsNone(detect_violent_frame(frames, None, ['knife'], 0.5))
+
+    def test_empty_batch_skips_inference(self):
+        from .utils import check_frames_for_violence
+
+        model = FakeYolo()
+        self.assertIsNone(check_frames_for_violence([], model, ['knife'], 0.5))
+        self.assertEqual(model.calls, [])
+
+
+class FakeCapture:
+    """cv2.VideoCapture giả trên danh sách frame, ghi lại số frame được giải mã và các lần seek."""
+
+    def __init__(self, frames, frame_count=None, fps=30.0):
+        import cv2
+
+        self.frames = frames
+        self.position = 0
+        self.decoded = 0
+        self.seeks = []
+        self.properties = {
+            cv2.CAP_PROP_FRAME_COUNT: len(frames) if frame_count is None else frame_count,
+            cv2.CAP_PROP_FPS: fps,
+        }
+
+    def get(self, prop):
+        return self.properties.get(prop, 0)
+
+    def set(self, prop, value):
+        self.seeks.append(int(value))
+        self.position = int(value)
+        return True
+
+    def grab(self):
+        if self.position >= len(self.frames):
+            return False
+        self.position += 1
+        return True
+
+    def retrieve(self):
+        self.decoded += 1
+        return True, self.frames[self.position - 1]
+
+    def read(self):
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+
+def solid_frames(*values):
+    import numpy as np
+
+    return [np.full((48, 64, 3), value, dtype=np.uint8) for value in values]
+
+
+class SceneChangeSamplingTests(TestCase):
+    def test_samples_on_scene_change_and_max_gap(self):
+        from .utils import iter_scene_change_frames, new_scan_stats
+
+        stats = new_scan_stats()
+        capture = FakeCapture(solid_frames(0, 0, 0, 0, 0, 200, 200, 0))
+        sampled = [index for index, _ in iter_scene_change_frames(capture, 0.3, max_gap=3, stats=stats)]
+        # 1: frame đầu, 4: chạm max_gap, 6 và 8: đổi cảnh
+        self.assertEqual(sampled, [1, 4, 6, 8])
+        self.assertEqual(stats['frames_read'], 8)
+
+    def test_min_gap_suppresses_close_changes(self):
+        from .utils import iter_scene_change_frames
+
+        capture = FakeCapture(solid_frames(0, 200, 0, 200, 0, 200, 0, 200))
+        sampled = [index for index, _ in iter_scene_change_frames(capture, 0.3, max_gap=10, min_gap=3)]
+        self.assertEqual(sampled, [1, 4, 7])
+
+
+class SeekSamplingTests(TestCase):
+    def test_coarse_to_fine_order_is_a_permutation(self):
+        from .utils import coarse_to_fine_order
+
+        self.assertEqual(coarse_to_fine_order(8), [0, 4, 2, 6, 1, 5, 3, 7])
+        for count in (1, 3, 7, 10, 33):
+            self.assertEqual(sorted(coarse_to_fine_order(count)), list(range(count)))
+
+    def test_decodes_at_most_max_frames(self):
+        from .utils import finish_scan_stats, iter_seek_frames, new_scan_stats
+
+        stats = new_scan_stats()
+        capture = FakeCapture(solid_frames(*range(100)))
+        sampled = [index for index, _ in iter_seek_frames(capture, max_frames=4, interval=10, stats=stats)]
+        self.assertEqual(sampled, [1, 51, 26, 76])
+        self.assertEqual(capture.seeks, [0, 50, 25, 75])
+        self.assertEqual(capture.decoded, 4)
+        stats['frames_inferred'] = len(sampled)
+        self.assertEqual(finish_scan_stats(stats)['frames_skipped'], 96)
+
+    def test_interval_caps_short_videos(self):
+        from .utils import iter_seek_frames
+
+        capture = FakeCapture(solid_frames(*range(20)))
+        self.assertEqual(len(list(iter_seek_frames(capture, max_frames=50, interval=10))), 2)
+
+    def test_unknown_frame_count_falls_back_to_grab(self):
+        from .utils import iter_seek_frames
+
+        capture = FakeCapture(solid_frames(*range(20)), frame_count=0)
+        sampled = [index for index, _ in iter_seek_frames(capture, max_frames=2, interval=3)]
+        self.assertEqual(sampled, [3, 6])
+        self.assertEqual((capture.decoded, capture.seeks), (2, []))
+
+
+class YoloExportTests(TestCase):
+    def test_artifact_paths(self):
+        from .yolo_export import yolo_artifact_path
+
+        self.assertEqual(yolo_artifact_path('/m'), '/m/best.pt')
+        self.assertEqual(yolo_artifact_path('/m', 'pt', int8=True), '/m/best.pt')
+        self.assertEqual(yolo_artifact_path('/m', 'onnx'), '/m/best.onnx')
+        self.assertEqual(yolo_artifact_path('/m', 'onnx', int8=True), '/m/best_int8.onnx')
+        self.assertEqual(yolo_artifact_path('/m', 'openvino', int8=True), '/m/best_int8_openvino_model')
+        with self.assertRaises(ValueError):
+            yolo_artifact_path('/m', 'tensorrt')
+
+    def test_model_version_follows_artifact_and_imgsz(self):
+        from .apps import file_digest
+
+        models_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, models_dir)
+        with open(os.path.join(models_dir, 'best.pt'), 'wb') as file:
+            file.write(b'pt weights')
+        openvino_dir = os.path.join(models_dir, 'best_int8_openvino_model')
+        os.makedirs(openvino_dir)
+        for name, data in (('model.xml', b'<net/>'), ('model.bin', b'int8 weights')):
+            with open(os.path.join(openvino_dir, name), 'wb') as file:
+                file.write(data)
+
+        versions = {}
+        with mock.patch.object(AiResultConfig, 'models_dir', return_value=models_dir), \
+                mock.patch.object(AiResultConfig, 'YOLO_INT8', True):
+            for model_format, imgsz in (('pt', 640), ('openvino', 640), ('openvino', 320)):
+                with mock.patch.object(AiResultConfig, 'YOLO_FORMAT', model_format), \
+                        mock.patch.object(AiResultConfig, 'YOLO_IMGSZ', imgsz):
+                    path = AiResultConfig.yolo_model_path()
+                    versions[model_format, imgsz] = AiResultConfig._yolo_version(path)
 
-# Create your tests here.
+        self.assertTrue(versions['pt', 640].startswith(file_digest(os.path.join(models_dir, 'best.pt'))))
+        self.assertTrue(versions['openvino', 640].startswith(file_digest(openvino_dir)))
+        self.assertEqual(len(set(versions.values())), 3)
+        self.assertTrue(versions['openvino', 320].endswith('-i320'))
+        with self.assertRaises(FileNotFoundError):
+            file_digest(os.path.join(models_dir, 'best.onnx'))
@@ -0,0 +1,149 @@
+# ai_result/text_backends.py
+# Backend suy luận cho text model trên CPU. 'keras' chạy my_model.h5 như cũ; 'tflite' và 'onnx' chạy
+# bản export (manage.py export_text_model) với chi phí mỗi lần gọi và bộ nhớ nhỏ hơn nhiều so với
+# keras Model.predict. Các backend có cùng giao diện predict(x, verbose=False) như model keras,
+# nên phần còn lại của ai_result không cần biết backend nào đang chạy.
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TEXT_BACKENDS = ('keras', 'tflite', 'onnx')
+EXPORT_FILENAMES = {
+    'tflite': 'my_model.tflite',
+    'onnx': 'my_model.onnx',
+}
+
+
+class TFLiteTextBackend:
+    """
+    Chạy my_model.tflite bằng TFLite interpreter (tflite_runtime nếu có, nếu không thì tf.lite).
+    resize_tensor_input + allocate_tensors tốn kém, nên mỗi shape (batch, độ dài) có interpreter riêng đã allocate
+    sẵn: batch được pad lên luỹ thừa của 2 (tối đa MAX_BATCH) để số shape khác nhau nhỏ và cố định, interpreter
+    ít dùng nhất bị bỏ khi có quá MAX_INTERPRETERS shape.
+    """
+
+    name = 'tflite'
+    MAX_BATCH = 64
+    MAX_INTERPRETERS = 16
+
+    def __init__(self, path, num_threads=1):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+        self._path = path
+        self._num_threads = num_threads
+        self._interpreter_class = Interpreter
+        # Chưa allocate_tensors(): shape mặc định (1, 1) có thể không hợp lệ với model, chờ shape thật ở predict()
+        details = Interpreter(model_path=path, num_threads=num_threads)
+        self._input = details.get_input_details()[0]
+        self._output = details.get_output_details()[0]
+        self._interpreters = OrderedDict()
+        self.allocations = 0
+        # Interpreter không an toàn khi nhiều thread cùng gọi
+        self._lock = threading.Lock()
+
+    @classmethod
+    def padded_batch(cls, rows):
+        """Batch size thật sự chạy cho `rows` dòng: luỹ thừa của 2 nhỏ nhất >= rows, tối đa MAX_BATCH."""
+        return min(cls.MAX_BATCH, 1 << max(0, rows - 1).bit_length())
+
+    def _interpreter_for(self, shape):
+        interpreter = self._interpreters.get(shape)
+        if interpreter is not None:
+            self._interpreters.move_to_end(shape)
+            return interpreter
+        interpreter = self._interpreter_class(model_path=self._path, num_threads=self._num_threads)
+        interpreter.resize_tensor_input(self._input['index'], shape)
+        interpreter.allocate_tensors()
+        self.allocations += 1
+        self._interpreters[shape] = interpreter
+        if len(self._interpreters) > self.MAX_INTERPRETERS:
+            self._interpreters.popitem(last=False)
+        return interpreter
+
+    def predict(self, x, verbose=False):
+        x = np.asarray(x, dtype=self._input['dtype'])
+        outputs = []
+        with self._lock:
+            for start in range(0, len(x), self.MAX_BATCH):
+                chunk = x[start:start + self.MAX_BATCH]
+                batch = self.padded_batch(len(chunk))
+                if batch != len(chunk):
+                    # Dòng pad toàn 0 (như padding token), kết quả của chúng bị bỏ
+                    chunk = np.concatenate([chunk, np.zeros((batch - len(chunk),) + chunk.shape[1:], dtype=chunk.dtype)])
+                interpreter = self._interpreter_for(chunk.shape)
+                interpreter.set_tensor(self._input['index'], chunk)
+                interpreter.invoke()
+                outputs.append(np.array(interpreter.get_tensor(self._output['index']))[:min(self.MAX_BATCH, len(x) - start)])
+        return np.concatenate(outputs) if outputs else np.zeros((0, 1), dtype=np.float32)
+
+
+class OnnxTextBackend:
+    """Chạy my_model.onnx bằng ONNX Runtime trên CPU (cần cài onnxruntime)."""
+
+    name = 'onnx'
+
+    def __init__(self, path, num_threads=1):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = num_threads
+        self._session = onnxruntime.InferenceSession(path, sess_options=options, providers=['CPUExecutionProvider'])
+        self._input = self._session.get_inputs()[0]
+        self._dtype = np.int64 if self._input.type == 'tensor(int64)' else (np.float32 if 'float' in self._input.type else np.int32)
+
+    def predict(self, x, verbose=False):
+        # InferenceSession.run an toàn khi gọi từ nhiều thread
+        return self._session.run(None, {self._input.name: np.asarray(x, dtype=self._dtype)})[0]
+
+
+def export_text_model(model, backend, output, opset=13):
+    """Export keras text model sang TFLite hoặc ONNX tại `output` (độ dài chuỗi động, dùng được với bucketing)."""
+    import tensorflow as tf
+
+    signature = [tf.TensorSpec([None, None], tf.int32, name='tokens')]
+    if backend == 'tflite':
+        from tensorflow.python.framework.convert_to_constants import convert_variables_to_constants_v2
+
+        function = tf.function(lambda tokens: model(tokens, training=False), input_signature=signature)
+        # Đóng băng trọng số vào graph; nếu giữ dạng variable, interpreter không đọc được trọng số
+        frozen = convert_variables_to_constants_v2(function.get_concrete_function())
+        converter = tf.lite.TFLiteConverter.from_concrete_functions([frozen])
+        # Op chưa có bản TFLite thuần (một số biến thể LSTM/GRU) được chạy bằng op TensorFlow
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS, tf.lite.OpsSet.SELECT_TF_OPS]
+        with open(output, 'wb') as file:
+            file.write(converter.convert())
+    elif backend == 'onnx':
+        import tf2onnx
+
+        tf2onnx.convert.from_keras(model, input_signature=signature, opset=opset, output_path=output)
+    else:
+        raise ValueError(f"Unknown export format '{backend}', expected one of {', '.join(EXPORT_FILENAMES)}.")
+
+
+def export_path(models_dir, backend):
+    return os.path.join(models_dir, EXPORT_FILENAMES[backend])
+
+
+def is_exported_backend(model):
+    return isinstance(model, (TFLiteTextBackend, OnnxTextBackend))
+
+
+def load_text_backend(backend, models_dir, num_threads=1):
+    """Tải bản export của text model cho backend 'tflite' hoặc 'onnx'."""
+    if backend not in EXPORT_FILENAMES:
+        raise ValueError(f"Unknown text backend '{backend}', expected one of {', '.join(TEXT_BACKENDS)}.")
+    path = export_path(models_dir, backend)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"'{path}' not found, create it with manage.py export_text_model --format {backend}")
+    if backend == 'tflite':
+        return TFLiteTextBackend(path, num_threads)
+    return OnnxTextBackend(path, num_threads)
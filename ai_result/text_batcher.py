@@ -0,0 +1,137 @@
+# ai_result/text_batcher.py
+# Micro-batching cho text model: các comment được gửi đồng thời từ nhiều request thread chờ tối đa
+# vài mili giây rồi được chấm điểm chung trong một lần predict, thay vì mỗi comment một lần predict.
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from .apps import AiResultConfig
+
+logger = logging.getLogger(__name__)
+
+# Ghi log thống kê sau mỗi chừng này batch
+STATS_LOG_EVERY = 1000
+
+
+class MicroBatcher:
+    """
+    Gom các lời gọi score(text) đồng thời thành batch cho `predict_batch(texts)`.
+    predict_batch trả về một điểm cho mỗi text (hoặc None nếu model chưa sẵn sàng).
+    Một thread nền lấy item đầu tiên trong hàng đợi, chờ thêm tối đa `max_wait_ms`
+    hoặc tới khi đủ `max_batch_size` item, rồi chạy predict một lần.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=32, max_wait_ms=5.0):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._full_batches = 0
+        self._queue_wait = 0.0
+        self._thread = threading.Thread(target=self._run, name="text-micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, text):
+        """Đưa text vào hàng đợi. Trả về Future chứa điểm của text."""
+        future = Future()
+        self._queue.put((text, future, time.monotonic()))
+        return future
+
+    def score(self, text, timeout=None):
+        """Điểm của text; raise TimeoutError nếu chưa có kết quả sau `timeout` giây."""
+        return self.submit(text).result(timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                # Hết thời gian chờ vẫn lấy nốt các item đã có sẵn trong hàng đợi
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.monotonic()
+            texts = [text for text, _, _ in batch]
+            try:
+                scores = self.predict_batch(texts)
+                results = [None] * len(batch) if scores is None else [float(scores[i]) for i in range(len(batch))]
+            except Exception as e:
+                # Mọi lỗi (kể cả kết quả predict sai kích thước) chỉ làm hỏng batch này, thread vẫn chạy tiếp
+                logger.error(f"Text micro-batch of {len(batch)} failed: {e}")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result(result)
+            self._record(batch, started)
+
+    def _record(self, batch, started):
+        with self._stats_lock:
+            self._batches += 1
+            self._items += len(batch)
+            self._full_batches += len(batch) == self.max_batch_size
+            self._queue_wait += sum(started - enqueued for _, _, enqueued in batch)
+            should_log = self._batches % STATS_LOG_EVERY == 0
+        if should_log:
+            logger.info(f"Text micro-batcher stats: {self.stats()}")
+
+    def stats(self):
+        """Số batch, số text, kích thước batch trung bình, tỉ lệ lấp đầy batch và thời gian chờ trung bình."""
+        with self._stats_lock:
+            batches = self._batches
+            items = self._items
+            return {
+                'batches': batches,
+                'items': items,
+                'avg_batch_size': items / batches if batches else 0.0,
+                'fill_rate': items / (batches * self.max_batch_size) if batches else 0.0,
+                'full_batches': self._full_batches,
+                'avg_queue_wait_ms': 1000.0 * self._queue_wait / items if items else 0.0,
+            }
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_text_batcher(predict_batch):
+    """MicroBatcher dùng chung của tiến trình (tạo ở lần gọi đầu tiên)."""
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = MicroBatcher(
+                    predict_batch,
+                    max_batch_size=AiResultConfig.TEXT_BATCH_SIZE,
+                    max_wait_ms=AiResultConfig.TEXT_BATCH_WAIT_MS,
+                )
+    return _batcher
+
+
+def text_batcher_stats():
+    """Thống kê của batcher dùng chung, rỗng nếu chưa có comment nào đi qua batcher."""
+    return _batcher.stats() if _batcher is not None else {}
+
+
+def _reset_after_fork():
+    # Thread nền không tồn tại trong tiến trình con sau fork: tạo batcher mới khi cần
+    global _batcher, _batcher_lock
+    _batcher = None
+    _batcher_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
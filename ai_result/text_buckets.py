@@ -0,0 +1,80 @@
+# ai_result/text_buckets.py
+# Padding động theo nhóm độ dài cho text model: thay vì pad mọi comment tới 2138 token,
+# mỗi comment được pad tới bucket nhỏ nhất đủ chứa nó (mặc định 16/64/256/2138).
+# Mỗi bucket có một tf.function riêng với input_signature cố định, nên chỉ trace một lần cho mỗi bucket.
+
+import logging
+import threading
+
+import numpy as np
+
+from .text_backends import is_exported_backend
+
+logger = logging.getLogger(__name__)
+
+_predictors = {}
+_predictors_lock = threading.Lock()
+
+
+def parse_buckets(value):
+    """'16,64,256,2138' -> (16, 64, 256, 2138)."""
+    return tuple(sorted({int(part) for part in value.split(',') if part.strip()}))
+
+
+def bucket_length(length, buckets):
+    """Bucket nhỏ nhất >= length; chuỗi dài hơn bucket lớn nhất bị cắt về bucket lớn nhất."""
+    for bucket in buckets:
+        if length <= bucket:
+            return bucket
+    return buckets[-1]
+
+
+def pad_sequences_post(sequences, maxlen, value=0):
+    """
+    Giống keras pad_sequences(maxlen=maxlen, padding='post', truncating='post') với dtype int32,
+    viết bằng numpy để đường xử lý text không phải import TensorFlow.
+    """
+    padded = np.full((len(sequences), maxlen), value, dtype=np.int32)
+    for row, sequence in enumerate(sequences):
+        sequence = sequence[:maxlen]
+        padded[row, :len(sequence)] = sequence
+    return padded
+
+
+def bucket_predictor(model, bucket):
+    """tf.function gọi `model` với input shape (batch, bucket), dùng lại giữa các request."""
+    import tensorflow as tf
+
+    key = (id(model), bucket)
+    predictor = _predictors.get(key)
+    if predictor is None:
+        with _predictors_lock:
+            predictor = _predictors.get(key)
+            if predictor is None:
+                predictor = tf.function(
+                    lambda x: model(x, training=False),
+                    input_signature=[tf.TensorSpec(shape=[None, bucket], dtype=tf.int32)],
+                )
+                _predictors[key] = predictor
+    return predictor
+
+
+def predict_bucketed(model, sequences, buckets):
+    """
+    Chấm điểm các chuỗi token (chưa pad) theo từng bucket độ dài.
+    Trả về mảng điểm float32 theo đúng thứ tự `sequences`.
+    """
+    groups = {}
+    for index, sequence in enumerate(sequences):
+        groups.setdefault(bucket_length(len(sequence), buckets), []).append(index)
+
+    scores = np.zeros(len(sequences), dtype=np.float32)
+    for bucket, indices in groups.items():
+        padded = pad_sequences_post([sequences[i] for i in indices], maxlen=bucket)
+        if is_exported_backend(model):
+            # TFLite/ONNX: input được resize theo shape của batch, không cần tf.function
+            prediction = model.predict(padded)
+        else:
+            prediction = bucket_predictor(model, bucket)(padded)
+        scores[indices] = np.asarray(prediction, dtype=np.float32).reshape(len(indices), -1)[:, 0]
+    return scores
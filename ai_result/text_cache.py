@@ -0,0 +1,90 @@
+# ai_result/text_cache.py
+# Cache LRU/TTL điểm kiểm duyệt comment: spam và comment emoji lặp lại cùng một chuỗi hàng nghìn lần,
+# không cần tokenize và chạy text model lại cho từng lần. Khóa cache là nội dung đã chuẩn hóa
+# (Unicode NFC, chữ thường, gộp khoảng trắng). Cache nằm trong bộ nhớ tiến trình và text model chỉ được tải
+# một lần mỗi tiến trình, nên thay model (khởi động lại worker) cũng bắt đầu với cache rỗng; khi model nằm
+# ở inference_server, điểm cũ sau khi server đổi model chỉ còn được dùng tối đa AI_TEXT_CACHE_TTL giây.
+
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from .apps import AiResultConfig
+
+
+def normalize_comment_text(text):
+    """
+    Chuẩn hóa comment làm khóa cache: dấu tiếng Việt dạng tổ hợp (NFD, một số bộ gõ/hệ điều hành)
+    và dạng dựng sẵn (NFC) về cùng một dạng, chữ thường, khoảng trắng liên tiếp gộp làm một.
+    """
+    return ' '.join(unicodedata.normalize('NFC', text).lower().split())
+
+
+class TextVerdictCache:
+    """LRU có giới hạn số phần tử và thời gian sống, an toàn khi dùng từ nhiều thread."""
+
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_text_cache():
+    """Cache dùng chung của tiến trình (tạo ở lần gọi đầu tiên)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TextVerdictCache(AiResultConfig.TEXT_CACHE_SIZE, AiResultConfig.TEXT_CACHE_TTL)
+    return _cache
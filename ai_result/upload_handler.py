@@ -0,0 +1,245 @@
+# ai_result/upload_handler.py
+# Upload handler cho media bài đăng: ghi file upload thẳng vào một file tạm riêng trong MEDIA_ROOT/temp_files
+# trong một lượt, đồng thời tính hash nội dung, nhận dạng định dạng thật từ magic bytes (không tin content_type
+# do client gửi) và kiểm tra giới hạn dung lượng/độ dài. Upload không hợp lệ bị dừng ngay khi phát hiện,
+# không chờ nhận hết body; phần kiểm duyệt nhận được đường dẫn file sẵn dùng, không phải chép lại.
+
+import logging
+import os
+import struct
+import tempfile
+
+import cv2
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers, StopUpload
+from django.http import QueryDict
+from django.utils.datastructures import MultiValueDict
+
+from .apps import AiResultConfig
+from .verdict_cache import content_hash
+
+logger = logging.getLogger(__name__)
+
+# Số byte đầu file giữ lại để nhận dạng định dạng và tìm box mvhd (độ dài video) của MP4/MOV
+HEAD_BYTES = 1024 * 1024
+SNIFF_BYTES = 16
+
+
+def sniff_media(head):
+    """(media_type, content_type) của file theo magic bytes, hoặc None nếu không phải ảnh/video được hỗ trợ."""
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'image', 'image/jpeg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image', 'image/png'
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return 'image', 'image/gif'
+    if head[:2] == b'BM':
+        return 'image', 'image/bmp'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image', 'image/webp'
+    if head[:4] == b'RIFF' and head[8:12] == b'AVI ':
+        return 'video', 'video/x-msvideo'
+    if head[:4] == b'\x1a\x45\xdf\xa3':
+        return 'video', 'video/webm'
+    if head[4:8] == b'ftyp':
+        brand = head[8:12]
+        if brand == b'qt  ':
+            return 'video', 'video/quicktime'
+        # Họ ISO BMFF còn gồm âm thanh (M4A) và ảnh HEIF, OpenCV không đọc được frame từ các loại này
+        if brand not in (b'M4A ', b'M4B ', b'heic', b'heix', b'mif1', b'msf1', b'avif'):
+            return 'video', 'video/mp4'
+    return None
+
+
+def mp4_duration(head):
+    """
+    Độ dài (giây) của video MP4/MOV đọc từ box mvhd, nếu moov nằm trước mdat trong `head`
+    (file "faststart"). None nếu chưa đọc tới hoặc moov nằm ở cuối file.
+    """
+    offset = 0
+    while offset + 8 <= len(head):
+        size, kind = struct.unpack_from('>I4s', head, offset)
+        header = 8
+        if size == 1:
+            if offset + 16 > len(head):
+                return None
+            (size,) = struct.unpack_from('>Q', head, offset + 8)
+            header = 16
+        if kind == b'moov':
+            child = offset + header
+            end = min(len(head), offset + size)
+            while child + 8 <= end:
+                child_size, child_kind = struct.unpack_from('>I4s', head, child)
+                if child_kind == b'mvhd':
+                    version = head[child + 8] if child + 9 <= len(head) else None
+                    if version == 1 and child + 40 <= len(head):
+                        timescale, duration = struct.unpack_from('>IQ', head, child + 28)
+                    elif version == 0 and child + 28 <= len(head):
+                        timescale, duration = struct.unpack_from('>II', head, child + 20)
+                    else:
+                        return None
+                    return duration / timescale if timescale else None
+                if child_size < 8:
+                    return None
+                child += child_size
+            return None
+        if kind == b'mdat' or size < header:
+            return None
+        offset += size
+    return None
+
+
+def video_duration(path):
+    """Độ dài (giây) của video theo OpenCV, None nếu không mở được file hoặc không biết fps."""
+    capture = cv2.VideoCapture(path)
+    try:
+        if not capture.isOpened():
+            return None
+        fps = capture.get(cv2.CAP_PROP_FPS)
+        frames = capture.get(cv2.CAP_PROP_FRAME_COUNT)
+        return frames / fps if fps > 0 else None
+    finally:
+        capture.release()
+
+
+class SpooledMediaFile(UploadedFile):
+    """File upload đã nằm trên đĩa, kèm hash nội dung và định dạng đã nhận dạng. Đóng file sẽ xoá file tạm."""
+
+    def __init__(self, file, name, content_type, size, charset, path, content_hash, media_type):
+        super().__init__(file, name, content_type, size, charset)
+        self.path = path
+        self.content_hash = content_hash
+        self.media_type = media_type
+
+    def temporary_file_path(self):
+        return self.path
+
+    def close(self):
+        try:
+            return self.file.close()
+        finally:
+            # File có thể đã được chuyển sang chỗ khác (hàng đợi kiểm duyệt bất đồng bộ)
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+class ModerationUploadHandler(FileUploadHandler):
+    """
+    Thêm vào đầu request.upload_handlers trước khi đọc request.data. Upload bị từ chối thì file không có
+    trong request.FILES và lý do được ghi vào request.upload_rejection.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self._spool = None
+        self.path = None
+
+    def max_bytes(self, media_type=None):
+        image_bytes = AiResultConfig.UPLOAD_MAX_IMAGE_MB * 1024 * 1024
+        video_bytes = AiResultConfig.UPLOAD_MAX_VIDEO_MB * 1024 * 1024
+        if media_type == 'image':
+            return image_bytes
+        if media_type == 'video':
+            return video_bytes
+        return max(image_bytes, video_bytes)
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # Cả request đã lớn hơn giới hạn (cộng phần dư cho các field khác): từ chối mà không đọc body
+        if content_length and content_length > self.max_bytes() + 1024 * 1024:
+            self._set_rejection(f'File vượt quá dung lượng cho phép ({self.max_bytes() // (1024 * 1024)} MB).')
+            return QueryDict(encoding=encoding), MultiValueDict()
+        return None
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        temp_dir = os.path.join(settings.MEDIA_ROOT, "temp_files")
+        os.makedirs(temp_dir, exist_ok=True)
+        extension = os.path.splitext(self.file_name or '')[1].lower()[:10]
+        fd, self.path = tempfile.mkstemp(dir=temp_dir, prefix='upload_', suffix=extension)
+        self._spool = os.fdopen(fd, 'w+b')
+        self.digest = content_hash()
+        self.head = bytearray()
+        self.media = None
+        self.duration = None
+        # File do handler này xử lý, các handler mặc định không ghi thêm một bản nữa
+        # (tên thuộc tính khác `file` để MultiPartParser._close_files không đụng tới file của handler)
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        self._spool.write(raw_data)
+        self.digest.update(raw_data)
+        size = start + len(raw_data)
+        if len(self.head) < HEAD_BYTES:
+            self.head += raw_data[:HEAD_BYTES - len(self.head)]
+
+        if self.media is None and len(self.head) >= SNIFF_BYTES:
+            self.media = sniff_media(bytes(self.head[:SNIFF_BYTES]))
+            if self.media is None:
+                self._reject('Loai file khong duoc ho tro.')
+
+        media_type = self.media[0] if self.media else None
+        if size > self.max_bytes(media_type):
+            self._reject(f'File vượt quá dung lượng cho phép ({self.max_bytes(media_type) // (1024 * 1024)} MB).')
+
+        if media_type == 'video' and self.duration is None and self.head[4:8] == b'ftyp' and start < HEAD_BYTES:
+            self.duration = mp4_duration(bytes(self.head))
+            self._check_duration(connection_reset=True)
+        return None
+
+    def file_complete(self, file_size):
+        if self._spool is None:
+            return None
+        if self.media is None:
+            self.media = sniff_media(bytes(self.head))
+            if self.media is None:
+                self._reject('Loai file khong duoc ho tro.', connection_reset=False)
+        media_type, content_type = self.media
+
+        self._spool.flush()
+        if media_type == 'video' and self.duration is None:
+            # moov nằm cuối file (không "faststart"): đọc độ dài từ file đã ghi xong
+            self.duration = video_duration(self.path)
+            if self.duration is None:
+                self._reject('Không thể mở file video.', connection_reset=False)
+            self._check_duration(connection_reset=False)
+
+        self._spool.seek(0)
+        uploaded = SpooledMediaFile(
+            self._spool, self.file_name, content_type, file_size, self.charset,
+            self.path, self.digest.hexdigest(), media_type,
+        )
+        logger.info(f"Received {media_type} upload {self.file_name} ({file_size} bytes) into {self.path}.")
+        self._spool = None
+        return uploaded
+
+    def upload_interrupted(self):
+        self._discard()
+
+    def upload_complete(self):
+        # Upload bị dừng giữa chừng (StopUpload): file tạm chưa được giao cho ai, xoá đi
+        if self._spool is not None:
+            self._discard()
+
+    def _check_duration(self, connection_reset):
+        limit = AiResultConfig.UPLOAD_MAX_VIDEO_SECONDS
+        if self.duration is not None and self.duration > limit:
+            self._reject(f'Video dài quá thời lượng cho phép ({limit:g} giây).', connection_reset)
+
+    def _set_rejection(self, message):
+        logger.warning(f"Rejected upload {getattr(self, 'file_name', '')}: {message}")
+        if self.request is not None:
+            self.request.upload_rejection = message
+
+    def _reject(self, message, connection_reset=True):
+        """Từ chối upload: ghi lý do, xoá file tạm và dừng đọc body (connection_reset: không đọc phần còn lại)."""
+        self._set_rejection(message)
+        self._discard()
+        raise StopUpload(connection_reset=connection_reset)
+
+    def _discard(self):
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
@@ -1,21 +1,30 @@
 # ai_result/utils.py
 
 import os
+import re
+import time
+import uuid
+from urllib.parse import urlparse
 import cloudinary
 import cloudinary.uploader
 from cloudinary.utils import cloudinary_url
 import logging
 import cv2
-import shutil
 import numpy as np
 
 import pickle
-import tensorflow as tf
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing.sequence import pad_sequences
 # Import các model và config từ apps.py
 # Đảm bảo bạn đã cấu hình apps.py để load model như hướng dẫn trước
 from .apps import AiResultConfig # Thay AiResultConfig bằng tên class AppConfig của bạn nếu khác
+from .image_decode import decode_image_reduced, letterbox
+from .inference_client import InferenceServiceError, inference_service_enabled, ping, remote_check_frames, remote_predict_text
+from .models import MediaVerdict
+from .perceptual_index import dhash, find_near_duplicate_verdict, video_keyframe_hashes
+from .speculative_upload import SpeculativeUpload
+from .text_batcher import get_text_batcher
+from .text_buckets import pad_sequences_post, parse_buckets, predict_bucketed
+from .text_cache import get_text_cache, normalize_comment_text
+from .verdict_cache import ViolentContentError, content_hash, moderate_with_cache
 from django.conf import settings
 from django.core.files.uploadedfile import InMemoryUploadedFile # Import kiểu dữ liệu file upload
 
@@ -30,16 +39,29 @@ cloudinary.config(
 )
 
 # Các hàm upload_image, get_optimized_url, upload_video, get_optimized_video_url (giữ nguyên như trước)
-def upload_image(image_path, public_id=None):
-    """Tải ảnh lên Cloudinary."""
+def upload_image(image, public_id=None, filename=None):
+    """Tải ảnh lên Cloudinary. `image` có thể là đường dẫn file hoặc nội dung ảnh (bytes)."""
     try:
-        result = cloudinary.uploader.upload(image_path, public_id=public_id)
+        options = {'filename': filename} if filename else {}
+        result = cloudinary.uploader.upload(image, public_id=public_id, **options)
         logger.info(f"Ảnh đã tải lên Cloudinary thành công: {result.get('url')}")
         return result
     except Exception as e:
         logger.error(f"Lỗi khi tải ảnh lên Cloudinary: {str(e)}")
         raise ValueError(f"Đã xảy ra lỗi khi tải ảnh lên Cloudinary: {str(e)}")
 
+def new_public_id(kind):
+    """public_id riêng cho mỗi lần upload: hai người cùng tải lên "image.jpg" không ghi đè asset của nhau."""
+    return f"{uuid.uuid4().hex}_{kind}"
+
+def public_id_from_url(url):
+    """public_id của asset từ URL Cloudinary trả về khi upload (.../upload/v<version>/<public_id>.<đuôi>)."""
+    _, _, path = urlparse(url or '').path.partition('/upload/')
+    segments = [segment for segment in path.split('/') if segment]
+    if segments and re.fullmatch(r'v\d+', segments[0]):
+        segments = segments[1:]
+    return os.path.splitext('/'.join(segments))[0] or None
+
 def get_optimized_url(public_id):
     """Lấy URL ảnh được tối ưu hóa từ public ID."""
     url, _ = cloudinary_url(public_id, fetch_format="auto", quality="auto")
@@ -67,13 +89,51 @@ def get_optimized_video_url(public_id: str):
 
 # Hàm kiểm tra frame (copy từ file gốc ai_tiktok_v0.py)
 def check_frame_for_violence(frame, model, target_classes, confidence_threshold):
+    return check_frames_for_violence([frame], model, target_classes, confidence_threshold) is not None
+
+def yolo_ready():
+    """YOLO dùng được: qua dịch vụ suy luận hoặc đã tải trong tiến trình này."""
+    return inference_service_enabled() or AiResultConfig.get_yolo_model() is not None
+
+def text_model_ready():
+    return inference_service_enabled() or (AiResultConfig.get_text_model() is not None and AiResultConfig.get_text_tokenizer() is not None)
+
+def _local_fallback(error):
+    """Dịch vụ suy luận lỗi: tải model tại chỗ nếu được phép, nếu không raise ValueError."""
+    if not AiResultConfig.INFERENCE_LOCAL_FALLBACK:
+        raise ValueError(f'Dịch vụ suy luận AI không phản hồi: {error}')
+    logger.warning(f"{error} Falling back to in-process inference.")
+    AiResultConfig.load_local_models()
+
+def check_frames_for_violence(frames, model, target_classes, confidence_threshold):
+    """
+    Chạy YOLO một lần cho cả batch frame thay vì gọi predict cho từng frame.
+    Khi cấu hình AI_INFERENCE_SOCKET, frame được gửi tới dịch vụ suy luận qua shared memory.
+    Trả về vị trí (trong batch) của frame bạo lực đầu tiên, hoặc None nếu không phát hiện.
+    """
+    if not frames:
+        return None
+
+    if inference_service_enabled():
+        try:
+            return remote_check_frames(frames, target_classes, confidence_threshold)
+        except InferenceServiceError as e:
+            _local_fallback(e)
+
+    # Tải YOLO ở lần dùng đầu tiên (người gọi truyền AiResultConfig.yolo_model, có thể chưa được tải)
+    if model is None:
+        model = AiResultConfig.get_yolo_model()
+    return detect_violent_frame(frames, model, target_classes, confidence_threshold)
+
+def detect_violent_frame(frames, model, target_classes, confidence_threshold):
+    """Phần suy luận YOLO tại chỗ của check_frames_for_violence (cũng được dịch vụ suy luận dùng)."""
     if model is None:
         logger.warning("YOLO model is not loaded. Cannot check for violence.")
-        return False
+        return None
 
-    results = model.predict(frame, conf=confidence_threshold, verbose=False)
+    results = model.predict(list(frames), conf=confidence_threshold, imgsz=AiResultConfig.YOLO_IMGSZ, verbose=False)
 
-    for result in results:
+    for index, result in enumerate(results):
         for box in result.boxes:
             class_id = int(box.cls[0])
             detected_class_name = model.names[class_id]
@@ -81,139 +141,420 @@ def check_frame_for_violence(frame, model, target_classes, confidence_threshold)
 
             if detected_class_name in target_classes:
                 logger.warning(f"Violent content detected: Class '{detected_class_name}' with confidence {confidence:.2f}")
-                return True
-    return False
+                return index
+    return None
 
-# --- Các hàm mới để xử lý và upload ---
+def new_scan_stats():
+    """Bộ đếm dùng chung cho các hàm đọc/kiểm tra frame video."""
+    return {'frames_read': 0, 'frames_total': 0, 'frames_inferred': 0, 'batches': 0}
 
-def process_and_upload_image(image_file: InMemoryUploadedFile):
+def finish_scan_stats(stats):
+    """Tính số frame bị bỏ qua (không đưa vào YOLO), kể cả các frame chưa từng được giải mã."""
+    total = max(stats['frames_read'], stats['frames_total'])
+    stats['frames_skipped'] = total - stats['frames_inferred']
+    return stats
+
+def iter_interval_frames(video_capture, interval, stats=None, max_frames=None):
     """
-    Kiểm tra ảnh bạo lực bằng AI và tải lên Cloudinary nếu hợp lệ.
-    Trả về URL ảnh nếu thành công, raise ValueError nếu có lỗi hoặc nội dung bạo lực.
+    Đọc tuần tự video và trả về (số thứ tự frame, frame) cho mỗi frame thứ `interval`.
+    Frame không được lấy mẫu chỉ grab() mà không retrieve(), bỏ qua bước chuyển màu sang BGR.
     """
-    if AiResultConfig.yolo_model is None:
-        logger.error("YOLO model not loaded, cannot process image.")
-        raise ValueError('Hệ thống xử lý ảnh AI chưa sẵn sàng.')
+    frame_count = 0
+    sampled = 0
+    while max_frames is None or sampled < max_frames:
+        if not video_capture.grab():
+            return
+
+        frame_count += 1
+        if stats is not None:
+            stats['frames_read'] += 1
+
+        if frame_count % interval == 0:
+            ret, frame = video_capture.retrieve()
+            if not ret:
+                return
+            sampled += 1
+            yield frame_count, frame
 
-    temp_dir = os.path.join(settings.MEDIA_ROOT, "temp_files")
-    os.makedirs(temp_dir, exist_ok=True)
-    temp_file_path = os.path.join(temp_dir, image_file.name)
+def coarse_to_fine_order(count):
+    """
+    Thứ tự duyệt các vị trí 0..count-1 từ thô tới mịn: đầu, giữa, các phần tư, rồi dày dần
+    (dãy van der Corput cơ số 2).
+    """
+    order = []
+    seen = set()
+    i = 0
+    while len(order) < count:
+        # Đảo bit của i để lấy phân số trong [0, 1): 0, 1/2, 1/4, 3/4, 1/8, ...
+        value, denominator, n = 0.0, 1.0, i
+        while n:
+            denominator *= 2
+            value += (n & 1) / denominator
+            n >>= 1
+        position = int(value * count)
+        if position not in seen:
+            seen.add(position)
+            order.append(position)
+        i += 1
+    return order
+
+def iter_seek_frames(video_capture, max_frames, interval, stats=None):
+    """
+    Lấy mẫu đều theo thời gian bằng seek: tối đa `max_frames` frame (và không dày hơn mỗi
+    `interval` frame), duyệt theo thứ tự thô tới mịn để phát hiện bạo lực ở bất kỳ đâu sớm hơn.
+    Frame không được lấy mẫu không bao giờ được giải mã đầy đủ.
+    """
+    total_frames = int(video_capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = video_capture.get(cv2.CAP_PROP_FPS)
+    if stats is not None:
+        stats['frames_total'] = max(total_frames, 0)
+
+    if total_frames <= 0:
+        # Một số container không ghi số frame: đọc tuần tự bằng grab(), vẫn giới hạn số frame suy luận
+        logger.info("Video frame count unknown, falling back to sequential grab sampling.")
+        yield from iter_interval_frames(video_capture, interval, stats, max_frames=max_frames)
+        return
+
+    slots = max(1, min(max_frames, -(-total_frames // interval)))
+    if fps and fps > 0:
+        logger.info(f"Seek sampling {slots} of {total_frames} frames ({total_frames / fps:.1f}s at {fps:.1f} fps).")
+
+    for slot in coarse_to_fine_order(slots):
+        frame_index = slot * total_frames // slots
+        video_capture.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+        ret, frame = video_capture.read()
+        if stats is not None:
+            stats['frames_read'] += 1
+        if not ret:
+            # Số frame trong metadata có thể không chính xác ở cuối video
+            continue
+        yield frame_index + 1, frame
+
+def frame_signature(frame, size=32):
+    """Chữ ký rẻ của frame: ảnh xám thu nhỏ size x size."""
+    small = cv2.resize(frame, (size, size), interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+def signature_distance(a, b):
+    """Độ khác nhau trung bình giữa hai chữ ký, trong khoảng [0, 1]."""
+    return float(cv2.absdiff(a, b).mean()) / 255.0
+
+def iter_scene_change_frames(video_capture, threshold, max_gap, min_gap=1, stats=None):
+    """
+    Lấy mẫu thích ứng: chỉ trả về frame khi cảnh đã thay đổi đủ nhiều so với frame được
+    kiểm tra gần nhất (>= `threshold`), cách frame đó ít nhất `min_gap` frame.
+    Không để quá `max_gap` frame liên tiếp không được kiểm tra.
+    """
+    frame_count = 0
+    last_index = None
+    last_signature = None
+    while True:
+        ret, frame = video_capture.read()
+        if not ret:
+            return
+
+        frame_count += 1
+        if stats is not None:
+            stats['frames_read'] += 1
+
+        if last_index is not None:
+            gap = frame_count - last_index
+            if gap < min_gap:
+                continue
+            signature = frame_signature(frame)
+            if gap < max_gap and signature_distance(signature, last_signature) < threshold:
+                continue
+        else:
+            signature = frame_signature(frame)
+
+        last_index = frame_count
+        last_signature = signature
+        yield frame_count, frame
+
+def sample_video_frames(video_capture, stats=None):
+    """Chọn cách lấy mẫu frame theo AiResultConfig.VIDEO_SAMPLING_MODE."""
+    mode = AiResultConfig.VIDEO_SAMPLING_MODE
+    if mode == 'scene':
+        return iter_scene_change_frames(
+            video_capture,
+            AiResultConfig.VIDEO_SCENE_THRESHOLD,
+            AiResultConfig.VIDEO_SCENE_MAX_GAP,
+            AiResultConfig.VIDEO_SCENE_MIN_GAP,
+            stats,
+        )
+    if mode == 'seek':
+        return iter_seek_frames(
+            video_capture,
+            AiResultConfig.VIDEO_MAX_INFERRED_FRAMES,
+            AiResultConfig.VIDEO_FRAME_CHECK_INTERVAL,
+            stats,
+        )
+    if mode != 'interval':
+        logger.warning(f"Unknown video sampling mode '{mode}', falling back to 'interval'.")
+    return iter_interval_frames(video_capture, AiResultConfig.VIDEO_FRAME_CHECK_INTERVAL, stats)
+
+def iter_frame_batches(sampled_frames, batch_size):
+    """Gom các (số thứ tự frame, frame) thành từng batch (danh sách số thứ tự, danh sách frame)."""
+    batch_size = max(1, int(batch_size))
+    batch_indices = []
+    batch_frames = []
+    for frame_index, frame in sampled_frames:
+        batch_indices.append(frame_index)
+        batch_frames.append(frame)
+
+        if len(batch_frames) >= batch_size:
+            yield batch_indices, batch_frames
+            batch_indices = []
+            batch_frames = []
+
+    if batch_frames:
+        yield batch_indices, batch_frames
+
+def check_frame_batch(batch_indices, batch_frames, stats=None):
+    """Chạy YOLO cho một batch, trả về số thứ tự frame bạo lực đầu tiên hoặc None."""
+    logger.info(f"Processing frames {batch_indices[0]}-{batch_indices[-1]} ({len(batch_frames)} frames)...")
+    hit = check_frames_for_violence(batch_frames, AiResultConfig.yolo_model, AiResultConfig.TARGET_CLASSES, AiResultConfig.CONFIDENCE_THRESHOLD)
+    if stats is not None:
+        stats['frames_inferred'] += len(batch_frames)
+        stats['batches'] += 1
+    return None if hit is None else batch_indices[hit]
+
+def scan_frames_for_violence(sampled_frames, batch_size, stats=None):
+    """
+    Gom các frame được lấy mẫu thành batch `batch_size` và chạy YOLO một lần cho mỗi batch.
+    Dừng đọc video ngay khi một batch có frame bạo lực.
+    Trả về số thứ tự frame bạo lực đầu tiên, hoặc None nếu không phát hiện.
+    """
+    if AiResultConfig.VIDEO_PIPELINE_ENABLED:
+        from .video_pipeline import scan_frames_pipelined
+        return scan_frames_pipelined(
+            sampled_frames,
+            batch_size,
+            queue_depth=AiResultConfig.VIDEO_QUEUE_DEPTH,
+            max_queued_bytes=AiResultConfig.VIDEO_QUEUE_MAX_MB * 1024 * 1024,
+            stats=stats,
+        )
 
-    try:
-        # Lưu file tạm thời
-        with open(temp_file_path, "wb") as buffer:
-            shutil.copyfileobj(image_file, buffer)
-        logger.info(f"Successfully saved temporary image file: {temp_file_path}")
+    for batch_indices, batch_frames in iter_frame_batches(sampled_frames, batch_size):
+        violent_frame = check_frame_batch(batch_indices, batch_frames, stats)
+        if violent_frame is not None:
+            return violent_frame
+    return None
 
-        # Đọc ảnh
-        image = cv2.imread(temp_file_path)
-        if image is None:
-            raise ValueError('Không thể đọc file ảnh.')
+# --- Các hàm mới để xử lý và upload ---
 
-        logger.info(f"AI processing started for image: {image_file.name}")
+def decode_image_bytes(image_bytes):
+    """Giải mã ảnh trực tiếp từ bộ nhớ (không qua file tạm). Trả về None nếu không đọc được."""
+    buffer = np.frombuffer(image_bytes, dtype=np.uint8)
+    if buffer.size == 0:
+        return None
+    return cv2.imdecode(buffer, cv2.IMREAD_COLOR)
 
-        # Kiểm tra bạo lực
-        violent_detected = check_frame_for_violence(image, AiResultConfig.yolo_model, AiResultConfig.TARGET_CLASSES, AiResultConfig.CONFIDENCE_THRESHOLD)
+def check_near_duplicate(hashes, media_type, name):
+    """
+    Tra chỉ mục perceptual hash. Raise ViolentContentError nếu media gần giống media đã bị từ chối;
+    trả về True nếu gần giống media đã được chấp nhận (có thể bỏ qua YOLO), ngược lại False.
+    """
+    verdict = find_near_duplicate_verdict(hashes, media_type)
+    if verdict is None:
+        return False
+    if verdict.status == MediaVerdict.STATUS_REJECTED:
+        logger.warning(f"{name} is a near duplicate of rejected {media_type} {verdict.content_hash[:12]}.")
+        raise ViolentContentError(
+            'Ảnh chứa nội dung bạo lực và không hợp lệ.' if media_type == 'image'
+            else 'Video chứa nội dung bạo lực và không hợp lệ.'
+        )
+    logger.info(f"{name} is a near duplicate of accepted {media_type} {verdict.content_hash[:12]}, skipping AI check.")
+    return True
 
-        logger.info(f"AI processing finished for image: {image_file.name}")
+def upload_after_check(check, upload_func, source, resource_type, public_id, **upload_kwargs):
+    """
+    Chạy `check()` (raise nếu media không hợp lệ) rồi tải `source` lên Cloudinary.
+    Khi bật SPECULATIVE_UPLOAD_ENABLED, upload chạy song song với check() và bị huỷ nếu check() raise.
+    check=None nghĩa là media đã được duyệt, chỉ cần upload.
+    """
+    if check is None or not AiResultConfig.SPECULATIVE_UPLOAD_ENABLED:
+        if check is not None:
+            check()
+        return upload_func(source, public_id=public_id, **upload_kwargs)
+
+    # public_id phải là id riêng của lần upload này (new_public_id): asset bị từ chối sẽ bị xoá theo đúng id đó,
+    # không được trùng với asset của upload khác đã được duyệt
+    with SpeculativeUpload(upload_func, source, resource_type=resource_type, public_id=public_id, **upload_kwargs) as upload:
+        check()
+        return upload.result()
+
+def _check_image(image, name):
+    """Chạy YOLO trên ảnh đã giải mã, raise ViolentContentError nếu phát hiện bạo lực."""
+    logger.info(f"AI processing started for image: {name}")
+
+    # Kiểm tra bạo lực
+    violent_detected = check_frame_for_violence(image, AiResultConfig.yolo_model, AiResultConfig.TARGET_CLASSES, AiResultConfig.CONFIDENCE_THRESHOLD)
+
+    logger.info(f"AI processing finished for image: {name}")
+
+    if violent_detected:
+        raise ViolentContentError('Ảnh chứa nội dung bạo lực và không hợp lệ.')
+
+def _moderate_and_upload_image(image_bytes, name, fingerprints):
+    """Chạy YOLO trên ảnh và tải lên Cloudinary nếu hợp lệ. Trả về URL ảnh."""
+    # Đọc ảnh (JPEG lớn được giải mã ở độ phân giải vừa đủ cho YOLO)
+    if AiResultConfig.IMAGE_REDUCED_DECODE:
+        image = decode_image_reduced(image_bytes, AiResultConfig.YOLO_IMGSZ)
+    else:
+        image = decode_image_bytes(image_bytes)
+    if image is None:
+        raise ValueError('Không thể đọc file ảnh.')
+
+    if AiResultConfig.PERCEPTUAL_INDEX_ENABLED:
+        image_hash = dhash(image)
+        if image_hash is not None:
+            fingerprints.append(image_hash)
+
+    if AiResultConfig.IMAGE_REDUCED_DECODE:
+        # Perceptual hash tính trên ảnh chưa có viền letterbox, YOLO nhận ảnh đã letterbox sẵn
+        image = letterbox(image, AiResultConfig.YOLO_IMGSZ)
+    check = None if check_near_duplicate(fingerprints, 'image', name) else (lambda: _check_image(image, name))
+
+    # Tải lên Cloudinary từ chính các byte đã kiểm tra
+    public_id = new_public_id("image")
+    upload_result = upload_after_check(check, upload_image, image_bytes, 'image', public_id, filename=name)
+    image_url = upload_result.get("url")
+    if not image_url:
+         raise ValueError('Không nhận được URL từ Cloudinary sau khi tải lên.')
+
+    logger.info(f"Image {name} uploaded successfully to Cloudinary. URL: {image_url}")
+    return image_url
+
+def process_and_upload_image(image_file: InMemoryUploadedFile, return_uploaded=False):
+    """
+    Kiểm tra ảnh bạo lực bằng AI và tải lên Cloudinary nếu hợp lệ.
+    Ảnh được giải mã và tải lên trực tiếp từ bộ nhớ, không ghi file tạm.
+    Ảnh trùng nội dung với ảnh đã kiểm duyệt dùng lại kết quả cũ (xem verdict_cache).
+    Trả về URL ảnh nếu thành công (hoặc (url, uploaded) nếu return_uploaded, xem moderate_with_cache),
+    raise ValueError nếu có lỗi hoặc nội dung bạo lực.
+    """
+    if not yolo_ready():
+        logger.error("YOLO model not loaded, cannot process image.")
+        raise ValueError('Hệ thống xử lý ảnh AI chưa sẵn sàng.')
 
-        if violent_detected:
-            raise ValueError('Ảnh chứa nội dung bạo lực và không hợp lệ.')
-        else:
-            logger.info(f"No violent content detected in {image_file.name}. Uploading image to Cloudinary...")
-            # Tải lên Cloudinary
-            public_id = os.path.splitext(image_file.name)[0] + "_image"
-            upload_result = upload_image(temp_file_path, public_id=public_id)
-            image_url = upload_result.get("url")
-            if not image_url:
-                 raise ValueError('Không nhận được URL từ Cloudinary sau khi tải lên.')
+    try:
+        # Đọc toàn bộ nội dung upload (chunks() tự seek về đầu file)
+        image_bytes = b''.join(image_file.chunks())
+        # Hash đã được tính trong lúc nhận file nếu upload đi qua ModerationUploadHandler
+        digest = getattr(image_file, 'content_hash', None) or content_hash(image_bytes).hexdigest()
 
-            logger.info(f"Image {image_file.name} uploaded successfully to Cloudinary. URL: {image_url}")
-            return image_url # Trả về URL thành công
+        media_url, uploaded = moderate_with_cache(digest, 'image', lambda fingerprints: _moderate_and_upload_image(image_bytes, image_file.name, fingerprints))
+        return (media_url, uploaded) if return_uploaded else media_url
 
     except Exception as e:
         logger.error(f"An error occurred during image processing and upload for {image_file.name}: {str(e)}")
-        # Raise lại lỗi để serializer bắt
-        raise ValueError(f'Lỗi xử lý ảnh: {str(e)}')
+        # Raise lại lỗi để serializer bắt (giữ kiểu ViolentContentError để phân biệt với lỗi kỹ thuật)
+        error_class = ViolentContentError if isinstance(e, ViolentContentError) else ValueError
+        raise error_class(f'Lỗi xử lý ảnh: {str(e)}')
 
-    finally:
-        # Dọn dẹp file tạm, bất kể có lỗi hay không
-        if os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
-            logger.info(f"Removed temporary image file: {temp_file_path}")
 
+def scan_video_file(video_path, name):
+    """Lấy mẫu frame và chạy YOLO trên file video. Trả về True nếu phát hiện bạo lực."""
+    # Mở video
+    video_capture = cv2.VideoCapture(video_path)
+    if not video_capture.isOpened():
+        raise ValueError('Không thể mở file video.')
 
-def process_and_upload_video(video_file: InMemoryUploadedFile):
-    """
-    Kiểm tra video bạo lực bằng AI và tải lên Cloudinary nếu hợp lệ.
-    Trả về URL video nếu thành công, raise ValueError nếu có lỗi hoặc nội dung bạo lực.
-    """
-    if AiResultConfig.yolo_model is None:
-        logger.error("YOLO model not loaded, cannot process video.")
-        raise ValueError('Hệ thống xử lý video AI chưa sẵn sàng.')
+    logger.info(f"AI processing started for video: {name}")
 
-    temp_dir = os.path.join(settings.MEDIA_ROOT, "temp_files")
-    os.makedirs(temp_dir, exist_ok=True)
-    temp_file_path = os.path.join(temp_dir, video_file.name)
+    # Lấy mẫu frame theo cấu hình, gom thành batch để giảm số lần gọi YOLO
+    stats = new_scan_stats()
 
     try:
-        # Lưu file tạm thời
-        with open(temp_file_path, "wb") as buffer:
-            shutil.copyfileobj(video_file, buffer)
-        logger.info(f"Successfully saved temporary video file: {temp_file_path}")
+        violent_frame = scan_frames_for_violence(
+            sample_video_frames(video_capture, stats),
+            AiResultConfig.VIDEO_BATCH_SIZE,
+            stats,
+        )
+    finally:
+        video_capture.release()
 
-        # Mở video
-        video_capture = cv2.VideoCapture(temp_file_path)
-        if not video_capture.isOpened():
-            raise ValueError('Không thể mở file video.')
+    violent_detected = violent_frame is not None
+    if violent_detected:
+        logger.warning(f"Violent content detected at frame {violent_frame}. Stopping processing.")
+    finish_scan_stats(stats)
+    logger.info(f"Video scan stats for {name}: {stats}")
 
-        logger.info(f"AI processing started for video: {video_file.name}")
+    logger.info(f"AI processing finished for video: {name}")
+    return violent_detected
 
-        violent_detected = False
-        frame_count = 0
-        # Kiểm tra mỗi 5 frame (giữ nguyên logic từ file gốc)
-        frame_check_interval = 5
+def _check_video(video_path, name):
+    """Quét video bằng YOLO, raise ViolentContentError nếu phát hiện bạo lực."""
+    if scan_video_file(video_path, name):
+        raise ViolentContentError('Video chứa nội dung bạo lực và không hợp lệ.')
 
-        while True:
-            ret, frame = video_capture.read()
-            if not ret:
-                break
+def _moderate_and_upload_video(video_path, name, fingerprints):
+    """Lấy mẫu frame, chạy YOLO và tải video lên Cloudinary nếu hợp lệ. Trả về URL video."""
+    if AiResultConfig.PERCEPTUAL_INDEX_ENABLED:
+        fingerprints.extend(video_keyframe_hashes(video_path, AiResultConfig.VIDEO_KEYFRAMES))
 
-            frame_count += 1
+    check = None if check_near_duplicate(fingerprints, 'video', name) else (lambda: _check_video(video_path, name))
 
-            if frame_count % frame_check_interval == 0:
-                logging.info(f"Processing frame {frame_count}...")
-                if check_frame_for_violence(frame, AiResultConfig.yolo_model, AiResultConfig.TARGET_CLASSES, AiResultConfig.CONFIDENCE_THRESHOLD):
-                    violent_detected = True
-                    logging.warning(f"Violent content detected at frame {frame_count}. Stopping processing.")
-                    break
+    # Tải lên Cloudinary
+    public_id = new_public_id("video")
+    upload_result = upload_after_check(check, upload_video, video_path, 'video', public_id)
+    video_url = upload_result.get("url")
+    if not video_url:
+        raise ValueError('Không nhận được URL từ Cloudinary sau khi tải lên.')
 
-        video_capture.release()
+    logger.info(f"Video {name} uploaded successfully to Cloudinary. URL: {video_url}")
+    return video_url
 
-        logger.info(f"AI processing finished for video: {video_file.name}")
+def process_and_upload_video(video_file: InMemoryUploadedFile, return_uploaded=False):
+    """
+    Kiểm tra video bạo lực bằng AI và tải lên Cloudinary nếu hợp lệ.
+    Video trùng nội dung với video đã kiểm duyệt dùng lại kết quả cũ (xem verdict_cache).
+    Trả về URL video nếu thành công (hoặc (url, uploaded) nếu return_uploaded, xem moderate_with_cache),
+    raise ValueError nếu có lỗi hoặc nội dung bạo lực.
+    """
+    if not yolo_ready():
+        logger.error("YOLO model not loaded, cannot process video.")
+        raise ValueError('Hệ thống xử lý video AI chưa sẵn sàng.')
 
-        if violent_detected:
-            raise ValueError('Video chứa nội dung bạo lực và không hợp lệ.')
-        else:
-            logger.info(f"No violent content detected in {video_file.name}. Uploading video to Cloudinary...")
-            # Tải lên Cloudinary
-            public_id = os.path.splitext(video_file.name)[0] + "_video"
-            upload_result = upload_video(temp_file_path, public_id=public_id)
-            video_url = upload_result.get("url")
-            if not video_url:
-                raise ValueError('Không nhận được URL từ Cloudinary sau khi tải lên.')
+    temp_file_path = None
 
-            logger.info(f"Video {video_file.name} uploaded successfully to Cloudinary. URL: {video_url}")
-            return video_url # Trả về URL thành công
+    try:
+        if hasattr(video_file, 'temporary_file_path'):
+            # File đã nằm trên đĩa (ModerationUploadHandler, TemporaryFileUploadHandler): dùng luôn, không chép lại
+            video_path = video_file.temporary_file_path()
+            digest = getattr(video_file, 'content_hash', None)
+            if digest is None:
+                hasher = content_hash()
+                for chunk in video_file.chunks():
+                    hasher.update(chunk)
+                digest = hasher.hexdigest()
+        else:
+            # Lưu file tạm thời (tên riêng cho mỗi upload), tính hash nội dung trong cùng lượt ghi
+            temp_dir = os.path.join(settings.MEDIA_ROOT, "temp_files")
+            os.makedirs(temp_dir, exist_ok=True)
+            temp_file_path = os.path.join(temp_dir, f"{uuid.uuid4().hex}_{os.path.basename(video_file.name)}")
+            hasher = content_hash()
+            with open(temp_file_path, "wb") as buffer:
+                for chunk in video_file.chunks():
+                    hasher.update(chunk)
+                    buffer.write(chunk)
+            logger.info(f"Successfully saved temporary video file: {temp_file_path}")
+            video_path = temp_file_path
+            digest = hasher.hexdigest()
+
+        media_url, uploaded = moderate_with_cache(digest, 'video', lambda fingerprints: _moderate_and_upload_video(video_path, video_file.name, fingerprints))
+        return (media_url, uploaded) if return_uploaded else media_url
 
     except Exception as e:
         logger.error(f"An error occurred during video processing and upload for {video_file.name}: {str(e)}")
-        # Raise lại lỗi để serializer bắt
-        raise ValueError(f'Lỗi xử lý video: {str(e)}')
+        # Raise lại lỗi để serializer bắt (giữ kiểu ViolentContentError để phân biệt với lỗi kỹ thuật)
+        error_class = ViolentContentError if isinstance(e, ViolentContentError) else ValueError
+        raise error_class(f'Lỗi xử lý video: {str(e)}')
 
     finally:
-        # Dọn dẹp file tạm, bất kể có lỗi hay không
-        if os.path.exists(temp_file_path):
+        # Dọn dẹp file tạm do hàm này tạo, bất kể có lỗi hay không (file của upload handler tự xoá khi đóng)
+        if temp_file_path and os.path.exists(temp_file_path):
             os.remove(temp_file_path)
             logger.info(f"Removed temporary video file: {temp_file_path}")
 
@@ -222,11 +563,123 @@ def get_sequences(texts, tokenizer, train=True, max_seq_length=2138):
     if tokenizer is None:
         logger.warning("Text tokenizer is not loaded. Cannot process text sequences.")
         return None
-    # Sử dụng pad_sequences đã được import ở đầu file
+    # Pad/cắt ở cuối giống pad_sequences(padding='post', truncating='post') của keras, không cần import TensorFlow
     sequences = tokenizer.texts_to_sequences(texts)
-    sequences = pad_sequences(sequences, maxlen=max_seq_length, padding='post', truncating='post')
+    sequences = pad_sequences_post(sequences, maxlen=max_seq_length)
     return sequences
 
+def predict_text_scores(texts):
+    """
+    Điểm dự đoán của text model cho từng text (>= 0.4 là không phù hợp).
+    Dùng dịch vụ suy luận nếu có cấu hình, lỗi thì chạy tại chỗ (AI_INFERENCE_LOCAL_FALLBACK).
+    Trả về None nếu model/tokenizer chưa được tải.
+    """
+    if inference_service_enabled():
+        try:
+            return remote_predict_text(texts)
+        except InferenceServiceError as e:
+            _local_fallback(e)
+
+    if AiResultConfig.get_text_model() is None or AiResultConfig.get_text_tokenizer() is None:
+        return None
+    if AiResultConfig.TEXT_LENGTH_BUCKETING:
+        return predict_text_scores_bucketed(texts)
+    return predict_text_scores_fixed(texts)
+
+def predict_text_scores_fixed(texts):
+    """Chấm điểm tại chỗ với mọi chuỗi được pad tới 2138 token (cách gốc)."""
+    processed_text = get_sequences(texts, AiResultConfig.text_tokenizer, train=False, max_seq_length=2138)
+    # Tắt verbose để không in tiến trình
+    prediction = AiResultConfig.text_model.predict(processed_text, verbose=False)
+    return np.asarray(prediction, dtype=np.float32).reshape(len(texts), -1)[:, 0]
+
+def predict_text_scores_bucketed(texts):
+    """Chấm điểm tại chỗ, mỗi chuỗi được pad tới bucket độ dài nhỏ nhất đủ chứa nó."""
+    sequences = AiResultConfig.text_tokenizer.texts_to_sequences(texts)
+    return predict_bucketed(AiResultConfig.text_model, sequences, parse_buckets(AiResultConfig.TEXT_LENGTH_BUCKETS))
+
+def score_comment_text(text):
+    """
+    Điểm của một comment. Comment trùng (sau chuẩn hóa) với comment đã chấm dùng lại điểm trong cache;
+    các comment còn lại qua micro-batcher nếu bật AI_TEXT_BATCHING. None nếu model chưa sẵn sàng.
+    """
+    cache = get_text_cache() if AiResultConfig.TEXT_CACHE_ENABLED else None
+    if cache is not None:
+        cache_key = normalize_comment_text(text)
+        score = cache.get(cache_key)
+        if score is not None:
+            return score
+
+    score = None
+    batched = AiResultConfig.TEXT_BATCHING_ENABLED
+    if batched:
+        try:
+            score = get_text_batcher(predict_text_scores).score(text, timeout=AiResultConfig.TEXT_BATCH_TIMEOUT)
+        except TimeoutError:
+            # Batcher bị kẹt hoặc quá tải: không giữ request lâu hơn, chấm riêng comment này
+            logger.warning(f"Text micro-batcher did not answer within {AiResultConfig.TEXT_BATCH_TIMEOUT}s, predicting directly.")
+            batched = False
+    if not batched:
+        scores = predict_text_scores([text])
+        score = None if scores is None else float(scores[0])
+
+    if cache is not None and score is not None:
+        cache.put(cache_key, score)
+    return score
+
+def score_comment_texts(texts):
+    """
+    Điểm của nhiều comment cùng lúc (backfill, công cụ admin). Comment đã có trong cache dùng lại điểm;
+    các comment còn lại (bỏ trùng sau chuẩn hóa) được chấm trong một lần predict. None nếu model chưa sẵn sàng.
+    """
+    cache = get_text_cache() if AiResultConfig.TEXT_CACHE_ENABLED else None
+    keys = [normalize_comment_text(text) for text in texts]
+    scores = {}
+    if cache is not None:
+        for key in keys:
+            score = cache.get(key)
+            if score is not None:
+                scores[key] = score
+
+    # Mỗi comment chưa có điểm chỉ được chấm một lần, dù xuất hiện nhiều lần trong batch
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in scores:
+            missing.setdefault(key, text)
+    if missing:
+        predicted = predict_text_scores(list(missing.values()))
+        if predicted is None:
+            return None
+        for key, score in zip(missing, predicted):
+            scores[key] = float(score)
+            if cache is not None:
+                cache.put(key, scores[key])
+    return [scores[key] for key in keys]
+
+def warmup_models():
+    """
+    Tải model và chạy thử một lần để request đầu tiên không phải chờ import TensorFlow/Ultralytics,
+    tải model và khởi tạo graph. Gọi khi web worker khởi động (wsgi.py/asgi.py).
+    Khi dùng dịch vụ suy luận chỉ kiểm tra kết nối tới dịch vụ.
+    """
+    started = time.perf_counter()
+    if inference_service_enabled():
+        try:
+            logger.info(f"Inference service is up: {ping()}")
+        except InferenceServiceError as e:
+            logger.warning(f"Inference service is not reachable during warmup: {e}")
+        return
+
+    AiResultConfig.load_local_models()
+    try:
+        if AiResultConfig.text_model is not None and AiResultConfig.text_tokenizer is not None:
+            predict_text_scores(['warmup'])
+        if AiResultConfig.yolo_model is not None:
+            check_frames_for_violence([np.zeros((64, 64, 3), dtype=np.uint8)], AiResultConfig.yolo_model, AiResultConfig.TARGET_CLASSES, AiResultConfig.CONFIDENCE_THRESHOLD)
+    except Exception as e:
+        logger.warning(f"Model warmup inference failed: {str(e)}")
+    logger.info(f"AI models warmed up in {time.perf_counter() - started:.2f}s.")
+
 # Hàm để phân tích văn bản comment - Đã sửa để trả về trạng thái và thông báo
 def analyze_comment_text(comment_content: str):
     """
@@ -235,7 +688,7 @@ def analyze_comment_text(comment_content: str):
     Status: 0 (hợp lệ), 1 (không phù hợp), -1 (AI chưa sẵn sàng), -2 (lỗi xử lý).
     Message: Thông báo chi tiết (rỗng nếu hợp lệ).
     """
-    if AiResultConfig.text_model is None or AiResultConfig.text_tokenizer is None:
+    if not text_model_ready():
         logger.error("Text model or tokenizer not loaded, cannot analyze comment.")
         return (-1, 'Hệ thống phân tích văn bản AI chưa sẵn sàng.') # Trả về trạng thái và thông báo
 
@@ -243,16 +696,13 @@ def analyze_comment_text(comment_content: str):
         return (0, '') # Hợp lệ, comment rỗng hoặc chỉ có khoảng trắng
 
     try:
-        # Tiền xử lý văn bản
-        processed_text = get_sequences([comment_content], AiResultConfig.text_tokenizer, train=False, max_seq_length=2138)
+        # Tiền xử lý văn bản + dự đoán bằng model (gom batch với các comment đồng thời)
+        prediction = score_comment_text(comment_content)
 
-        if processed_text is None:
+        if prediction is None:
              logger.error('Lỗi tiền xử lý văn bản.')
              return (-2, 'Lỗi tiền xử lý văn bản.') # Trả về trạng thái và thông báo
 
-        # Dự đoán bằng model
-        prediction = AiResultConfig.text_model.predict(processed_text, verbose=False) # Tắt verbose để không in tiến trình
-
         # Ngưỡng phân loại (giữ nguyên ngưỡng 0.4 từ file gốc)
         prediction_label = 1 if np.squeeze(prediction) >= 0.4 else 0
 
@@ -0,0 +1,128 @@
+# ai_result/verdict_cache.py
+# Cache kết quả kiểm duyệt media theo hash nội dung: file đã từng được kiểm duyệt (cùng phiên bản model)
+# không phải chạy lại YOLO và tải lại lên Cloudinary. Nhiều request cùng upload một file sẽ chờ
+# một lượt kiểm duyệt duy nhất thay vì chạy song song.
+
+import hashlib
+import logging
+import time
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .apps import AiResultConfig
+from .models import MediaVerdict
+from .perceptual_index import record_fingerprints
+
+logger = logging.getLogger(__name__)
+
+# Khoảng thời gian giữa hai lần kiểm tra lại bảng MediaVerdict khi đang chờ request khác
+POLL_INTERVAL_SECONDS = 0.2
+
+
+class ViolentContentError(ValueError):
+    """Media bị từ chối vì chứa nội dung bạo lực (khác với lỗi kỹ thuật, kết quả này được cache)."""
+
+
+def content_hash(data=b''):
+    """Tạo đối tượng hash SHA-256 dùng cho nội dung media (có thể update() dần theo từng chunk)."""
+    return hashlib.sha256(data)
+
+
+def _is_stale(verdict):
+    return verdict.updated_at < timezone.now() - timedelta(seconds=AiResultConfig.MEDIA_VERDICT_PENDING_TIMEOUT)
+
+
+def _claim(verdict, version):
+    """Chiếm quyền kiểm duyệt lại một bản ghi cũ/bị treo. Chỉ một request thành công."""
+    claimed = MediaVerdict.objects.filter(
+        pk=verdict.pk,
+        status=verdict.status,
+        updated_at=verdict.updated_at,
+    ).update(status=MediaVerdict.STATUS_PENDING, model_version=version, media_url=None, updated_at=timezone.now())
+    return claimed == 1
+
+
+def _acquire(digest, media_type, version):
+    """
+    Tra cứu hoặc giữ chỗ cho một hash.
+    Trả về (verdict, owned): owned=True nghĩa là request này phải tự kiểm duyệt và ghi kết quả.
+    """
+    # get_or_create tự xử lý trường hợp request khác vừa tạo cùng hash (unique content_hash)
+    verdict, created = MediaVerdict.objects.get_or_create(
+        content_hash=digest,
+        defaults={'media_type': media_type, 'model_version': version},
+    )
+
+    if created:
+        return verdict, True
+
+    if verdict.status == MediaVerdict.STATUS_PENDING:
+        if _is_stale(verdict):
+            logger.warning(f"Media verdict {digest[:12]} has been pending too long, taking over.")
+            return verdict, _claim(verdict, version)
+        return verdict, False
+
+    if verdict.model_version != version:
+        logger.info(f"Media verdict {digest[:12]} was made by model {verdict.model_version}, re-checking with {version}.")
+        return verdict, _claim(verdict, version)
+
+    return verdict, False
+
+
+def moderate_with_cache(digest, media_type, moderate):
+    """
+    Kiểm duyệt media có hash `digest`, dùng lại kết quả cũ nếu có.
+    `moderate(fingerprints)` chạy AI + upload và trả về URL, hoặc raise ViolentContentError nếu media
+    bị từ chối; nó thêm perceptual hash của media vào danh sách `fingerprints` để lưu kèm kết quả.
+    Trả về (url, uploaded): uploaded=False nghĩa là URL lấy từ cache và asset thuộc về upload trước đó,
+    không được xoá. Raise ViolentContentError nếu media (hoặc bản giống hệt trước đó) bị từ chối.
+    """
+    if not AiResultConfig.MEDIA_VERDICT_CACHE_ENABLED:
+        return moderate([]), True
+
+    version = AiResultConfig.get_yolo_model_version()
+    deadline = time.monotonic() + AiResultConfig.MEDIA_VERDICT_WAIT_SECONDS
+
+    while True:
+        verdict, owned = _acquire(digest, media_type, version)
+        if owned:
+            break
+
+        if verdict.status == MediaVerdict.STATUS_ACCEPTED and verdict.model_version == version and verdict.media_url:
+            logger.info(f"Media verdict cache hit for {media_type} {digest[:12]}: accepted.")
+            return verdict.media_url, False
+
+        if verdict.status == MediaVerdict.STATUS_REJECTED and verdict.model_version == version:
+            logger.info(f"Media verdict cache hit for {media_type} {digest[:12]}: rejected.")
+            raise ViolentContentError(
+                'Ảnh chứa nội dung bạo lực và không hợp lệ.' if media_type == 'image'
+                else 'Video chứa nội dung bạo lực và không hợp lệ.'
+            )
+
+        if time.monotonic() >= deadline:
+            # Không chờ mãi: tự kiểm duyệt nhưng không ghi đè kết quả của request đang giữ chỗ
+            logger.warning(f"Timed out waiting for in-flight moderation of {digest[:12]}, moderating without cache.")
+            return moderate([]), True
+
+        time.sleep(POLL_INTERVAL_SECONDS)
+
+    fingerprints = []
+    try:
+        media_url = moderate(fingerprints)
+    except ViolentContentError:
+        MediaVerdict.objects.filter(pk=verdict.pk).update(
+            status=MediaVerdict.STATUS_REJECTED, model_version=version, media_url=None, updated_at=timezone.now()
+        )
+        record_fingerprints(verdict, fingerprints)
+        raise
+    except Exception:
+        # Lỗi kỹ thuật không phải là kết quả kiểm duyệt: bỏ chỗ giữ để request sau thử lại
+        MediaVerdict.objects.filter(pk=verdict.pk, status=MediaVerdict.STATUS_PENDING).delete()
+        raise
+
+    MediaVerdict.objects.filter(pk=verdict.pk).update(
+        status=MediaVerdict.STATUS_ACCEPTED, model_version=version, media_url=media_url, updated_at=timezone.now()
+    )
+    record_fingerprints(verdict, fingerprints)
+    return media_url, True
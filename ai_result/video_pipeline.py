@@ -0,0 +1,130 @@
+# ai_result/video_pipeline.py
+# Pipeline giải mã/suy luận cho kiểm duyệt video: một thread giải mã đẩy batch frame
+# vào hàng đợi có giới hạn, thread gọi hàm (request thread) lấy ra và chạy YOLO.
+#
+# Chỉ có một consumer suy luận, có chủ đích: model Ultralytics không an toàn khi nhiều thread cùng
+# predict() trên một instance, torch đã dùng hết các core cho một batch, và kết quả cần là frame bạo lực
+# *đầu tiên* theo thứ tự nên các batch phía sau chạy song song phần lớn là công sức bỏ đi khi dừng sớm.
+# Song song giữa các video đến từ nhiều request/worker và các tiến trình của inference_server.
+
+import logging
+import queue
+import threading
+
+from .utils import check_frame_batch, iter_frame_batches
+
+logger = logging.getLogger(__name__)
+
+# Giá trị đánh dấu thread giải mã đã đọc hết video
+_END_OF_STREAM = object()
+
+
+class _ByteBudget:
+    """Giới hạn tổng số byte frame đang nằm trong hàng đợi hoặc đang được suy luận."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.used = 0
+        self.peak = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, size, stop_event):
+        """Chờ tới khi đủ chỗ cho `size` byte. Trả về False nếu pipeline bị dừng trong lúc chờ."""
+        with self._condition:
+            # Một batch lớn hơn cả giới hạn vẫn được cho qua khi hàng đợi trống, tránh treo vĩnh viễn
+            while self.used and self.used + size > self.max_bytes:
+                if stop_event.is_set():
+                    return False
+                self._condition.wait(timeout=0.1)
+            self.used += size
+            self.peak = max(self.peak, self.used)
+            return True
+
+    def release(self, size):
+        with self._condition:
+            self.used -= size
+            self._condition.notify_all()
+
+
+def _batch_nbytes(batch_frames):
+    return sum(frame.nbytes for frame in batch_frames)
+
+
+def _put(frame_queue, item, stop_event):
+    """Đưa item vào hàng đợi, bỏ cuộc nếu pipeline bị dừng."""
+    while not stop_event.is_set():
+        try:
+            frame_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _decode_worker(sampled_frames, batch_size, frame_queue, budget, stop_event, errors):
+    try:
+        for batch_indices, batch_frames in iter_frame_batches(sampled_frames, batch_size):
+            if stop_event.is_set():
+                return
+            size = _batch_nbytes(batch_frames)
+            if not budget.acquire(size, stop_event):
+                return
+            if not _put(frame_queue, (batch_indices, batch_frames, size), stop_event):
+                budget.release(size)
+                return
+    except Exception as e:
+        logger.error(f"Error while decoding video frames: {str(e)}")
+        errors.append(e)
+    finally:
+        _put(frame_queue, _END_OF_STREAM, stop_event)
+
+
+def scan_frames_pipelined(sampled_frames, batch_size, queue_depth=4, max_queued_bytes=256 * 1024 * 1024, stats=None):
+    """
+    Giống scan_frames_for_violence nhưng giải mã video ở một thread riêng.
+    Hàng đợi chứa tối đa `queue_depth` batch và tối đa `max_queued_bytes` byte frame.
+    Pipeline dừng ngay khi gặp frame bạo lực hoặc khi có lỗi ở bất kỳ phía nào;
+    thread giải mã luôn kết thúc trước khi hàm trả về, nên có thể release VideoCapture ngay sau đó.
+    """
+    frame_queue = queue.Queue(maxsize=max(1, int(queue_depth)))
+    budget = _ByteBudget(max_queued_bytes)
+    stop_event = threading.Event()
+    errors = []
+
+    decoder = threading.Thread(
+        target=_decode_worker,
+        args=(sampled_frames, batch_size, frame_queue, budget, stop_event, errors),
+        name="video-decoder",
+        daemon=True,
+    )
+    decoder.start()
+
+    try:
+        while True:
+            item = frame_queue.get()
+            if item is _END_OF_STREAM:
+                break
+
+            batch_indices, batch_frames, size = item
+            try:
+                violent_frame = check_frame_batch(batch_indices, batch_frames, stats)
+            finally:
+                budget.release(size)
+            if violent_frame is not None:
+                return violent_frame
+
+        if errors:
+            raise errors[0]
+        return None
+
+    finally:
+        stop_event.set()
+        # Giải phóng hàng đợi để thread giải mã không bị kẹt khi đang put
+        while decoder.is_alive():
+            try:
+                frame_queue.get_nowait()
+            except queue.Empty:
+                pass
+            decoder.join(timeout=0.1)
+        if stats is not None:
+            stats['peak_queued_bytes'] = budget.peak
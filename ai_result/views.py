@@ -1,217 +1,99 @@
-import os
-import cv2
-import numpy as np
-import shutil
 import logging
 import json
 
-from django.shortcuts import render
 from django.http import JsonResponse, HttpResponseBadRequest, HttpResponseServerError
-from django.views.decorators.csrf import csrf_exempt 
-from django.conf import settings
+from rest_framework.decorators import api_view, permission_classes
 
 from .apps import AiResultConfig 
-from tensorflow.keras.preprocessing.sequence import pad_sequences
+from .permissions import IsModerationAdmin
 
-from .utils import upload_video, upload_image, get_optimized_video_url, get_optimized_url
+from .utils import ViolentContentError, process_and_upload_image, process_and_upload_video, score_comment_texts, text_model_ready, yolo_ready
+from .text_batcher import text_batcher_stats
+from .text_cache import get_text_cache
 
 logger = logging.getLogger(__name__)
 
-def get_sequences(texts, tokenizer, train=True, max_seq_length=2138):
-    if tokenizer is None:
-        return None
-    sequences = tokenizer.texts_to_sequences(texts)
-    sequences = pad_sequences(sequences, maxlen=max_seq_length, padding='post', truncating='post')
-    return sequences
-
-def check_frame_for_violence(frame, model, target_classes, confidence_threshold):
-    if model is None:
-        logger.warning("YOLO model is not loaded. Cannot check for violence.")
-        return False # Không thể kiểm tra nếu model không tải
-
-    results = model.predict(frame, conf=confidence_threshold, verbose=False)
-
-    for result in results:
-        for box in result.boxes:
-            class_id = int(box.cls[0])
-            detected_class_name = model.names[class_id]
-            confidence = float(box.conf[0])
-
-            if detected_class_name in target_classes:
-                logger.warning(f"Violent content detected: Class '{detected_class_name}' with confidence {confidence:.2f}")
-                return True
-    return False
-
-@csrf_exempt # Cân nhắc việc xử lý CSRF token nếu đây là API nội bộ hoặc bạn có cơ chế bảo mật khác
+@api_view(['POST'])
+@permission_classes([IsModerationAdmin])
 def predict_text(request):
-    if request.method == 'POST':
-        if YourAppConfig.text_model is None or YourAppConfig.text_tokenizer is None:
-            return HttpResponseServerError(json.dumps({'error': 'Text prediction model or tokenizer not loaded.'}), content_type='application/json')
-
-        try:
-            data = json.loads(request.body)
-        except json.JSONDecodeError:
-            return HttpResponseBadRequest(json.dumps({'error': 'Invalid JSON format.'}), content_type='application/json')
-
-        text = data.get('text')
-
-        if not text or not isinstance(text, str) or not text.strip():
-            return HttpResponseBadRequest(json.dumps({'error': 'Valid text string is required.'}), content_type='application/json')
-
-        try:
-            test_processed = get_sequences([text], YourAppConfig.text_tokenizer, train=False, max_seq_length=2138)
-            if test_processed is None:
-                 return HttpResponseServerError(json.dumps({'error': 'Error processing text sequence.'}), content_type='application/json')
-
-        except Exception as e:
-             logger.error(f"Error processing text: {str(e)}")
-             return HttpResponseServerError(json.dumps({'error': f'Error processing text: {str(e)}'}), content_type='application/json')
-
-        try:
-            prediction = YourAppConfig.text_model.predict(test_processed)
-        except Exception as e:
-             logger.error(f"Error during model prediction: {str(e)}")
-             return HttpResponseServerError(json.dumps({'error': f'Error during model prediction: {str(e)}'}), content_type='application/json')
-
-        prediction_label = 1 if np.squeeze(prediction) >= 0.4 else 0
-
-        return JsonResponse({'text': text, 'prediction': prediction_label})
-    else:
-        return HttpResponseBadRequest("Only POST method is allowed.")
+    """
+    Chấm điểm text theo lô cho backfill và công cụ admin.
+    Body: {"texts": [...]} (hoặc một mảng JSON), trả về nhãn và điểm cho từng text theo đúng thứ tự;
+    {"text": "..."} vẫn được hỗ trợ như trước.
+    """
+    data = request.data
+    single = isinstance(data, dict) and 'texts' not in data
+    texts = [data.get('text')] if single else (data.get('texts') if isinstance(data, dict) else data)
+
+    if not isinstance(texts, list) or not texts:
+        return HttpResponseBadRequest(json.dumps({'error': 'A non-empty JSON array of texts is required.'}), content_type='application/json')
+    if len(texts) > AiResultConfig.TEXT_PREDICT_MAX_ITEMS:
+        return HttpResponseBadRequest(json.dumps({'error': f'At most {AiResultConfig.TEXT_PREDICT_MAX_ITEMS} texts per request.'}), content_type='application/json')
+    if not all(isinstance(text, str) and text.strip() for text in texts):
+        return HttpResponseBadRequest(json.dumps({'error': 'Every text must be a non-empty string.'}), content_type='application/json')
+
+    if not text_model_ready():
+        return HttpResponseServerError(json.dumps({'error': 'Text prediction model or tokenizer not loaded.'}), content_type='application/json')
+
+    try:
+        scores = score_comment_texts(texts)
+    except Exception as e:
+        logger.error(f"Error during text prediction: {str(e)}", exc_info=True)
+        return HttpResponseServerError(json.dumps({'error': f'Error during model prediction: {str(e)}'}), content_type='application/json')
+    if scores is None:
+        return HttpResponseServerError(json.dumps({'error': 'Error processing text sequence.'}), content_type='application/json')
+
+    # Ngưỡng phân loại 0.4 giống analyze_comment_text
+    results = [
+        {'text': text, 'prediction': 1 if score >= 0.4 else 0, 'score': score}
+        for text, score in zip(texts, scores)
+    ]
+    if single:
+        return JsonResponse(results[0])
+    return JsonResponse({'results': results})
+
+
+def _check_media(request, process_func, media_type, label):
+    """Kiểm duyệt và tải lên file `file` của request qua cùng đường xử lý với bài đăng (cache, pipeline, upload)."""
+    if not yolo_ready():
+        logger.error(f"YOLO model not loaded, cannot process {media_type}.")
+        return HttpResponseServerError(json.dumps({'error': 'YOLO model not loaded.'}), content_type='application/json')
+
+    uploaded_file = request.FILES.get('file')
+    if uploaded_file is None:
+        return HttpResponseBadRequest(json.dumps({'error': 'No file provided.'}), content_type='application/json')
+
+    try:
+        media_url = process_func(uploaded_file)
+    except ViolentContentError:
+        logger.info(f"{label} {uploaded_file.name} contains violent content.")
+        return HttpResponseBadRequest(json.dumps({'message': f'{label} contains violent content and is not valid.'}), content_type='application/json')
+    except ValueError as e:
+        # process_and_upload_* gói mọi lỗi (file hỏng, Cloudinary...) thành ValueError
+        return HttpResponseBadRequest(json.dumps({'error': str(e)}), content_type='application/json')
+
+    return JsonResponse({'message': f'{label} is valid and uploaded successfully.', f'{media_type}_url': media_url})
+
+
+@api_view(['POST'])
+@permission_classes([IsModerationAdmin])
+def check_video(request):
+    """Kiểm tra video bạo lực và tải lên Cloudinary nếu hợp lệ (công cụ admin)."""
+    return _check_media(request, process_and_upload_video, 'video', 'Video')
 
 
-@csrf_exempt # Cân nhắc việc xử lý CSRF token
-def check_video(request):
-    if request.method == 'POST':
-        if YourAppConfig.yolo_model is None:
-            logger.error("YOLO model not loaded, cannot process video.")
-            return HttpResponseServerError(json.dumps({'error': 'YOLO model not loaded.'}), content_type='application/json')
-
-        if 'file' not in request.FILES:
-            return HttpResponseBadRequest(json.dumps({'error': 'No file provided.'}), content_type='application/json')
-
-        uploaded_file = request.FILES['file']
-        temp_dir = os.path.join(settings.MEDIA_ROOT, "temp_files") # Sử dụng MEDIA_ROOT để lưu file tạm
-        os.makedirs(temp_dir, exist_ok=True)
-        temp_file_path = os.path.join(temp_dir, uploaded_file.name)
-
-        try:
-            with open(temp_file_path, "wb") as buffer:
-                shutil.copyfileobj(uploaded_file, buffer)
-            logger.info(f"Successfully saved temporary video file: {temp_file_path}")
-        except Exception as e:
-            logger.error(f"Could not save file {uploaded_file.name}: {e}")
-            return HttpResponseServerError(json.dumps({'error': f'Could not save file: {e}'}), content_type='application/json')
-
-        video_capture = cv2.VideoCapture(temp_file_path)
-        if not video_capture.isOpened():
-            logger.error(f"Could not open video file: {temp_file_path}")
-            os.remove(temp_file_path)
-            return HttpResponseBadRequest(json.dumps({'error': 'Could not open video file.'}), content_type='application/json')
-
-        logger.info(f"AI processing started for video: {uploaded_file.name}")
-
-        violent_detected = False
-        frame_count = 0
-
-        while True:
-            ret, frame = video_capture.read()
-            if not ret:
-                break
-
-            frame_count += 1
-
-            if frame_count % 5 == 0: # Kiểm tra mỗi 5 frame
-                logging.info(f"Processing frame {frame_count}...")
-                if check_frame_for_violence(frame, YourAppConfig.yolo_model, YourAppConfig.TARGET_CLASSES, YourAppConfig.CONFIDENCE_THRESHOLD):
-                    violent_detected = True
-                    logging.warning(f"Violent content detected at frame {frame_count}. Stopping processing.")
-                    break
-
-        video_capture.release()
-
-        logger.info(f"AI processing finished for video: {uploaded_file.name}")
-
-        if violent_detected:
-            os.remove(temp_file_path)
-            logger.info(f"Video {uploaded_file.name} contains violent content, temporary file removed.")
-            return HttpResponseBadRequest(json.dumps({'message': 'Video contains violent content and is not valid.'}), content_type='application/json')
-        else:
-            logger.info(f"No violent content detected in {uploaded_file.name}. Uploading video to Cloudinary...")
-            try:
-                public_id = os.path.splitext(uploaded_file.name)[0] + "_video"
-                upload_result = upload_video(temp_file_path, public_id=public_id)
-                video_url = upload_result.get("url")
-                os.remove(temp_file_path)
-                logger.info(f"Video {uploaded_file.name} uploaded successfully to Cloudinary. URL: {video_url}")
-                return JsonResponse({'message': 'Video is valid and uploaded successfully.', 'video_url': video_url})
-            except ValueError as e:
-                os.remove(temp_file_path)
-                logger.error(f"Cloudinary upload failed for video {uploaded_file.name}: {str(e)}")
-                return HttpResponseServerError(json.dumps({'error': str(e)}), content_type='application/json')
-            except Exception as e:
-                os.remove(temp_file_path)
-                logger.error(f"An unexpected error occurred during video upload for {uploaded_file.name}: {str(e)}")
-                return HttpResponseServerError(json.dumps({'error': f'An unexpected error occurred during upload: {str(e)}'}), content_type='application/json')
-    else:
-        return HttpResponseBadRequest("Only POST method is allowed.")
-
-
-@csrf_exempt # Cân nhắc việc xử lý CSRF token
+@api_view(['POST'])
+@permission_classes([IsModerationAdmin])
 def check_image(request):
-    if request.method == 'POST':
-        if YourAppConfig.yolo_model is None:
-            logger.error("YOLO model not loaded, cannot process image.")
-            return HttpResponseServerError(json.dumps({'error': 'YOLO model not loaded.'}), content_type='application/json')
-
-        if 'file' not in request.FILES:
-            return HttpResponseBadRequest(json.dumps({'error': 'No file provided.'}), content_type='application/json')
-
-        uploaded_file = request.FILES['file']
-        temp_dir = os.path.join(settings.MEDIA_ROOT, "temp_files") # Sử dụng MEDIA_ROOT để lưu file tạm
-        os.makedirs(temp_dir, exist_ok=True)
-        temp_file_path = os.path.join(temp_dir, uploaded_file.name)
-
-        try:
-            with open(temp_file_path, "wb") as buffer:
-                shutil.copyfileobj(uploaded_file, buffer)
-            logger.info(f"Successfully saved temporary image file: {temp_file_path}")
-        except Exception as e:
-            logger.error(f"Could not save file {uploaded_file.name}: {e}")
-            return HttpResponseServerError(json.dumps({'error': f'Could not save file: {e}'}), content_type='application/json')
-
-        image = cv2.imread(temp_file_path)
-        if image is None:
-            logger.error(f"Could not read image file: {temp_file_path}")
-            os.remove(temp_file_path)
-            return HttpResponseBadRequest(json.dumps({'error': 'Could not read image file.'}), content_type='application/json')
-
-        logger.info(f"AI processing started for image: {uploaded_file.name}")
-
-        violent_detected = check_frame_for_violence(image, YourAppConfig.yolo_model, YourAppConfig.TARGET_CLASSES, YourAppConfig.CONFIDENCE_THRESHOLD)
-
-        logger.info(f"AI processing finished for image: {uploaded_file.name}")
-
-        if violent_detected:
-            os.remove(temp_file_path)
-            logger.info(f"Image {uploaded_file.name} contains violent content, temporary file removed.")
-            return HttpResponseBadRequest(json.dumps({'message': 'Image contains violent content and is not valid.'}), content_type='application/json')
-        else:
-            logger.info(f"No violent content detected in {uploaded_file.name}. Uploading image to Cloudinary...")
-            try:
-                public_id = os.path.splitext(uploaded_file.name)[0] + "_image"
-                upload_result = upload_image(temp_file_path, public_id=public_id)
-                image_url = upload_result.get("url")
-                os.remove(temp_file_path)
-                logger.info(f"Image {uploaded_file.name} uploaded successfully to Cloudinary. URL: {image_url}")
-                return JsonResponse({'message': 'Image is valid and uploaded successfully.', 'image_url': image_url})
-            except ValueError as e:
-                os.remove(temp_file_path)
-                logger.error(f"Cloudinary upload failed for image {uploaded_file.name}: {str(e)}")
-                return HttpResponseServerError(json.dumps({'error': str(e)}), content_type='application/json')
-            except Exception as e:
-                os.remove(temp_file_path)
-                logger.error(f"An unexpected error occurred during image upload for {uploaded_file.name}: {str(e)}")
-                return HttpResponseServerError(json.dumps({'error': f'An unexpected error occurred during upload: {str(e)}'}), content_type='application/json')
-    else:
-        return HttpResponseBadRequest("Only POST method is allowed.")
+    """Kiểm tra ảnh bạo lực và tải lên Cloudinary nếu hợp lệ (công cụ admin)."""
+    return _check_media(request, process_and_upload_image, 'image', 'Image')
+
+
+@api_view(['GET'])
+@permission_classes([IsModerationAdmin])
+def moderation_stats(request):
+    """Thống kê kiểm duyệt comment của tiến trình xử lý request (cache kết quả, micro-batching)."""
+    return JsonResponse({
+        'text_cache': get_text_cache().stats() if AiResultConfig.TEXT_CACHE_ENABLED else None,
+        'text_batcher': text_batcher_stats() if AiResultConfig.TEXT_BATCHING_ENABLED else None,
+    })
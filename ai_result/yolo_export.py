@@ -0,0 +1,62 @@
+# ai_result/yolo_export.py
+# Các bản export của YOLO cho worker chỉ có CPU: ONNX (ONNX Runtime) và OpenVINO, có thể lượng tử hóa INT8.
+# Ultralytics nạp được trực tiếp các bản export này bằng YOLO(path), nên phần suy luận không thay đổi.
+
+import logging
+import os
+import shutil
+
+logger = logging.getLogger(__name__)
+
+YOLO_FORMATS = ('pt', 'onnx', 'openvino')
+# Kích thước ảnh mặc định của Ultralytics; best.pt được train ở kích thước này
+DEFAULT_IMGSZ = 640
+
+
+def yolo_artifact_path(models_dir, model_format='pt', int8=False):
+    """Đường dẫn model YOLO cho một định dạng: best.pt, best[_int8].onnx, best[_int8]_openvino_model/."""
+    if model_format not in YOLO_FORMATS:
+        raise ValueError(f"Unknown YOLO format '{model_format}', expected one of {', '.join(YOLO_FORMATS)}.")
+    if model_format == 'pt':
+        return os.path.join(models_dir, 'best.pt')
+    suffix = '_int8' if int8 else ''
+    if model_format == 'onnx':
+        return os.path.join(models_dir, f'best{suffix}.onnx')
+    return os.path.join(models_dir, f'best{suffix}_openvino_model')
+
+
+def export_yolo(models_dir, model_format, int8=False, imgsz=DEFAULT_IMGSZ, data=None):
+    """
+    Export best.pt sang `model_format` và đặt kết quả tại yolo_artifact_path(...). Trả về đường dẫn đó.
+    OpenVINO INT8 dùng lượng tử hóa có hiệu chỉnh của Ultralytics (cần `data`, file yaml bộ ảnh hiệu chỉnh);
+    ONNX INT8 lượng tử hóa động trọng số bằng onnxruntime.quantization.
+    """
+    from ultralytics import YOLO
+
+    if model_format == 'pt':
+        raise ValueError('best.pt is the source model, nothing to export.')
+
+    source = yolo_artifact_path(models_dir, 'pt')
+    target = yolo_artifact_path(models_dir, model_format, int8)
+    options = {'format': model_format, 'imgsz': imgsz, 'dynamic': True}
+    if model_format == 'openvino' and int8:
+        options['int8'] = True
+        if data:
+            options['data'] = data
+
+    # Batch động để predict được cả batch frame video (VIDEO_BATCH_SIZE)
+    exported = YOLO(source).export(**options)
+    logger.info(f"Exported {source} to {exported}.")
+
+    if model_format == 'onnx' and int8:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(exported, target, weight_type=QuantType.QInt8)
+        os.remove(exported)
+    elif os.path.abspath(exported) != os.path.abspath(target):
+        if os.path.isdir(target):
+            shutil.rmtree(target)
+        elif os.path.exists(target):
+            os.remove(target)
+        shutil.move(exported, target)
+    return target
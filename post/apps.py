@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PostConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'post'
+
+    def ready(self):
+        # Đăng ký signal cập nhật chỉ mục feed và bộ đếm like/comment/share
+        from . import signals  # noqa: F401
@@ -0,0 +1,52 @@
+# post/counters.py
+# Bộ đếm like/comment/share lưu trên Post (likes_count, comments_count, shares_count) để đọc bài đăng không phải
+# COUNT các bảng Like/Comment/Share. Mỗi lần tạo/xoá (kể cả xoá dây chuyền khi xoá người dùng hay bài đăng)
+# cộng/trừ bằng một UPDATE F() nguyên tử (post/signals.py). Sai lệch do ghi dữ liệu không qua signal
+# (QuerySet.update, bulk_create, SQL thủ công) được sửa bằng lệnh reconcile_post_counters.
+
+from django.db.models import F, OuterRef
+
+from user.queries import count_subquery
+
+from .models import Post
+
+
+def adjust_counter(post_id, field, delta):
+    """Cộng `delta` vào bộ đếm `field` của bài đăng; không xuống dưới 0. Không làm gì nếu bài đăng đã bị xoá."""
+    queryset = Post.objects.filter(pk=post_id)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def counter_subqueries():
+    """Số like/comment/share thực tế của mỗi bài đăng, dạng subquery theo OuterRef('pk')."""
+    from comment.models import Comment
+    from like.models import Like
+    from share.models import Share
+
+    return {
+        'likes_count': count_subquery(Like.objects.filter(target_type='post', target_id=OuterRef('pk'))),
+        'comments_count': count_subquery(Comment.objects.filter(post=OuterRef('pk'))),
+        'shares_count': count_subquery(Share.objects.filter(post=OuterRef('pk'))),
+    }
+
+
+def reconcile_batch(post_ids, dry_run=False):
+    """
+    So bộ đếm của các bài đăng `post_ids` với số dòng thực tế và sửa các bài lệch. Giá trị đúng được tính lại
+    ngay trong câu UPDATE nên không ghi đè các thay đổi đồng thời. Trả về {post_id: {field: (lưu, thực tế)}}.
+    """
+    actual = {f'actual_{field}': subquery for field, subquery in counter_subqueries().items()}
+    drift = {}
+    for row in Post.objects.filter(pk__in=post_ids).annotate(**actual).values('pk', *Post.COUNTER_FIELDS, *actual):
+        fields = {
+            field: (row[field], row[f'actual_{field}'])
+            for field in Post.COUNTER_FIELDS
+            if row[field] != row[f'actual_{field}']
+        }
+        if fields:
+            drift[row['pk']] = fields
+    if drift and not dry_run:
+        Post.objects.filter(pk__in=list(drift)).update(**counter_subqueries())
+    return drift
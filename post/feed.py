@@ -0,0 +1,69 @@
+# post/feed.py
+# Chỉ mục lấy mẫu ngẫu nhiên cho feed: mỗi bài đăng published có feed_seq là một số trong 1..N (dày đặc,
+# N lưu ở PostFeedCounter). Lấy k bài ngẫu nhiên chỉ cần chọn k số trong 1..N và một truy vấn theo index,
+# thay vì tải toàn bộ id bài đăng. Bài rời khỏi feed (xoá, bị từ chối) nhường chỗ cho bài có feed_seq = N
+# để dãy số luôn liền mạch. Được cập nhật qua signal của Post (post/signals.py).
+
+import random
+
+from django.db import transaction
+
+from .models import Post, PostFeedCounter
+
+COUNTER_ID = 1
+
+
+def _locked_counter():
+    # Khoá dòng đếm: mọi thay đổi chỉ mục được thực hiện tuần tự
+    counter, _ = PostFeedCounter.objects.select_for_update().get_or_create(pk=COUNTER_ID)
+    return counter
+
+
+def add_to_feed(post_id):
+    """Thêm bài đăng published vào cuối chỉ mục (không làm gì nếu đã có). Trả về feed_seq hoặc None."""
+    with transaction.atomic():
+        counter = _locked_counter()
+        seq = counter.size + 1
+        added = Post.objects.filter(pk=post_id, status=Post.STATUS_PUBLISHED, feed_seq__isnull=True).update(feed_seq=seq)
+        if not added:
+            return None
+        counter.size = seq
+        counter.save(update_fields=['size'])
+        return seq
+
+
+def remove_from_feed(post_id):
+    """Bỏ bài đăng khỏi chỉ mục; bài đăng ở cuối (feed_seq = N) được chuyển vào chỗ trống."""
+    with transaction.atomic():
+        counter = _locked_counter()
+        # Đọc lại trong lúc giữ khoá: feed_seq trong bộ nhớ có thể đã cũ (bài đăng đã được chuyển chỗ)
+        seq = Post.objects.filter(pk=post_id).values_list('feed_seq', flat=True).first()
+        if seq is None:
+            return
+        Post.objects.filter(pk=post_id).update(feed_seq=None)
+        if seq != counter.size:
+            Post.objects.filter(feed_seq=counter.size).update(feed_seq=seq)
+        counter.size -= 1
+        counter.save(update_fields=['size'])
+
+
+def feed_size():
+    return PostFeedCounter.objects.filter(pk=COUNTER_ID).values_list('size', flat=True).first() or 0
+
+
+def sample_feed_posts(count, queryset=None, size=None):
+    """
+    Danh sách tối đa `count` bài đăng published ngẫu nhiên (phân bố đều, theo thứ tự ngẫu nhiên), O(count) mỗi lần gọi.
+    `queryset` (mặc định Post.objects.all()) cho phép annotate sẵn các bài đăng được chọn;
+    `size` là kích thước feed nếu người gọi đã đọc (tránh đọc lại dòng đếm).
+    """
+    if queryset is None:
+        queryset = Post.objects.all()
+    if size is None:
+        size = feed_size()
+    if size == 0:
+        return []
+    seqs = random.sample(range(1, size + 1), min(count, size))
+    # Sắp lại theo thứ tự đã bốc: thứ tự mặc định của bảng sẽ luôn đưa bài mới/cũ lên đầu
+    by_seq = {post.feed_seq: post for post in queryset.filter(feed_seq__in=seqs)}
+    return [by_seq[seq] for seq in seqs if seq in by_seq]
@@ -0,0 +1,76 @@
+import random
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ai_result.benchmarking import percentiles, rss_bytes
+from post.feed import feed_size, sample_feed_posts
+from post.models import Post, PostFeedCounter
+from post.views import NUM_RANDOM_POSTS
+from user.models import User
+
+BATCH_SIZE = 10000
+
+
+def legacy_sample(count):
+    """Cách cũ của RandomPostView: tải toàn bộ id bài đăng published rồi random.sample."""
+    post_ids = list(Post.objects.filter(status=Post.STATUS_PUBLISHED).values_list('id', flat=True))
+    return list(Post.objects.filter(id__in=random.sample(post_ids, min(count, len(post_ids)))))
+
+
+def indexed_sample(count):
+    return list(sample_feed_posts(count))
+
+
+class Command(BaseCommand):
+    help = (
+        "So sánh lấy bài đăng ngẫu nhiên qua chỉ mục feed_seq với cách cũ (tải mọi id) ở nhiều quy mô. "
+        "Bài đăng giả được thêm vào DB trong một transaction và rollback khi xong; 10M dòng mất nhiều phút."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 1000000, 10000000])
+        parser.add_argument('--samples', type=int, default=200, help="Số lần lấy mẫu cho mỗi cách.")
+        parser.add_argument('--legacy-max', type=int, default=1000000, help="Bỏ qua cách cũ khi số bài đăng lớn hơn.")
+
+    def handle(self, *args, **options):
+        for size in sorted(options['sizes']):
+            with transaction.atomic():
+                self.populate(size)
+                self.report(size, 'indexed', indexed_sample, options['samples'])
+                if feed_size() <= options['legacy_max']:
+                    # Cách cũ chậm hơn nhiều bậc: đo ít lần hơn
+                    self.report(size, 'legacy', legacy_sample, max(1, options['samples'] // 20))
+                else:
+                    self.stdout.write(f"{size:>10} legacy   skipped (> --legacy-max)")
+                transaction.set_rollback(True)
+
+    def populate(self, size):
+        started = time.perf_counter()
+        user = User.objects.create(username=f"bench_{uuid.uuid4().hex[:12]}", email=f"{uuid.uuid4().hex[:12]}@bench.invalid")
+        counter, _ = PostFeedCounter.objects.select_for_update().get_or_create(pk=1)
+        # bulk_create không gửi signal: đánh feed_seq trực tiếp, nối tiếp các bài đăng đã có
+        base = counter.size
+        for start in range(0, size, BATCH_SIZE):
+            Post.objects.bulk_create([
+                Post(user=user, description='benchmark', status=Post.STATUS_PUBLISHED, feed_seq=base + i + 1)
+                for i in range(start, min(size, start + BATCH_SIZE))
+            ])
+        counter.size = base + size
+        counter.save(update_fields=['size'])
+        self.stdout.write(f"{size:>10} posts inserted in {time.perf_counter() - started:.1f}s (feed size {counter.size})")
+
+    def report(self, size, name, sample, runs):
+        before = rss_bytes()
+        seconds = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            posts = sample(NUM_RANDOM_POSTS)
+            seconds.append(time.perf_counter() - started)
+        stats = percentiles(seconds)
+        self.stdout.write(
+            f"{size:>10} {name:<8} p50 {stats['p50_ms']:9.2f} ms  p95 {stats['p95_ms']:9.2f} ms  "
+            f"p99 {stats['p99_ms']:9.2f} ms  RSS +{(rss_bytes() - before) / 2 ** 20:7.1f} MiB  ({len(posts)} posts)"
+        )
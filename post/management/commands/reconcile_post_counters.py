@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from post.counters import reconcile_batch
+from post.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        "So bộ đếm likes_count/comments_count/shares_count của bài đăng với số dòng Like/Comment/Share thực tế "
+        "và sửa các bài bị lệch, theo lô id để không khoá cả bảng Post."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Số bài đăng mỗi lô.")
+        parser.add_argument('--dry-run', action='store_true', help="Chỉ liệt kê các bài lệch, không sửa.")
+        parser.add_argument('--verbose-drift', action='store_true', help="In từng bài đăng bị lệch.")
+
+    def handle(self, *args, **options):
+        checked = 0
+        drifted = 0
+        last_pk = None
+        while True:
+            # Phân trang theo khoá chính thay vì OFFSET: mỗi lô là một truy vấn theo index
+            queryset = Post.objects.order_by('pk')
+            if last_pk is not None:
+                queryset = queryset.filter(pk__gt=last_pk)
+            post_ids = list(queryset.values_list('pk', flat=True)[:options['batch_size']])
+            if not post_ids:
+                break
+            last_pk = post_ids[-1]
+            drift = reconcile_batch(post_ids, dry_run=options['dry_run'])
+            checked += len(post_ids)
+            drifted += len(drift)
+            if options['verbose_drift']:
+                for post_id, fields in drift.items():
+                    changes = ", ".join(f"{field} {stored} -> {actual}" for field, (stored, actual) in fields.items())
+                    self.stdout.write(f"{post_id}: {changes}")
+
+        action = "found" if options['dry_run'] else "repaired"
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} posts, {action} {drifted} with drifted counters."))
@@ -0,0 +1,56 @@
+import logging
+import multiprocessing
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from post.moderation import run_worker
+
+logger = logging.getLogger(__name__)
+
+
+def _worker_main(poll_interval, once):
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stop.set())
+    signal.signal(signal.SIGINT, lambda *args: stop.set())
+    run_worker(poll_interval=poll_interval, once=once, should_stop=stop.is_set)
+
+
+class Command(BaseCommand):
+    help = "Chạy worker kiểm duyệt bài đăng bất đồng bộ (lấy job từ bảng PostModerationJob)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help="Số tiến trình worker.")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Số giây chờ khi hàng đợi trống.")
+        parser.add_argument('--once', action='store_true', help="Xử lý hết các job đang chờ rồi thoát.")
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        poll_interval = options['poll_interval']
+        once = options['once']
+
+        if workers == 1:
+            self.stdout.write("Starting moderation worker.")
+            _worker_main(poll_interval, once)
+            return
+
+        # Mỗi tiến trình con dùng kết nối DB riêng: đóng kết nối của tiến trình cha trước khi fork
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=_worker_main, args=(poll_interval, once), name=f"moderation-worker-{i}")
+            for i in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(f"Started {workers} moderation workers.")
+
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join()
@@ -0,0 +1,44 @@
+# Generated by Django 5.2 on 2026-10-18 19:37
+
+from django.db import migrations, models
+
+
+def build_feed_index(apps, schema_editor):
+    """Đánh số 1..N cho các bài đăng published đã có (theo thời gian tạo) và tạo dòng đếm."""
+    Post = apps.get_model('post', 'Post')
+    PostFeedCounter = apps.get_model('post', 'PostFeedCounter')
+    size = 0
+    batch = []
+    for post in Post.objects.filter(status='published').order_by('created_at').only('id').iterator(chunk_size=2000):
+        size += 1
+        post.feed_seq = size
+        batch.append(post)
+        if len(batch) >= 2000:
+            Post.objects.bulk_update(batch, ['feed_seq'])
+            batch = []
+    if batch:
+        Post.objects.bulk_update(batch, ['feed_seq'])
+    PostFeedCounter.objects.update_or_create(pk=1, defaults={'size': size})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0002_post_status_postmoderationjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostFeedCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('size', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='feed_seq',
+            field=models.BigIntegerField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.RunPython(build_feed_index, migrations.RunPython.noop),
+    ]
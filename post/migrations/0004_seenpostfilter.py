@@ -0,0 +1,26 @@
+# Generated by Django 5.2 on 2026-10-18 19:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0003_post_feed_seq'),
+        ('user', '0002_user_is_verified_user_otp_code_user_otp_expires_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeenPostFilter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='seen_post_filter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('current', models.BinaryField()),
+                ('previous', models.BinaryField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
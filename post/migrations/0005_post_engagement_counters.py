@@ -0,0 +1,54 @@
+# Generated by Django 5.2 on 2026-10-18 19:42
+
+from django.db import migrations, models
+from django.db.models import F, Func, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(queryset):
+    counted = queryset.order_by().annotate(_count=Func(F('pk'), function='COUNT')).values('_count')
+    return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+
+def fill_counters(apps, schema_editor):
+    """Tính bộ đếm like/comment/share cho các bài đăng đã có, theo lô id."""
+    Post = apps.get_model('post', 'Post')
+    Like = apps.get_model('like', 'Like')
+    Comment = apps.get_model('comment', 'Comment')
+    Share = apps.get_model('share', 'Share')
+    post_ids = list(Post.objects.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(post_ids), 2000):
+        Post.objects.filter(pk__in=post_ids[start:start + 2000]).update(
+            likes_count=count_subquery(Like.objects.filter(target_type='post', target_id=OuterRef('pk'))),
+            comments_count=count_subquery(Comment.objects.filter(post=OuterRef('pk'))),
+            shares_count=count_subquery(Share.objects.filter(post=OuterRef('pk'))),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('post', '0004_seenpostfilter'),
+        ('like', '0001_initial'),
+        ('comment', '0001_initial'),
+        ('share', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='shares_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -3,12 +3,93 @@ import uuid
 from user.models import User
 
 class Post(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_PUBLISHED = 'published'
+    STATUS_REJECTED = 'rejected'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_PUBLISHED, 'Published'),
+        (STATUS_REJECTED, 'Rejected'),
+    ]
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False, unique=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts')
     media = models.TextField(blank=True, null=True)
     description = models.TextField(blank=True, null=True)  # Based on your SQL schema
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)  # Based on your SQL schema
-    
+    # Bài đăng tạo ở chế độ kiểm duyệt bất đồng bộ ở trạng thái pending cho tới khi worker xử lý xong
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PUBLISHED, db_index=True)
+    # Vị trí 1..N của bài đăng published trong chỉ mục lấy mẫu ngẫu nhiên (xem post/feed.py), None nếu không published
+    feed_seq = models.BigIntegerField(blank=True, null=True, unique=True, editable=False)
+    # Số like/comment/share, chỉ được thay đổi bằng UPDATE F() khi tạo/xoá (xem post/counters.py)
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+    shares_count = models.PositiveIntegerField(default=0, editable=False)
+
+    COUNTER_FIELDS = ('likes_count', 'comments_count', 'shares_count')
+    # Các cột chỉ được thay đổi bằng UPDATE trong post/feed.py (khi giữ khoá dòng đếm) và post/counters.py
+    MANAGED_FIELDS = ('feed_seq',) + COUNTER_FIELDS
+
+    def save(self, *args, **kwargs):
+        # save() đầy đủ không ghi lại các cột này: giá trị trong bộ nhớ có thể đã cũ so với các UPDATE đồng thời
+        # (bài đăng bị chuyển chỗ trong chỉ mục feed, like/comment/share mới)
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.MANAGED_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Post by {self.user.username}"
+
+
+class PostFeedCounter(models.Model):
+    """Một dòng duy nhất: số bài đăng published N, feed_seq của chúng luôn là đúng các số 1..N."""
+    size = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Feed index with {self.size} posts"
+
+
+class PostModerationJob(models.Model):
+    """Job kiểm duyệt + upload media của một bài đăng, được worker (run_moderation_worker) xử lý."""
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False, unique=True)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='moderation_jobs')
+    media_type = models.CharField(max_length=10, choices=[('image', 'Image'), ('video', 'Video')])
+    file_path = models.TextField()
+    original_name = models.CharField(max_length=255)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED, db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    locked_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Moderation job {self.id} for post {self.post_id}: {self.status}"
+
+
+class SeenPostFilter(models.Model):
+    """Bloom filter xoay vòng các bài đăng người dùng đã được gợi ý trong feed ngẫu nhiên (xem post/seen_filter.py)."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='seen_post_filter')
+    current = models.BinaryField()
+    previous = models.BinaryField()
+    # Số bài đăng đã thêm vào `current`; đủ sức chứa thì `current` thành `previous` và bắt đầu filter mới
+    count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Seen posts filter of {self.user_id}"
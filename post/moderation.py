@@ -0,0 +1,224 @@
+# post/moderation.py
+# Kiểm duyệt bất đồng bộ cho bài đăng: request chỉ lưu file upload và tạo Post ở trạng thái pending,
+# worker (manage.py run_moderation_worker) lấy job từ bảng PostModerationJob, chạy AI + upload
+# rồi chuyển bài đăng sang published hoặc rejected. Không cần message broker bên ngoài.
+
+import logging
+import os
+import shutil
+import time
+import uuid
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.core.files import File
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from ai_result.speculative_upload import destroy_asset
+from ai_result.utils import ViolentContentError, process_and_upload_image, process_and_upload_video, public_id_from_url
+from .models import Post, PostModerationJob
+
+logger = logging.getLogger(__name__)
+
+# Mỗi processor trả về (url, uploaded): uploaded=False khi URL lấy từ verdict cache (asset dùng chung, không được xoá)
+PROCESSORS = {
+    'image': partial(process_and_upload_image, return_uploaded=True),
+    'video': partial(process_and_upload_video, return_uploaded=True),
+}
+
+
+def _queue_dir():
+    queue_dir = os.path.join(settings.MEDIA_ROOT, "moderation_queue")
+    os.makedirs(queue_dir, exist_ok=True)
+    return queue_dir
+
+
+def enqueue_post_moderation(user, description, media_file, media_type):
+    """
+    Lưu file upload vào thư mục hàng đợi, tạo Post (pending) và job kiểm duyệt.
+    Trả về (post, job).
+    """
+    job_id = uuid.uuid4()
+    extension = os.path.splitext(media_file.name)[1]
+    file_path = os.path.join(_queue_dir(), f"{job_id}{extension}")
+
+    if hasattr(media_file, 'content_hash'):
+        # File đã được ModerationUploadHandler ghi ra đĩa: chuyển vào hàng đợi thay vì chép lại
+        shutil.move(media_file.temporary_file_path(), file_path)
+    else:
+        with open(file_path, "wb") as buffer:
+            for chunk in media_file.chunks():
+                buffer.write(chunk)
+
+    try:
+        with transaction.atomic():
+            post = Post.objects.create(user=user, description=description, status=Post.STATUS_PENDING)
+            job = PostModerationJob.objects.create(
+                id=job_id,
+                post=post,
+                media_type=media_type,
+                file_path=file_path,
+                original_name=os.path.basename(media_file.name),
+            )
+    except Exception:
+        os.remove(file_path)
+        raise
+
+    logger.info(f"Queued moderation job {job.id} for post {post.id} ({media_type}).")
+    return post, job
+
+
+def fail_abandoned_jobs():
+    """
+    Job bị treo (worker chết) đã hết số lần thử: đánh dấu failed và từ chối bài đăng.
+    Mỗi job được claim bằng SELECT ... FOR UPDATE SKIP LOCKED để hai worker không cùng kết thúc một job.
+    """
+    stale_before = timezone.now() - timedelta(seconds=settings.POST_MODERATION_JOB_TIMEOUT)
+    while True:
+        with transaction.atomic():
+            job = (
+                PostModerationJob.objects.select_for_update(skip_locked=True)
+                .filter(
+                    status=PostModerationJob.STATUS_RUNNING,
+                    locked_at__lt=stale_before,
+                    attempts__gte=settings.POST_MODERATION_MAX_ATTEMPTS,
+                )
+                .order_by('locked_at')
+                .first()
+            )
+            if job is None:
+                return
+            logger.error(f"Moderation job {job.id} was abandoned after {job.attempts} attempts.")
+            _finish(job, PostModerationJob.STATUS_FAILED, Post.STATUS_REJECTED, error='Worker stopped while processing the job.')
+
+
+def claim_next_job():
+    """
+    Lấy một job đang chờ (hoặc job running bị treo quá lâu) và đánh dấu running.
+    SELECT ... FOR UPDATE SKIP LOCKED cho phép nhiều worker chạy song song mà không lấy trùng job.
+    """
+    stale_before = timezone.now() - timedelta(seconds=settings.POST_MODERATION_JOB_TIMEOUT)
+    with transaction.atomic():
+        job = (
+            PostModerationJob.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=PostModerationJob.STATUS_QUEUED)
+                | Q(status=PostModerationJob.STATUS_RUNNING, locked_at__lt=stale_before),
+                attempts__lt=settings.POST_MODERATION_MAX_ATTEMPTS,
+            )
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = PostModerationJob.STATUS_RUNNING
+        job.attempts += 1
+        job.locked_at = timezone.now()
+        job.save(update_fields=['status', 'attempts', 'locked_at', 'updated_at'])
+        return job
+
+
+def _remove_queued_file(job):
+    if os.path.exists(job.file_path):
+        os.remove(job.file_path)
+
+
+def _cancel(job, media_url=None, uploaded=False):
+    """
+    Bài đăng (và job, bị xoá dây chuyền) đã bị xoá trong lúc job chạy: dọn file trong hàng đợi và asset
+    do chính job này upload. URL lấy từ verdict cache (uploaded=False) là asset của bài đăng khác, giữ nguyên.
+    """
+    logger.info(f"Moderation job {job.id} was cancelled: post {job.post_id} no longer exists.")
+    public_id = public_id_from_url(media_url) if uploaded else None
+    if public_id:
+        destroy_asset(public_id, job.media_type)
+    _remove_queued_file(job)
+
+
+def _finish(job, job_status, post_status, media_url=None, error='', uploaded=False):
+    with transaction.atomic():
+        # Khoá dòng job: xoá bài đăng (xoá dây chuyền job) phải chờ tới khi bài đăng được cập nhật xong
+        locked = PostModerationJob.objects.select_for_update().select_related('post').filter(pk=job.pk).first()
+        if locked is not None:
+            locked.status = job_status
+            locked.error = error
+            locked.locked_at = None
+            locked.save(update_fields=['status', 'error', 'locked_at', 'updated_at'])
+
+            post = locked.post
+            post.status = post_status
+            update_fields = ['status', 'updated_at']
+            if media_url:
+                post.media = media_url
+                update_fields.append('media')
+            post.save(update_fields=update_fields)
+
+    if locked is None:
+        _cancel(job, media_url, uploaded)
+        return False
+    _remove_queued_file(job)
+    return True
+
+
+def _requeue(job, error):
+    """Đưa job về hàng đợi để thử lại. Job đã bị xoá cùng bài đăng thì chỉ dọn file."""
+    requeued = PostModerationJob.objects.filter(pk=job.pk).update(
+        status=PostModerationJob.STATUS_QUEUED, error=error, locked_at=None, updated_at=timezone.now(),
+    )
+    if not requeued:
+        _cancel(job)
+
+
+def run_job(job):
+    """Chạy kiểm duyệt + upload cho một job đã được claim."""
+    logger.info(f"Running moderation job {job.id} (attempt {job.attempts}).")
+    process_func = PROCESSORS[job.media_type]
+    try:
+        with open(job.file_path, "rb") as media:
+            media_url, uploaded = process_func(File(media, name=job.original_name))
+    except ViolentContentError as e:
+        logger.warning(f"Moderation job {job.id} rejected post {job.post_id}: {e}")
+        _finish(job, PostModerationJob.STATUS_DONE, Post.STATUS_REJECTED, error=str(e))
+        return
+    except Exception as e:
+        logger.error(f"Moderation job {job.id} failed: {e}", exc_info=True)
+        if job.attempts >= settings.POST_MODERATION_MAX_ATTEMPTS:
+            _finish(job, PostModerationJob.STATUS_FAILED, Post.STATUS_REJECTED, error=str(e))
+        else:
+            _requeue(job, str(e))
+        return
+
+    if _finish(job, PostModerationJob.STATUS_DONE, Post.STATUS_PUBLISHED, media_url=media_url, uploaded=uploaded):
+        logger.info(f"Moderation job {job.id} published post {job.post_id}.")
+
+
+def run_worker(poll_interval=1.0, once=False, should_stop=lambda: False):
+    """Vòng lặp worker: lấy và chạy job cho tới khi should_stop() trả về True (hoặc hết job nếu once)."""
+    while not should_stop():
+        close_old_connections()
+        try:
+            fail_abandoned_jobs()
+        except Exception as e:
+            logger.error(f"Failed to clean up abandoned moderation jobs: {e}", exc_info=True)
+        try:
+            job = claim_next_job()
+        except Exception as e:
+            # Mất kết nối DB, deadlock...: chờ rồi thử lại thay vì để worker chết
+            logger.error(f"Failed to claim a moderation job: {e}", exc_info=True)
+            if once:
+                return
+            time.sleep(poll_interval)
+            continue
+        if job is None:
+            if once:
+                return
+            time.sleep(poll_interval)
+            continue
+        # Lỗi của một job (kể cả lỗi DB) không được làm dừng worker; job sẽ được claim lại khi hết hạn khoá
+        try:
+            run_job(job)
+        except Exception as e:
+            logger.error(f"Moderation job {job.id} crashed: {e}", exc_info=True)
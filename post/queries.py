@@ -0,0 +1,25 @@
+# post/queries.py
+# Queryset cho các endpoint trả về PostSerializer: is_liked của người đang request được tính trong cùng truy vấn
+# (subquery; số like/comment/share là cột bộ đếm trên Post), tác giả kèm các số đếm của họ được tải bằng một
+# truy vấn prefetch. Cả danh sách chỉ tốn 2 truy vấn thay vì 7 truy vấn cho mỗi bài đăng.
+
+from django.db.models import BooleanField, Exists, OuterRef, Prefetch, Value
+
+from like.models import Like
+from user.models import User
+from user.queries import with_user_counts
+
+from .models import Post
+
+
+def with_serializer_data(queryset, user=None):
+    """Annotate `queryset` (Post) với các giá trị PostSerializer đọc sẵn thay vì truy vấn riêng cho từng bài."""
+    if user is not None and user.is_authenticated:
+        is_liked = Exists(Like.objects.filter(user=user, target_type='post', target_id=OuterRef('pk')))
+    else:
+        is_liked = Value(False, output_field=BooleanField())
+    return queryset.annotate(is_liked=is_liked).prefetch_related(Prefetch('user', queryset=with_user_counts(User.objects.all())))
+
+
+def serializer_posts(user=None):
+    return with_serializer_data(Post.objects.all(), user)
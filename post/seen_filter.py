@@ -0,0 +1,127 @@
+# post/seen_filter.py
+# Feed ngẫu nhiên không lặp lại: mỗi người dùng có một Bloom filter xoay vòng (2 thế hệ) chứa id các bài đăng
+# đã được gợi ý, lưu trong bảng SeenPostFilter nên dùng chung giữa các worker. Bộ nhớ mỗi người dùng cố định
+# (2 x FEED_SEEN_FILTER_BYTES); khi thế hệ hiện tại đầy, thế hệ cũ bị bỏ nên bài đăng xem từ rất lâu có thể
+# xuất hiện lại. Kiểm tra "đã xem" không cần quét bảng lịch sử nào.
+
+import hashlib
+import math
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from .feed import feed_size, sample_feed_posts
+from .models import SeenPostFilter
+
+# Lấy dư ứng viên mỗi lượt để bù cho các bài đã xem, và số lượt tối đa trước khi chấp nhận bài đã xem
+OVERSAMPLE = 4
+SAMPLE_ROUNDS = 4
+
+
+class SeenFilter:
+    """Bloom filter xoay vòng trong bộ nhớ: một bài đăng được coi là đã xem nếu có trong thế hệ hiện tại hoặc trước đó."""
+
+    def __init__(self, size_bytes, false_positive_rate, current=None, previous=None, count=0):
+        self.size_bytes = size_bytes
+        self.num_bits = size_bytes * 8
+        # Tra cứu kiểm tra cả hai thế hệ nên tỉ lệ dương tính giả tổng là 1 - (1 - p_thế_hệ)² ≈ 2 p_thế_hệ:
+        # mỗi thế hệ được tính cho p/2. Số hàm hash và sức chứa tối ưu cho m bit với tỉ lệ q = p/2:
+        # k = log2(1/q), n = m ln²2 / ln(1/q)
+        generation_rate = false_positive_rate / 2
+        self.num_hashes = max(1, round(-math.log2(generation_rate)))
+        self.capacity = max(1, int(self.num_bits * math.log(2) ** 2 / -math.log(generation_rate)))
+        # Filter lưu với kích thước khác (đổi cấu hình) không dùng lại được: bắt đầu lại từ đầu
+        if current is None or len(current) != size_bytes or len(previous) != size_bytes:
+            current, previous, count = bytes(size_bytes), bytes(size_bytes), 0
+        self.current = bytearray(current)
+        self.previous = bytearray(previous)
+        self.count = count
+
+    @classmethod
+    def from_settings(cls, **kwargs):
+        return cls(settings.FEED_SEEN_FILTER_BYTES, settings.FEED_SEEN_FALSE_POSITIVE_RATE, **kwargs)
+
+    def _positions(self, post_id):
+        # Double hashing (Kirsch-Mitzenmacher): k vị trí từ hai giá trị hash 64-bit
+        digest = hashlib.blake2b(post_id.bytes, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    @staticmethod
+    def _test(bits, positions):
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in positions)
+
+    def __contains__(self, post_id):
+        positions = self._positions(post_id)
+        return self._test(self.current, positions) or self._test(self.previous, positions)
+
+    def add(self, post_id):
+        if self.count >= self.capacity:
+            self.previous = self.current
+            self.current = bytearray(self.size_bytes)
+            self.count = 0
+        for position in self._positions(post_id):
+            self.current[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+
+def load_seen_filter(user):
+    row = SeenPostFilter.objects.filter(user=user).first()
+    if row is None:
+        return SeenFilter.from_settings()
+    return SeenFilter.from_settings(current=bytes(row.current), previous=bytes(row.previous), count=row.count)
+
+
+def mark_seen(user, post_ids):
+    """Thêm các bài đăng vào filter của người dùng. Khoá dòng để các request đồng thời không ghi đè lẫn nhau."""
+    # Tạo dòng trước, ngoài khoá: SELECT ... FOR UPDATE trên dòng chưa tồn tại không khoá được dòng nào,
+    # hai request đầu tiên của cùng người dùng sẽ cùng INSERT
+    try:
+        # INSERT của get_or_create chạy trong savepoint riêng nên lỗi không làm hỏng giao dịch bên ngoài
+        SeenPostFilter.objects.get_or_create(user=user, defaults={'current': b'', 'previous': b''})
+    except IntegrityError:
+        # Request đồng thời vừa tạo dòng này
+        pass
+    with transaction.atomic():
+        row = SeenPostFilter.objects.select_for_update().get(user=user)
+        seen = SeenFilter.from_settings(current=bytes(row.current), previous=bytes(row.previous), count=row.count)
+        for post_id in post_ids:
+            if post_id not in seen:
+                seen.add(post_id)
+        row.current = bytes(seen.current)
+        row.previous = bytes(seen.previous)
+        row.count = seen.count
+        row.save(update_fields=['current', 'previous', 'count', 'updated_at'])
+
+
+def sample_unseen_posts(user, count, queryset=None):
+    """
+    Tối đa `count` bài đăng ngẫu nhiên mà người dùng chưa được gợi ý, rồi đánh dấu chúng là đã xem.
+    Nếu người dùng đã xem gần hết feed, phần còn thiếu được bù bằng bài đã xem thay vì trả về ít bài hơn.
+    `queryset` được chuyển cho sample_feed_posts.
+    """
+    size = feed_size()
+    if size == 0:
+        return []
+    # Một lượt đã lấy toàn bộ feed thì các lượt sau chỉ lặp lại cùng các bài đăng
+    rounds = 1 if count * OVERSAMPLE >= size else SAMPLE_ROUNDS
+    seen = load_seen_filter(user)
+    chosen = {}
+    fallback = {}
+    for _ in range(rounds):
+        for post in sample_feed_posts(count * OVERSAMPLE, queryset, size):
+            if post.id in chosen:
+                continue
+            if post.id in seen:
+                fallback.setdefault(post.id, post)
+            else:
+                chosen[post.id] = post
+        if len(chosen) >= count:
+            break
+
+    posts = list(chosen.values())[:count]
+    posts += [post for post_id, post in fallback.items() if post_id not in chosen][:count - len(posts)]
+    if posts:
+        mark_seen(user, [post.id for post in posts])
+    return posts
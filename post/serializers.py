@@ -1,27 +1,31 @@
 from rest_framework import status
 from rest_framework import serializers
 from rest_framework.serializers import ValidationError
-from .models import Post # Assuming your Post model is in models.py
+from django.conf import settings
+from .models import Post, PostModerationJob # Assuming your Post model is in models.py
 from like.models import Like
 from user.serializers import UserSerializer # Keep existing import
 from ai_result.utils import process_and_upload_image, process_and_upload_video
+from .moderation import enqueue_post_moderation
 
 class PostSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     is_liked = serializers.SerializerMethodField()
-    likes_count = serializers.SerializerMethodField()
-    comments_count = serializers.SerializerMethodField()
-    shares_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Post
-        fields = ['id', 'user', 'media', 'description', 'created_at', 'updated_at',
+        fields = ['id', 'user', 'media', 'description', 'status', 'created_at', 'updated_at',
                  'is_liked', 'likes_count', 'comments_count', 'shares_count']
 
+    # likes_count, comments_count, shares_count là cột bộ đếm trên Post (post/counters.py).
+    # is_liked đọc giá trị đã annotate sẵn (post/queries.py) nếu có,
+    # chỉ truy vấn riêng khi post không được lấy qua with_serializer_data (ví dụ post vừa tạo)
     def get_is_liked(self, obj):
         """
         Kiểm tra xem người dùng đang request đã like post này hay chưa.
         """
+        if hasattr(obj, 'is_liked'):
+            return obj.is_liked
         request = self.context.get('request')
         if request and request.user and request.user.is_authenticated:
             # Kiểm tra trong bảng Like - Bây giờ Like đã được import ở trên đầu
@@ -32,18 +36,6 @@ class PostSerializer(serializers.ModelSerializer):
             ).exists()
         return False # Trả về False nếu không có request hoặc người dùng chưa đăng nhập
 
-    def get_likes_count(self, obj):
-        from like.models import Like
-        return Like.objects.filter(target_id=obj.id, target_type='post').count()
-
-    def get_comments_count(self, obj):
-        from comment.models import Comment
-        return Comment.objects.filter(post=obj).count()
-
-    def get_shares_count(self, obj):
-        from share.models import Share
-        return Share.objects.filter(post=obj).count()
-
 class PostCreateSerializer(serializers.ModelSerializer):
     media_file = serializers.FileField(write_only=True)
     description = serializers.CharField(allow_blank=True, required=False)
@@ -52,21 +44,35 @@ class PostCreateSerializer(serializers.ModelSerializer):
         model = Post
         fields = ['description', 'media_file']
 
+    def to_internal_value(self, data):
+        # ModerationUploadHandler đã từ chối file (sai định dạng, quá lớn, quá dài) trong lúc nhận
+        rejection = getattr(self.context.get('request'), 'upload_rejection', None)
+        if rejection:
+            raise ValidationError({'media_file': [rejection]})
+        return super().to_internal_value(data)
+
     def create(self, validated_data):
         media_file = validated_data.pop('media_file')
         description = validated_data.get('description', '')
         user = self.context['request'].user
 
+        # Ưu tiên định dạng nhận dạng từ nội dung file thay vì content_type do client gửi
         content_type = media_file.content_type
-        if content_type.startswith('image'):
+        media_type = getattr(media_file, 'media_type', None)
+        if media_type == 'image' or (media_type is None and content_type.startswith('image')):
             file_type = 'image'
             process_func = process_and_upload_image
-        elif content_type.startswith('video'):
+        elif media_type == 'video' or (media_type is None and content_type.startswith('video')):
             file_type = 'video'
             process_func = process_and_upload_video
         else:
             raise ValidationError("Loai file khong duoc ho tro.")
 
+        if settings.POST_ASYNC_MODERATION:
+            # Kiểm duyệt bất đồng bộ: lưu file, tạo post pending và trả về ngay, worker xử lý sau
+            post, job = enqueue_post_moderation(user, description, media_file, file_type)
+            post.moderation_job = job
+            return post
 
         try:
             media_url = process_func(media_file)
@@ -79,3 +85,13 @@ class PostCreateSerializer(serializers.ModelSerializer):
         except Exception as e:
              raise ValidationError({'non_field_errors': [f"Đã xảy ra lỗi không mong muốn trong quá trình tạo bài đăng: {e}"]})
 
+
+
+class PostModerationJobSerializer(serializers.ModelSerializer):
+    job_id = serializers.UUIDField(source='id', read_only=True)
+    post_id = serializers.UUIDField(read_only=True)
+    post_status = serializers.CharField(source='post.status', read_only=True)
+
+    class Meta:
+        model = PostModerationJob
+        fields = ['job_id', 'post_id', 'status', 'post_status', 'media_type', 'attempts', 'error', 'created_at', 'updated_at']
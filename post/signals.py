@@ -0,0 +1,74 @@
+# post/signals.py
+# Giữ chỉ mục feed (post/feed.py) đồng bộ khi bài đăng được tạo, đổi trạng thái hoặc bị xoá,
+# và các bộ đếm like/comment/share trên Post (post/counters.py) đồng bộ khi like/comment/share được tạo hoặc xoá.
+
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .counters import adjust_counter
+from .feed import add_to_feed, remove_from_feed
+from .models import Post
+
+
+@receiver(post_save, sender=Post)
+def update_feed_index(sender, instance, **kwargs):
+    # Chỉ khoá dòng đếm khi trạng thái feed thực sự thay đổi, không phải ở mọi lần save()
+    if instance.status == Post.STATUS_PUBLISHED and instance.feed_seq is None:
+        instance.feed_seq = add_to_feed(instance.pk)
+    elif instance.status != Post.STATUS_PUBLISHED and instance.feed_seq is not None:
+        remove_from_feed(instance.pk)
+        instance.feed_seq = None
+
+
+@receiver(pre_delete, sender=Post)
+def remove_deleted_post_from_feed(sender, instance, **kwargs):
+    # pre_delete (không phải post_delete): dòng còn tồn tại nên đọc được feed_seq hiện tại
+    remove_from_feed(instance.pk)
+
+
+# Bộ đếm like/comment/share trên Post (post/counters.py). post_delete cũng chạy cho từng dòng bị xoá dây chuyền
+# (xoá người dùng, xoá bài đăng) và khi xoá bằng QuerySet.delete().
+
+def _parent_post_deleted(post_id, origin):
+    # origin là đối tượng (hoặc QuerySet) mà delete() được gọi: comment/share bị xoá dây chuyền cùng chính
+    # bài đăng của nó thì dòng Post cũng sắp bị xoá, UPDATE bộ đếm cho từng dòng con là thừa
+    if isinstance(origin, Post):
+        return origin.pk == post_id
+    return isinstance(origin, QuerySet) and origin.model is Post
+
+
+@receiver(post_save, sender='like.Like')
+def count_created_like(sender, instance, created, **kwargs):
+    if created and instance.target_type == 'post':
+        adjust_counter(instance.target_id, 'likes_count', 1)
+
+
+@receiver(post_delete, sender='like.Like')
+def count_deleted_like(sender, instance, **kwargs):
+    if instance.target_type == 'post':
+        adjust_counter(instance.target_id, 'likes_count', -1)
+
+
+@receiver(post_save, sender='comment.Comment')
+def count_created_comment(sender, instance, created, **kwargs):
+    if created:
+        adjust_counter(instance.post_id, 'comments_count', 1)
+
+
+@receiver(post_delete, sender='comment.Comment')
+def count_deleted_comment(sender, instance, origin=None, **kwargs):
+    if not _parent_post_deleted(instance.post_id, origin):
+        adjust_counter(instance.post_id, 'comments_count', -1)
+
+
+@receiver(post_save, sender='share.Share')
+def count_created_share(sender, instance, created, **kwargs):
+    if created:
+        adjust_counter(instance.post_id, 'shares_count', 1)
+
+
+@receiver(post_delete, sender='share.Share')
+def count_deleted_share(sender, instance, origin=None, **kwargs):
+    if not _parent_post_deleted(instance.post_id, origin):
+        adjust_counter(instance.post_id, 'shares_count', -1)
@@ -1,3 +1,401 @@
-from django.test import TestCase
+import os
+import random
+import shutil
+import tempfile
+import uuid
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.db import IntegrityError, connection
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ai_result.apps import AiResultConfig
+from ai_result.models import MediaVerdict
+from ai_result.verdict_cache import content_hash
+from comment.models import Comment
+from follow.models import Follow
+from like.models import Like
+from share.models import Share
+
+from user.models import User
+
+from . import moderation
+from .counters import reconcile_batch
+from .feed import feed_size, sample_feed_posts
+from .models import Post, PostModerationJob
+from .seen_filter import SeenFilter, load_seen_filter, mark_seen, sample_unseen_posts
+from .serializers import PostSerializer
+
+
+def create_user():
+    tag = uuid.uuid4().hex[:12]
+    return User.objects.create(username=f"user_{tag}", email=f"{tag}@test.invalid")
+
+
+def feed_seqs():
+    return sorted(Post.objects.exclude(feed_seq=None).values_list('feed_seq', flat=True))
+
+
+class FeedIndexTests(TestCase):
+    def setUp(self):
+        self.user = create_user()
+
+    def assertDenseFeed(self):
+        self.assertEqual(feed_seqs(), list(range(1, feed_size() + 1)))
+
+    def test_stale_save_does_not_restore_moved_feed_seq(self):
+        first, _, last = [Post.objects.create(user=self.user, description=str(i)) for i in range(3)]
+        stale_last = Post.objects.get(pk=last.pk)
+        self.assertEqual(stale_last.feed_seq, 3)
+
+        # Xoá bài đầu: bài cuối được chuyển vào chỗ trống (feed_seq 1) trong lúc bản trong bộ nhớ vẫn là 3
+        first.delete()
+        stale_last.description = 'edited'
+        stale_last.save()
+
+        stale_last.refresh_from_db()
+        self.assertEqual(stale_last.feed_seq, 1)
+        self.assertEqual(stale_last.description, 'edited')
+        self.assertDenseFeed()
+        # Bài đăng mới lấy feed_seq = N + 1 mà không vi phạm ràng buộc unique
+        Post.objects.create(user=self.user, description='new')
+        self.assertDenseFeed()
+
+    def test_status_changes_keep_feed_dense(self):
+        posts = [Post.objects.create(user=self.user, description=str(i)) for i in range(4)]
+        posts[1].status = Post.STATUS_REJECTED
+        posts[1].save()
+        self.assertEqual(feed_size(), 3)
+        self.assertDenseFeed()
+        posts[1].status = Post.STATUS_PUBLISHED
+        posts[1].save()
+        self.assertEqual(feed_size(), 4)
+        self.assertDenseFeed()
+
+
+    def test_removed_post_is_replaced_by_last(self):
+        posts = [Post.objects.create(user=self.user, description=str(i)) for i in range(5)]
+        self.assertEqual([post.feed_seq for post in posts], [1, 2, 3, 4, 5])
+
+        posts[1].delete()
+        self.assertEqual(Post.objects.get(pk=posts[4].pk).feed_seq, 2)
+        self.assertDenseFeed()
+
+        posts[0].status = Post.STATUS_REJECTED
+        posts[0].save()
+        self.assertIsNone(Post.objects.get(pk=posts[0].pk).feed_seq)
+        self.assertEqual(Post.objects.get(pk=posts[3].pk).feed_seq, 1)
+        self.assertEqual(feed_size(), 3)
+        self.assertDenseFeed()
+
+    def test_sampled_posts_follow_sampled_order(self):
+        posts = [Post.objects.create(user=self.user, description=str(i)) for i in range(5)]
+        with mock.patch('post.feed.random.sample', return_value=[4, 1, 5]):
+            sampled = sample_feed_posts(3)
+        self.assertEqual([post.id for post in sampled], [posts[3].id, posts[0].id, posts[4].id])
+
+
+class ModerationWorkerTests(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        destroy = mock.patch.object(moderation, 'destroy_asset')
+        self.destroy_asset = destroy.start()
+        self.addCleanup(destroy.stop)
+
+    def enqueue(self):
+        upload = SimpleUploadedFile('image.jpg', b'\xff\xd8\xff' + b'0' * 64, content_type='image/jpeg')
+        return moderation.enqueue_post_moderation(self.user, 'pending', upload, 'image')
+
+    def run_worker_with(self, process):
+        with mock.patch.dict(moderation.PROCESSORS, {'image': process}):
+            moderation.run_worker(once=True)
+
+    def test_publishes_post(self):
+        post, job = self.enqueue()
+        self.run_worker_with(lambda media: ('http://res.cloudinary.invalid/demo/image/upload/v1/abc_image.jpg', True))
+        post.refresh_from_db()
+        self.assertEqual(post.status, Post.STATUS_PUBLISHED)
+        self.assertFalse(os.path.exists(job.file_path))
+        self.destroy_asset.assert_not_called()
+
+    def test_post_deleted_while_job_runs_is_cancelled(self):
+        post, job = self.enqueue()
+
+        def delete_post_then_upload(media):
+            # Chủ bài đăng xoá bài pending trong lúc worker kiểm duyệt: job bị xoá dây chuyền
+            Post.objects.filter(pk=post.pk).delete()
+            return 'http://res.cloudinary.invalid/demo/image/upload/v1/abc_image.jpg', True
+
+        self.run_worker_with(delete_post_then_upload)
+        self.assertFalse(PostModerationJob.objects.filter(pk=job.pk).exists())
+        self.assertFalse(os.path.exists(job.file_path))
+        self.destroy_asset.assert_called_once_with('abc_image', 'image')
+
+    def test_cancelled_job_keeps_cached_shared_asset(self):
+        post, job = self.enqueue()
+        with open(job.file_path, 'rb') as media:
+            digest = content_hash(media.read()).hexdigest()
+        shared_url = 'http://res.cloudinary.invalid/demo/image/upload/v1/shared_image.jpg'
+        MediaVerdict.objects.create(
+            content_hash=digest, media_type='image', status=MediaVerdict.STATUS_ACCEPTED,
+            model_version='v1', media_url=shared_url,
+        )
+        process = moderation.PROCESSORS['image']
+
+        def delete_post_then_process(media):
+            Post.objects.filter(pk=post.pk).delete()
+            return process(media)
+
+        with mock.patch('ai_result.utils.yolo_ready', return_value=True), \
+                mock.patch.object(AiResultConfig, 'MEDIA_VERDICT_CACHE_ENABLED', True), \
+                mock.patch.object(AiResultConfig, 'get_yolo_model_version', return_value='v1'):
+            self.run_worker_with(delete_post_then_process)
+        self.assertFalse(os.path.exists(job.file_path))
+        # URL lấy từ verdict cache thuộc về bài đăng khác: không được xoá
+        self.destroy_asset.assert_not_called()
+
+    def test_post_deleted_before_retry_is_cancelled(self):
+        post, job = self.enqueue()
+
+        def delete_post_then_fail(media):
+            Post.objects.filter(pk=post.pk).delete()
+            raise ValueError('Cloudinary unavailable')
+
+        with override_settings(POST_MODERATION_MAX_ATTEMPTS=3):
+            self.run_worker_with(delete_post_then_fail)
+        self.assertFalse(os.path.exists(job.file_path))
+        self.destroy_asset.assert_not_called()
+
+    def test_crashing_job_does_not_stop_worker(self):
+        _, crashing = self.enqueue()
+        post, _ = self.enqueue()
+        calls = []
+
+        def run_job(job):
+            calls.append(job.id)
+            if job.id == crashing.id:
+                raise RuntimeError('database went away')
+            moderation._finish(job, PostModerationJob.STATUS_DONE, Post.STATUS_PUBLISHED, media_url='http://x.invalid/upload/v1/a.jpg')
+
+        with mock.patch.object(moderation, 'run_job', side_effect=run_job):
+            moderation.run_worker(once=True)
+        self.assertEqual(len(calls), 2)
+        post.refresh_from_db()
+        self.assertEqual(post.status, Post.STATUS_PUBLISHED)
+
+    def test_claim_error_does_not_stop_worker(self):
+        post, _ = self.enqueue()
+        claim = moderation.claim_next_job
+        failures = [RuntimeError('database went away')]
+
+        def flaky_claim():
+            if failures:
+                raise failures.pop()
+            return claim()
+
+        stops = iter([False, False, True])
+        with mock.patch.object(moderation, 'claim_next_job', side_effect=flaky_claim), \
+                mock.patch.object(moderation.time, 'sleep') as sleep, \
+                mock.patch.dict(moderation.PROCESSORS, {'image': lambda media: ('http://x.invalid/upload/v1/a.jpg', True)}):
+            moderation.run_worker(poll_interval=7, should_stop=lambda: next(stops))
+        sleep.assert_called_once_with(7)
+        post.refresh_from_db()
+        self.assertEqual(post.status, Post.STATUS_PUBLISHED)
+
+    def test_abandoned_job_is_failed_once(self):
+        post, job = self.enqueue()
+        PostModerationJob.objects.filter(pk=job.pk).update(
+            status=PostModerationJob.STATUS_RUNNING,
+            attempts=settings.POST_MODERATION_MAX_ATTEMPTS,
+            locked_at=timezone.now() - timedelta(seconds=settings.POST_MODERATION_JOB_TIMEOUT + 60),
+        )
+        with mock.patch.object(moderation, '_finish', wraps=moderation._finish) as finish:
+            moderation.fail_abandoned_jobs()
+            moderation.fail_abandoned_jobs()
+        self.assertEqual(finish.call_count, 1)
+        job.refresh_from_db()
+        post.refresh_from_db()
+        self.assertEqual(job.status, PostModerationJob.STATUS_FAILED)
+        self.assertEqual(post.status, Post.STATUS_REJECTED)
+        self.assertFalse(os.path.exists(job.file_path))
+
+
+class PostCounterTests(TestCase):
+    def setUp(self):
+        self.author, self.viewer = create_user(), create_user()
+        self.post = Post.objects.create(user=self.author, description='counted')
+
+    def counts(self):
+        return Post.objects.filter(pk=self.post.pk).values_list(*Post.COUNTER_FIELDS).get()
+
+    def test_create_and_delete_adjust_counters(self):
+        like = Like.objects.create(user=self.viewer, target_id=self.post.id, target_type='post')
+        Like.objects.create(user=self.viewer, target_id=self.post.id, target_type='comment')
+        comment = Comment.objects.create(user=self.viewer, post=self.post, content='ok')
+        share = Share.objects.create(user=self.viewer, post=self.post)
+        self.assertEqual(self.counts(), (1, 1, 1))
+
+        like.delete()
+        comment.delete()
+        share.delete()
+        self.assertEqual(self.counts(), (0, 0, 0))
+
+    def test_counters_never_go_below_zero(self):
+        comment = Comment.objects.create(user=self.viewer, post=self.post, content='ok')
+        Post.objects.filter(pk=self.post.pk).update(comments_count=0)
+        comment.delete()
+        self.assertEqual(self.counts(), (0, 0, 0))
+
+    def test_reconcile_repairs_queryset_update_drift(self):
+        Comment.objects.create(user=self.viewer, post=self.post, content='ok')
+        Like.objects.create(user=self.viewer, target_id=self.post.id, target_type='post')
+        Post.objects.filter(pk=self.post.pk).update(likes_count=5, comments_count=0)
+
+        self.assertEqual(reconcile_batch([self.post.pk], dry_run=True), {self.post.pk: {'likes_count': (5, 1), 'comments_count': (0, 1)}})
+        self.assertEqual(self.counts(), (5, 0, 0))
+        reconcile_batch([self.post.pk])
+        self.assertEqual(self.counts(), (1, 1, 0))
+        self.assertEqual(reconcile_batch([self.post.pk]), {})
+
+    def test_deleting_post_skips_child_counter_updates(self):
+        for _ in range(3):
+            Comment.objects.create(user=self.viewer, post=self.post, content='ok')
+            Share.objects.create(user=self.viewer, post=self.post)
+        with CaptureQueriesContext(connection) as queries:
+            self.post.delete()
+        self.assertFalse([query for query in queries if query['sql'].startswith('UPDATE') and '_count' in query['sql']])
+        self.assertFalse(Comment.objects.exists())
+
+
+class PostQueryCountTests(TestCase):
+    """Số truy vấn của các endpoint trả về PostSerializer không phụ thuộc số bài đăng (post/queries.py)."""
+
+    SIZES = (1, 20)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def populate(self, size):
+        author, viewer = create_user(), create_user()
+        Follow.objects.create(follower=viewer, followed=author)
+        posts = [Post.objects.create(user=author, description=f"querycheck {i}") for i in range(size)]
+        for index, post in enumerate(posts):
+            Comment.objects.create(user=viewer, post=post, content='ok')
+            Share.objects.create(user=viewer, post=post)
+            if index % 2 == 0:
+                Like.objects.create(user=viewer, target_id=post.id, target_type='post')
+        return author, viewer, posts
+
+    def get(self, user, path, queries, **params):
+        if user is None:
+            self.client.force_authenticate(None)
+        else:
+            self.client.force_authenticate(user)
+        with self.assertNumQueries(queries):
+            response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_query_counts_do_not_grow_with_posts(self):
+        for size in self.SIZES:
+            with self.subTest(size=size):
+                Post.objects.all().delete()
+                author, viewer, posts = self.populate(size)
+                self.get(author, '/api/v1/post/', 2)
+                # + 1: tra người dùng theo user_id
+                self.get(viewer, f'/api/v1/post/user/{author.id}/', 3)
+                self.get(viewer, f'/api/v1/post/{posts[0].id}/', 2)
+                self.get(viewer, '/api/v1/post/search/', 2, query='querycheck')
+                # Khách: đọc kích thước feed + bài đăng + tác giả
+                self.get(None, '/api/v1/post/random/', 3)
+
+    def test_random_feed_query_count_is_bounded(self):
+        # Người dùng đã đăng nhập, feed nhỏ hơn số bài lấy dư: kích thước feed, filter đã xem, một lượt lấy mẫu
+        # (bài đăng + tác giả) và ghi filter (get_or_create SELECT + INSERT ngoài khoá, SELECT FOR UPDATE,
+        # UPDATE và các savepoint)
+        for size in self.SIZES:
+            with self.subTest(size=size):
+                Post.objects.all().delete()
+                _, viewer, _ = self.populate(size)
+                self.assertTrue(self.get(viewer, '/api/v1/post/random/', 12))
+
+    def test_annotated_data_matches_per_object_serializer(self):
+        author, viewer, _ = self.populate(5)
+        data = self.get(viewer, f'/api/v1/post/user/{author.id}/', 3)
+        request = mock.Mock(user=viewer)
+        expected = {
+            item['id']: item
+            for item in PostSerializer(Post.objects.filter(user=author), many=True, context={'request': request}).data
+        }
+        self.assertEqual(len(data), 5)
+        for item in data:
+            self.assertEqual(item, dict(expected[item['id']]))
+        self.assertEqual(sum(item['is_liked'] for item in data), 3)
+
+
+class SeenFilterTests(TestCase):
+    def random_ids(self, rng, count):
+        return [uuid.UUID(int=rng.getrandbits(128)) for _ in range(count)]
+
+    def test_false_positive_rate_across_both_generations(self):
+        rng = random.Random(0)
+        for rate in (0.01, 0.05):
+            with self.subTest(rate=rate):
+                seen = SeenFilter(4096, rate)
+                # Đúng 2 x sức chứa: thế hệ trước đầy và thế hệ hiện tại vừa đầy (trường hợp xấu nhất)
+                inserted = self.random_ids(rng, 2 * seen.capacity)
+                for post_id in inserted:
+                    seen.add(post_id)
+                self.assertEqual(seen.count, seen.capacity)
+                self.assertTrue(all(post_id in seen for post_id in inserted))
+
+                trials = 50000
+                false_positives = sum(post_id in seen for post_id in self.random_ids(rng, trials))
+                self.assertLess(false_positives / trials, rate * 1.2)
+
+    def test_oldest_generation_is_forgotten(self):
+        rng = random.Random(1)
+        seen = SeenFilter(256, 0.01)
+        first = self.random_ids(rng, 100)
+        for post_id in first:
+            seen.add(post_id)
+        for post_id in self.random_ids(rng, 2 * seen.capacity):
+            seen.add(post_id)
+        # Chỉ còn các dương tính giả (~1%), không phải cả thế hệ đầu
+        self.assertLess(sum(post_id in seen for post_id in first), 5)
+
+    def test_unseen_posts_do_not_repeat_until_feed_is_exhausted(self):
+        user = create_user()
+        posts = {Post.objects.create(user=user, description=str(i)).id for i in range(6)}
+        served = []
+        for _ in range(3):
+            page = sample_unseen_posts(user, 2)
+            self.assertEqual(len(page), 2)
+            served += [post.id for post in page]
+        self.assertEqual(sorted(served), sorted(posts))
+
+        # Đã xem hết feed: vẫn trả đủ số bài, bù bằng bài đã xem
+        page = sample_unseen_posts(user, 2)
+        self.assertEqual(len(page), 2)
+        self.assertTrue({post.id for post in page} <= posts)
+
+    def test_mark_seen_when_row_is_created_concurrently(self):
+        from .models import SeenPostFilter
+
+        user = create_user()
+        post_id = uuid.uuid4()
+        # Request khác tạo dòng giữa lúc get_or_create đọc và INSERT
+        SeenPostFilter.objects.create(user=user, current=b'', previous=b'')
+        with mock.patch.object(SeenPostFilter.objects, 'get_or_create', side_effect=IntegrityError):
+            mark_seen(user, [post_id])
+        self.assertIn(post_id, load_seen_filter(user))
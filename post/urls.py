@@ -1,10 +1,11 @@
 from django.urls import path
-from .views import PostListView, PostDetailView, UserPostListView, RandomPostView, PostSearchView
+from .views import PostListView, PostDetailView, UserPostListView, RandomPostView, PostSearchView, PostModerationJobView
 
 urlpatterns = [
     path('', PostListView.as_view(), name='post-list-create'),
     path('random/', RandomPostView.as_view(), name='random-post'),
     path('user/<str:user_id>/', UserPostListView.as_view(), name='user-posts'),
     path('search/', PostSearchView.as_view(), name='post-search'),
+    path('jobs/<uuid:job_id>/', PostModerationJobView.as_view(), name='post-moderation-job'),
     path('<str:post_id>/', PostDetailView.as_view(), name='post-detail'),
 ]
@@ -6,11 +6,14 @@ from django.shortcuts import get_object_or_404
 from django.db.models import Count, Q
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-import random
 
-from .models import Post
-from .serializers import PostSerializer, PostCreateSerializer
+from .feed import sample_feed_posts
+from .models import Post, PostModerationJob
+from .queries import serializer_posts, with_serializer_data
+from .seen_filter import sample_unseen_posts
+from .serializers import PostSerializer, PostCreateSerializer, PostModerationJobSerializer
 from user.models import User  # Import User model
+from ai_result.upload_handler import ModerationUploadHandler
 
 class PostListView(APIView):
     permission_classes = [IsAuthenticatedOrReadOnly]
@@ -23,8 +26,8 @@ class PostListView(APIView):
     )
     def get(self, request):
         if request.user.is_authenticated:
-            posts = Post.objects.filter(user=request.user)
-            serializer = PostSerializer(posts, many=True)
+            posts = with_serializer_data(Post.objects.filter(user=request.user), request.user)
+            serializer = PostSerializer(posts, many=True, context={'request': request})
             return Response(serializer.data)
         else:
             return Response({"detail": "Authentication required"}, status=status.HTTP_401_UNAUTHORIZED)
@@ -34,14 +37,21 @@ class PostListView(APIView):
         request_body=PostCreateSerializer,
         responses={
             201: openapi.Response("Post created successfully.", PostSerializer),
+            202: openapi.Response("Post accepted for asynchronous moderation.", PostModerationJobSerializer),
             400: "Bad Request",
         },
         security=[{'Bearer': []}]
     )
     def post(self, request):
+        # Nhận file media bằng ModerationUploadHandler (phải thêm trước khi đọc request.data)
+        request.upload_handlers.insert(0, ModerationUploadHandler(request))
         serializer = PostCreateSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
-            serializer.save()
+            post = serializer.save()
+            job = getattr(post, 'moderation_job', None)
+            if job is not None:
+                # Chế độ bất đồng bộ: client theo dõi tiến trình qua /api/v1/post/jobs/<job_id>/
+                return Response(PostModerationJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -56,8 +66,8 @@ class UserPostListView(APIView):
     def get(self, request, user_id):
         try:
             user = User.objects.get(id=user_id)
-            posts = Post.objects.filter(user=user)
-            serializer = PostSerializer(posts, many=True)
+            posts = with_serializer_data(Post.objects.filter(user=user, status=Post.STATUS_PUBLISHED), request.user)
+            serializer = PostSerializer(posts, many=True, context={'request': request})
             return Response(serializer.data)
         except User.DoesNotExist:
             return Response({"detail": "User not found"}, status=status.HTTP_404_NOT_FOUND)
@@ -73,8 +83,11 @@ class PostDetailView(APIView):
         }
     )
     def get(self, request, post_id):
-        post = get_object_or_404(Post, id=post_id)
-        serializer = PostSerializer(post)
+        post = get_object_or_404(serializer_posts(request.user), id=post_id)
+        # Bài đăng chưa được duyệt chỉ chủ sở hữu xem được
+        if post.status != Post.STATUS_PUBLISHED and post.user_id != request.user.pk:
+            return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        serializer = PostSerializer(post, context={'request': request})
         return Response(serializer.data)
 
     @swagger_auto_schema(
@@ -153,27 +166,20 @@ class RandomPostView(APIView):
     )
 
     def get(self, request):
-        # Lấy danh sách tất cả các ID một cách hiệu quả
-        post_ids = list(Post.objects.values_list('id', flat=True))
-
-        posts_count = len(post_ids)
+        # Lấy mẫu ngẫu nhiên qua chỉ mục feed_seq (post/feed.py): O(NUM_RANDOM_POSTS), không tải toàn bộ id.
+        # Người dùng đã đăng nhập không được gợi ý lại bài đã xem (post/seen_filter.py)
+        if request.user.is_authenticated:
+            random_posts = sample_unseen_posts(request.user, NUM_RANDOM_POSTS, serializer_posts(request.user))
+        else:
+            random_posts = list(sample_feed_posts(NUM_RANDOM_POSTS, serializer_posts()))
 
-        if posts_count == 0:
+        if not random_posts:
             return Response({"detail": "No posts available."}, status=status.HTTP_404_NOT_FOUND)
 
-        # Xác định số lượng post thực tế cần lấy
-        num_to_sample = min(posts_count, NUM_RANDOM_POSTS)
-
-        # Chọn ngẫu nhiên các ID từ danh sách
-        random_ids = random.sample(post_ids, num_to_sample)
-
-        # Fetch các post tương ứng với các ID đã chọn
-        random_posts_queryset = Post.objects.filter(id__in=random_ids)
-
         # Serialize danh sách các post
         # Phải thêm many=True khi serialize nhiều đối tượng
         # SỬA LỖI is_liked tại đây: Thêm context={'request': request}
-        serializer = PostSerializer(random_posts_queryset, many=True, context={'request': request}) # <-- ĐÃ SỬA
+        serializer = PostSerializer(random_posts, many=True, context={'request': request}) # <-- ĐÃ SỬA
 
         # Trả về danh sách dữ liệu post
         return Response(serializer.data)
@@ -215,7 +221,9 @@ class PostSearchView(APIView):
             return Response({'query': ['This query parameter is required for search.']}, status=status.HTTP_400_BAD_REQUEST)
 
         # Thực hiện tìm kiếm trong trường description (không phân biệt hoa thường, chứa chuỗi)
-        posts = Post.objects.filter(description__icontains=search_query)
+        posts = with_serializer_data(
+            Post.objects.filter(description__icontains=search_query, status=Post.STATUS_PUBLISHED), request.user,
+        )
 
         # Serialize kết quả tìm kiếm
         # Truyền context để PostSerializer có thể xác định is_liked
@@ -223,3 +231,23 @@ class PostSearchView(APIView):
 
         # Trả về danh sách các bài đăng tìm thấy
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class PostModerationJobView(APIView):
+    """
+    API view to poll the progress of an asynchronous post moderation job.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Get the status of an asynchronous post moderation job.",
+        responses={
+            200: openapi.Response("Moderation job status.", PostModerationJobSerializer),
+            404: "Job not found.",
+        },
+        security=[{'Bearer': []}]
+    )
+    def get(self, request, job_id):
+        job = get_object_or_404(PostModerationJob.objects.select_related('post'), id=job_id, post__user=request.user)
+        serializer = PostModerationJobSerializer(job)
+        return Response(serializer.data, status=status.HTTP_200_OK)
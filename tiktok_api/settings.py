@@ -197,3 +197,15 @@ EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS')
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+
+# Kiểm duyệt bài đăng bất đồng bộ: POST /api/v1/post/ trả về 202 + job id,
+# worker chạy bằng `python manage.py run_moderation_worker`
+POST_ASYNC_MODERATION = os.getenv('POST_ASYNC_MODERATION', 'False').lower() in ('1', 'true', 'yes')
+POST_MODERATION_MAX_ATTEMPTS = int(os.getenv('POST_MODERATION_MAX_ATTEMPTS', '3'))
+POST_MODERATION_JOB_TIMEOUT = int(os.getenv('POST_MODERATION_JOB_TIMEOUT', '1800'))
+
+# Feed ngẫu nhiên không lặp lại bài đã xem: mỗi người dùng có Bloom filter xoay vòng 2 thế hệ,
+# mỗi thế hệ FEED_SEEN_FILTER_BYTES byte. FEED_SEEN_FALSE_POSITIVE_RATE là tỉ lệ dương tính giả của cả filter
+# (hai thế hệ cùng đầy); mỗi thế hệ được tính cho một nửa tỉ lệ này
+FEED_SEEN_FILTER_BYTES = int(os.getenv('FEED_SEEN_FILTER_BYTES', '4096'))
+FEED_SEEN_FALSE_POSITIVE_RATE = float(os.getenv('FEED_SEEN_FALSE_POSITIVE_RATE', '0.01'))
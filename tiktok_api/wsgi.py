@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tiktok_api.settings')
 
 application = get_wsgi_application()
+
+# Model AI được tải lười ở lần dùng đầu tiên; web worker tải trước để request đầu tiên không phải chờ
+from ai_result.apps import AiResultConfig  # noqa: E402
+
+if AiResultConfig.WARMUP_ON_START:
+    from ai_result.utils import warmup_models  # noqa: E402
+    warmup_models()
@@ -0,0 +1,30 @@
+# user/queries.py
+# Annotate sẵn các số đếm mà UserSerializer hiển thị (followers_count, following_count, total_likes_on_posts)
+# bằng subquery, để serialize một danh sách người dùng không tốn thêm 3 truy vấn cho mỗi người.
+
+from django.db.models import F, Func, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(queryset):
+    """Subquery đếm số dòng của `queryset` (đã lọc theo OuterRef), 0 nếu không có dòng nào."""
+    counted = queryset.order_by().annotate(_count=Func(F('pk'), function='COUNT')).values('_count')
+    return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+
+def sum_subquery(queryset, field):
+    """Subquery tính tổng cột `field` của `queryset` (đã lọc theo OuterRef), 0 nếu không có dòng nào."""
+    summed = queryset.order_by().annotate(_sum=Func(F(field), function='SUM')).values('_sum')
+    return Coalesce(Subquery(summed, output_field=IntegerField()), Value(0))
+
+
+def with_user_counts(queryset):
+    from follow.models import Follow
+    from post.models import Post
+
+    return queryset.annotate(
+        followers_count=count_subquery(Follow.objects.filter(followed_id=OuterRef('pk'))),
+        following_count=count_subquery(Follow.objects.filter(follower_id=OuterRef('pk'))),
+        # Tổng bộ đếm likes_count của các bài đăng (post/counters.py), không đếm lại bảng Like
+        total_likes_on_posts=sum_subquery(Post.objects.filter(user_id=OuterRef('pk')), 'likes_count'),
+    )
@@ -56,30 +56,34 @@ class UserSerializer(serializers.ModelSerializer):
 
         return instance
 
+    # Các số đếm dưới đây dùng giá trị đã annotate sẵn (user/queries.py) nếu có
+
     # Phương thức để lấy số lượng người đang follow user này (người này là followed_id)
     def get_followers_count(self, obj):
+        if hasattr(obj, 'followers_count'):
+            return obj.followers_count
         # Import model tại đây để tránh circular dependency
         from follow.models import Follow
         return Follow.objects.filter(followed_id=obj.id).count()
 
     # Phương thức để lấy số lượng user mà user này đang follow (người này là follower_id)
     def get_following_count(self, obj):
+        if hasattr(obj, 'following_count'):
+            return obj.following_count
         # Import model tại đây để tránh circular dependency
         from follow.models import Follow
         return Follow.objects.filter(follower_id=obj.id).count()
 
     # Phương thức để lấy tổng số like trên tất cả các post của user này
     def get_total_likes_on_posts(self, obj):
+        if hasattr(obj, 'total_likes_on_posts'):
+            return obj.total_likes_on_posts
         # Import models tại đây
+        from django.db.models import Sum
         from post.models import Post
-        from like.models import Like
-
-        # Lấy danh sách ID của tất cả các bài post do user này tạo
-        user_post_ids = Post.objects.filter(user_id=obj.id).values_list('id', flat=True)
 
-        # Đếm tổng số like trên các bài post này
-        # target_type='post' là cần thiết để đảm bảo chỉ đếm like của post
-        return Like.objects.filter(target_id__in=list(user_post_ids), target_type='post').count()
+        # Cộng bộ đếm likes_count của các bài post do user này tạo, không đếm lại bảng Like
+        return Post.objects.filter(user_id=obj.id).aggregate(total=Sum('likes_count'))['total'] or 0
  
 class UserLoginSerializer(serializers.Serializer):
     email = serializers.EmailField()